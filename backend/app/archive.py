@@ -0,0 +1,206 @@
+# backend/app/archive.py
+#
+# Exam recording archive. Everything the candidate said is kept, with its transcript
+# and the examiner's turns, so a past exam can be reviewed or re-scored (app/rescore.py)
+# without recording it again. Off unless ARCHIVE_DIR is set. Each session is two
+# append-only files there:
+#
+#   <session_id>.seg   compressed audio blocks, back to back
+#   <session_id>.idx   one JSON object per line, in the order things happened:
+#     {"event": "session", "v": 1, "sample_rate": 16000, "t": ...}   each time a worker opens the session
+#     {"event": "examiner", "state": "PART_1", "text": "...", "t": ...}
+#     {"event": "candidate", "state": "PART_1", "text": "...", "audio": [[offset, length, samples], ...], "t": ...}
+#     {"event": "evaluation", "data": {...}, "t": ...}
+#
+# An audio block is 16 kHz mono 16-bit PCM, delta-encoded and zlib-compressed
+# (lossless). A candidate turn points at its blocks; the Part 2 monologue is written
+# segment by segment while it is still going. Audio of an answer that was cut off, by
+# a disconnect or a monologue abandoned midway, is discarded and left unindexed. Sessions only enqueue records; one writer per
+# process batches them and compresses and appends on a worker thread.
+
+import asyncio
+import glob
+import json
+import os
+import re
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .vad import VAD_SAMPLE_RATE
+from .logs import log
+
+ARCHIVE_VERSION = 1
+DEFAULT_MAX_BATCH = 256
+SESSION_ID = re.compile(r"[0-9A-Za-z_-]{1,64}")  # session ids become file names
+
+
+def encode_block(pcm) -> bytes:
+    samples = np.frombuffer(pcm, dtype="<i2", count=len(pcm) // 2)
+    # Neighbouring samples are close, so their differences compress far better than the samples.
+    return zlib.compress(np.diff(samples, prepend=np.int16(0)).astype("<i2").tobytes(), 6)
+
+
+def decode_block(block: bytes) -> bytes:
+    return np.cumsum(np.frombuffer(zlib.decompress(block), dtype="<i2"), dtype=np.int16).astype("<i2").tobytes()
+
+
+# --- Reading ---
+def list_sessions(directory: str) -> list:
+    return sorted(os.path.basename(path)[:-len(".idx")] for path in glob.glob(os.path.join(directory, "*.idx")))
+
+
+def load_events(directory: str, session_id: str) -> list:
+    """The session's index records, oldest first. A last line cut short by a crash is skipped."""
+    events = []
+    with open(os.path.join(directory, f"{session_id}.idx"), encoding="utf-8") as f:
+        for line in f:
+            try: events.append(json.loads(line))
+            except json.JSONDecodeError: log("ARCHIVE", f"Skipping an unreadable index line in {session_id}.", "WARNING")
+    return events
+
+
+def load_audio(directory: str, session_id: str, blocks: list) -> bytes:
+    """The PCM of a candidate turn, from its "audio" block list."""
+    with open(os.path.join(directory, f"{session_id}.seg"), "rb") as f:
+        pcm = []
+        for offset, length, _ in blocks:
+            f.seek(offset)
+            pcm.append(decode_block(f.read(length)))
+    return b"".join(pcm)
+
+
+# --- Writing ---
+class SessionArchive:
+    """One session's handle. Every method only enqueues; nothing here touches the disk."""
+
+    def __init__(self, writer, session_id: str):
+        self.writer = writer
+        self.session_id = session_id  # may change when the connection resumes an earlier session
+
+    def add_audio(self, pcm):
+        """Candidate audio, attached to the next add_candidate()."""
+        if len(pcm) >= 2: self.writer.submit(self.session_id, "audio", pcm)
+
+    def add_candidate(self, text: str, exam_state: str):
+        self.writer.submit(self.session_id, "candidate", {"state": exam_state, "text": text})
+
+    def add_examiner(self, text: str, exam_state: str):
+        self.writer.submit(self.session_id, "examiner", {"state": exam_state, "text": text})
+
+    def add_evaluation(self, evaluation: dict):
+        self.writer.submit(self.session_id, "evaluation", {"data": evaluation})
+
+    def discard_audio(self):
+        """Drops audio not yet attached to a transcript, e.g. an answer cut off by a disconnect."""
+        self.writer.submit(self.session_id, "discard", None)
+
+    def close(self):
+        self.writer.submit(self.session_id, "close", None)
+
+
+class ArchiveWriter:
+    """One per process. Records from every session are batched; a worker thread compresses and appends them."""
+
+    def __init__(self, directory: str = None, max_batch: int = DEFAULT_MAX_BATCH):
+        self.directory = directory or None  # None disables the archive
+        self.max_batch = max_batch
+        self.bytes_written = 0
+        self.batches_written = 0
+        self._queue = None
+        self._worker = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+        # Touched only on the worker thread:
+        self._files = {}    # session_id -> (segment file, index file)
+        self._pending = {}  # session_id -> audio blocks waiting for their transcript
+
+    async def start(self):
+        if not self.directory or self._worker: return
+        os.makedirs(self.directory, exist_ok=True)
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        log("ARCHIVE", f"Recording sessions to {self.directory}.")
+
+    async def stop(self):
+        if not self._worker: return
+        self._worker.cancel()
+        try: await self._worker
+        except asyncio.CancelledError: pass
+        self._worker = None
+        # Whatever is still queued is written before the files are closed.
+        loop = asyncio.get_running_loop()
+        batch = []
+        while not self._queue.empty(): batch.append(self._queue.get_nowait())
+        await loop.run_in_executor(self._executor, self._write_batch, batch)
+        await loop.run_in_executor(self._executor, self._close_all)
+        self._executor.shutdown(wait=False)
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def open(self, session_id: str) -> SessionArchive:
+        return SessionArchive(self, session_id)
+
+    def submit(self, session_id: str, kind: str, payload):
+        if self._worker and SESSION_ID.fullmatch(session_id):
+            self._queue.put_nowait((session_id, kind, payload, time.time()))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Whatever queued up during the previous write goes out as one batch.
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await loop.run_in_executor(self._executor, self._write_batch, batch)
+            except Exception as e:
+                log("ARCHIVE", f"Archive write failed: {e!r}", "ERROR")
+
+    def _write_batch(self, batch: list):
+        # Runs on the worker thread.
+        touched = set()
+        for session_id, kind, payload, t in batch:
+            if kind == "close":
+                self._pending.pop(session_id, None)
+                files = self._files.pop(session_id, None)
+                if files:
+                    for f in files: f.close()
+                touched.discard(session_id)
+                continue
+            if kind == "discard":
+                self._pending.pop(session_id, None)
+                continue
+            segment, index = self._open(session_id)
+            touched.add(session_id)
+            if kind == "audio":
+                block = encode_block(payload)
+                self._pending.setdefault(session_id, []).append([segment.tell(), len(block), len(payload) // 2])
+                segment.write(block)
+                self.bytes_written += len(block)
+                continue
+            record = {"event": kind, **payload, "t": round(t, 3)}
+            if kind == "candidate": record["audio"] = self._pending.pop(session_id, [])
+            index.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n")
+        # One flush per session per batch; the segment first, so the index never points past it.
+        for session_id in touched:
+            for f in self._files[session_id]: f.flush()
+        self.batches_written += 1
+
+    def _close_all(self):
+        for files in self._files.values():
+            for f in files: f.close()
+        self._files.clear()
+        self._pending.clear()
+
+    def _open(self, session_id: str):
+        files = self._files.get(session_id)
+        if files is None:
+            base = os.path.join(self.directory, session_id)
+            files = self._files[session_id] = (open(base + ".seg", "ab"), open(base + ".idx", "a", encoding="utf-8"))
+            files[1].write(json.dumps({"event": "session", "v": ARCHIVE_VERSION, "sample_rate": VAD_SAMPLE_RATE,
+                                       "t": round(time.time(), 3)}, separators=(",", ":")) + "\n")
+        return files
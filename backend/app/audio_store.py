@@ -0,0 +1,150 @@
+# backend/app/audio_store.py
+#
+# Bounded per-session speech storage. Conversational turns go into a fixed-size ring;
+# the Part 2 monologue is written to memory-mapped temporary segments, and each
+# completed segment is transcribed in the background while the candidate keeps talking.
+
+import asyncio
+import mmap
+import tempfile
+
+from .vad import VAD_SAMPLE_RATE
+from .logs import log
+
+PCM_BYTES_PER_SECOND = VAD_SAMPLE_RATE * 2
+
+
+class RingBuffer:
+    """Fixed-capacity PCM buffer. When full, the oldest audio is overwritten."""
+
+    def __init__(self, capacity_bytes: int):
+        self.capacity = capacity_bytes
+        self.dropped_bytes = 0
+        self._data = bytearray(capacity_bytes)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, chunk):
+        chunk = memoryview(chunk).cast("B")
+        if len(chunk) >= self.capacity:
+            self.dropped_bytes += self._size + len(chunk) - self.capacity
+            self._data[:] = chunk[-self.capacity:]
+            self._start, self._size = 0, self.capacity
+            return
+        end = (self._start + self._size) % self.capacity
+        first = min(len(chunk), self.capacity - end)
+        self._data[end:end + first] = chunk[:first]
+        self._data[:len(chunk) - first] = chunk[first:]
+        overflow = max(0, self._size + len(chunk) - self.capacity)
+        self._start = (self._start + overflow) % self.capacity
+        self._size += len(chunk) - overflow
+        self.dropped_bytes += overflow
+
+    def getvalue(self) -> bytes:
+        end = self._start + self._size
+        if end <= self.capacity:
+            return bytes(self._data[self._start:end])
+        return bytes(self._data[self._start:]) + bytes(self._data[:end - self.capacity])
+
+    def clear(self):
+        self._start = self._size = 0
+
+
+class SegmentedAudioStore:
+    """Append-only PCM split into fixed-capacity, memory-mapped temp files (page cache, not heap)."""
+
+    def __init__(self, segment_bytes: int, directory: str = None):
+        self.segment_bytes = segment_bytes
+        self.directory = directory
+        self.segments = []  # sealed (file, mmap, length)
+        self._open_segment()
+
+    def _open_segment(self):
+        self._file = tempfile.TemporaryFile(dir=self.directory)
+        self._file.truncate(self.segment_bytes)
+        self._map = mmap.mmap(self._file.fileno(), self.segment_bytes)
+        self._length = 0
+
+    @property
+    def current_length(self) -> int:
+        return self._length
+
+    def __len__(self):
+        return sum(length for _, _, length in self.segments) + self._length
+
+    def append(self, chunk):
+        n = len(chunk)
+        if self._length + n > self.segment_bytes:
+            raise ValueError("Segment is full; seal it before appending.")
+        self._map[self._length:self._length + n] = chunk
+        self._length += n
+
+    def seal(self) -> bytes:
+        """Closes the current segment, starts a new one and returns the sealed audio."""
+        data = self._map[:self._length]
+        self.segments.append((self._file, self._map, self._length))
+        self._open_segment()
+        return data
+
+    def tail(self) -> bytes:
+        return self._map[:self._length]
+
+    def close(self):
+        for f, m, _ in self.segments + [(self._file, self._map, self._length)]:
+            m.close()
+            f.close()
+        self.segments = []
+
+
+class MonologueRecorder:
+    """Records a long turn and transcribes completed segments while it is still going.
+
+    Segments are cut at the first non-speech chunk after `target_segment_s` (or hard at
+    `max_segment_s`) so words are rarely split between two transcriptions. Each segment,
+    the tail included, is also passed to `on_segment` (e.g. the session archive).
+    """
+
+    def __init__(self, provider, target_segment_s: float = 10.0, max_segment_s: float = 15.0, on_segment=None):
+        self.provider = provider
+        self.on_segment = on_segment
+        self.target_segment_bytes = int(target_segment_s * PCM_BYTES_PER_SECOND)
+        self.store = SegmentedAudioStore(int(max_segment_s * PCM_BYTES_PER_SECOND))
+        self._tasks = []
+
+    def __len__(self):
+        return len(self.store)
+
+    def append(self, chunk, is_speech: bool = True):
+        if self.store.current_length + len(chunk) > self.store.segment_bytes:
+            self._seal()
+        self.store.append(chunk)
+        if not is_speech and self.store.current_length >= self.target_segment_bytes:
+            self._seal()
+
+    def _seal(self):
+        pcm = self.store.seal()
+        log("AUDIO STORE", f"Segment {len(self._tasks)} sealed ({len(pcm) / PCM_BYTES_PER_SECOND:.1f}s), transcribing in background.")
+        if self.on_segment: self.on_segment(pcm)
+        self._tasks.append(asyncio.create_task(self.provider.transcribe(pcm)))
+
+    async def finish(self) -> str:
+        """Transcribes only the unsealed tail, then stitches all segment transcripts in order."""
+        tail = self.store.tail()
+        if self.on_segment: self.on_segment(tail)
+        tasks = self._tasks + [asyncio.create_task(self.provider.transcribe(tail))]
+        self._tasks = []
+        try:
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            self.store.close()
+        for result in results:
+            if isinstance(result, Exception): log("AUDIO STORE", f"Segment transcription failed: {result}", "ERROR")
+        return " ".join(r.strip() for r in results if isinstance(r, str) and r.strip())
+
+    def close(self):
+        for task in self._tasks: task.cancel()
+        self._tasks = []
+        self.store.close()
@@ -0,0 +1,218 @@
+# backend/app/conversation.py
+#
+# The examiner's side of the Gemini conversation.
+#
+# The system prompt is attached to the model once per process, from a provider-side
+# context cache where the API accepts one and as the model's system_instruction
+# otherwise, instead of being re-sent as the first turns of every request. Each exam
+# keeps one chat session for its whole length. When the history's estimated size
+# passes a token budget, finished exam parts are folded into a short summary that
+# keeps the examiner's questions, the cue card and every candidate answer verbatim.
+
+import asyncio
+import datetime
+import re
+
+import google.generativeai as genai
+
+from .logs import log
+from .metrics import LLM_PROMPT_TOKENS, LLM_TOKENS_TOTAL
+
+CHARS_PER_TOKEN = 4  # rough, for English; used for the budget and when the API reports no usage
+DEFAULT_HISTORY_TOKEN_BUDGET = 1500
+DEFAULT_CACHE_TTL_S = 3600
+
+# Exam part each turn belongs to; the evaluation request counts as a part of its own.
+EXAM_PARTS = {"START": 1, "PART_1": 1, "PART_2_PREP": 2, "PART_2_SPEAKING": 2, "PART_2_FOLLOW_UP": 2,
+              "PART_3": 3, "EVALUATION": 4, "ENDED": 4}
+
+SYSTEM_TAG = re.compile(r"\[SYSTEM:[^\]]*\]")
+CUE_CARD = re.compile(r"\[CUE_CARD_START\].*?\[CUE_CARD_END\]", re.DOTALL)
+QUESTION = re.compile(r"[^.!?\n]*\?")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def summarize_part(part: int, turns: list) -> str:
+    """Examiner turns shrink to their questions and the cue card; candidate answers stay verbatim."""
+    lines = [f"[SYSTEM: Summary of Part {part}. Examiner turns are abridged to their questions; the candidate's answers are verbatim.]"]
+    for role, text, _ in turns:
+        if role == "model":
+            lines += CUE_CARD.findall(text)
+            questions = " ".join(q.strip() for q in QUESTION.findall(CUE_CARD.sub("", text)))
+            if questions: lines.append(f"Examiner: {questions}")
+        elif role == "user":
+            answer = SYSTEM_TAG.sub("", text).strip()
+            if answer: lines.append(f"Candidate: {answer}")
+    return "\n".join(lines)
+
+
+def is_cache_error(error: Exception) -> bool:
+    return "cachedcontent" in str(error).lower().replace(" ", "")
+
+
+class SystemPromptModel:
+    """The examiner model with the system prompt attached, from a context cache when one could be created."""
+
+    def __init__(self, model_name: str, system_prompt: str, use_cache: bool = True, cache_ttl_s: float = DEFAULT_CACHE_TTL_S):
+        self.model_name = model_name
+        self.system_prompt = system_prompt
+        self.use_cache = use_cache
+        self.cache_ttl_s = cache_ttl_s
+        self.system_tokens = estimate_tokens(system_prompt)
+        self.model = genai.GenerativeModel(model_name, system_instruction=system_prompt)
+        self.cached = False
+        self._cache = None
+        self._keepalive = None
+
+    async def start(self):
+        if not self.use_cache or self._cache: return
+        try:
+            self._cache = await asyncio.to_thread(self._create_cache)
+            self.model = genai.GenerativeModel.from_cached_content(cached_content=self._cache)
+        except Exception as e:
+            log("LLM", f"Context cache unavailable; sending the system prompt as system_instruction: {e}", "WARNING")
+            return
+        self.cached = True
+        self._keepalive = asyncio.create_task(self._extend())
+        log("LLM", f"System prompt cached as {self._cache.name}.")
+
+    def _create_cache(self):
+        from google.generativeai import caching
+        return caching.CachedContent.create(
+            model=f"models/{self.model_name}", display_name="ielts-examiner-system-prompt",
+            system_instruction=self.system_prompt, ttl=datetime.timedelta(seconds=self.cache_ttl_s))
+
+    async def _extend(self):
+        # The cache lives as long as the worker does; stop() deletes it.
+        while True:
+            await asyncio.sleep(self.cache_ttl_s / 2)
+            try:
+                await asyncio.to_thread(self._cache.update, ttl=datetime.timedelta(seconds=self.cache_ttl_s))
+            except Exception as e:
+                log("LLM", f"Could not extend the context cache: {e}", "WARNING")
+
+    def fall_back(self, error: Exception):
+        """Switches to system_instruction after a request failed because the cache is gone."""
+        if not self.cached: return
+        log("LLM", f"Context cache failed; falling back to system_instruction: {error}", "WARNING")
+        self.model = genai.GenerativeModel(self.model_name, system_instruction=self.system_prompt)
+        self.cached = False
+        if self._keepalive: self._keepalive.cancel()
+
+    async def stop(self):
+        if self._keepalive:
+            self._keepalive.cancel()
+            try: await self._keepalive
+            except asyncio.CancelledError: pass
+            self._keepalive = None
+        if self._cache:
+            try: await asyncio.to_thread(self._cache.delete)
+            except Exception as e: log("LLM", f"Could not delete the context cache: {e}", "WARNING")
+            self._cache = None
+
+
+class ExamConversation:
+    """One exam's turns, the chat session they are sent through, and its token accounting."""
+
+    def __init__(self, examiner: SystemPromptModel, token_budget: int = DEFAULT_HISTORY_TOKEN_BUDGET):
+        self.examiner = examiner
+        self.token_budget = token_budget
+        self.turns = []          # [role, text, exam part]; role is model, user, control or summary
+        self.prompt_tokens = 0   # session totals, for the session summary log
+        self.cached_tokens = 0
+        self._chat = None
+        self._chat_model = None
+        self._synced = 0         # len(turns) the chat's own history matches; -1 forces a rebuild
+        self._request = None     # (exam part, estimated prompt tokens) of the request in flight
+
+    def contents(self, turns: list = None) -> list:
+        turns = self.turns if turns is None else turns
+        return [{"role": "model" if role == "model" else "user", "parts": [text]} for role, text, _ in turns]
+
+    def history_tokens(self) -> int:
+        return sum(estimate_tokens(text) for _, text, _ in self.turns)
+
+    def restore(self, turns: list):
+        self.turns = [list(turn) for turn in turns]
+        self._synced = -1
+
+    def add_examiner_line(self, text: str, exam_state: str):
+        """A scripted line the examiner said without asking the model."""
+        self.turns.append(["model", text, EXAM_PARTS[exam_state]])
+
+    def add_candidate_line(self, text: str, exam_state: str):
+        """An answer kept for evaluation that the examiner model doesn't reply to."""
+        self.turns.append(["user", text, EXAM_PARTS[exam_state]])
+
+    def move_last_reply(self, exam_state: str):
+        """Moves the last examiner reply to `exam_state`'s part, for a reply only known to open that part once complete."""
+        if self.turns and self.turns[-1][0] == "model": self.turns[-1][2] = EXAM_PARTS[exam_state]
+
+    def compact(self, current_part: int):
+        """Folds finished parts, oldest first, into summaries while the history is over budget."""
+        tokens = self.history_tokens()
+        for part in sorted({p for role, _, p in self.turns if p < current_part and role != "summary"}):
+            if tokens <= self.token_budget: break
+            indices = [i for i, turn in enumerate(self.turns) if turn[2] == part]
+            start, end = indices[0], indices[-1] + 1
+            summary = summarize_part(part, self.turns[start:end])
+            if estimate_tokens(summary) >= sum(estimate_tokens(text) for _, text, _ in self.turns[start:end]): continue
+            self.turns[start:end] = [["summary", summary, part]]
+            before, tokens = tokens, self.history_tokens()
+            self._synced = -1
+            log("LLM", f"Compacted Part {part} of the history.", tokens_before=before, tokens_after=tokens)
+
+    def _chat_for(self, n: int):
+        # The chat is reused across turns; its history is only replaced after compaction,
+        # a restore, a scripted line or a failed request.
+        model = self.examiner.model
+        if self._chat is None or self._chat_model is not model:
+            self._chat, self._chat_model = model.start_chat(history=self.contents(self.turns[:n])), model
+        elif self._synced != n:
+            self._chat.history = self.contents(self.turns[:n])
+        return self._chat
+
+    async def send(self, user_text: str, instruction: str, exam_state: str, stream: bool = False):
+        """Sends the candidate's text (if any) and the instruction as one message; pair with reply_received()."""
+        part = EXAM_PARTS[exam_state]
+        self.turns.append(["user", user_text, part] if user_text else ["control", instruction, part])
+        self.compact(part)
+        chat = self._chat_for(len(self.turns) - 1)
+        message = [user_text, instruction] if user_text else [instruction]
+        estimated = self.history_tokens() + (estimate_tokens(instruction) if user_text else 0) + self.examiner.system_tokens
+        self._request = (part, estimated)
+        try:
+            return await chat.send_message_async(message, stream=stream)
+        except Exception as e:
+            self._synced = -1
+            if self._chat_model is self.examiner.model and is_cache_error(e): self.examiner.fall_back(e)
+            raise
+
+    def reply_received(self, text: str, response=None, complete: bool = True, record: bool = True, exam_state: str = None):
+        """Records the reply under the request's part, or under `exam_state`'s when the reply opens the next part."""
+        part, estimated = self._request
+        if record: self.turns.append(["model", text, EXAM_PARTS[exam_state] if exam_state else part])
+        self._synced = len(self.turns) if complete and record else -1
+        if response is not None: self._report_usage(response, estimated, text)
+
+    def _report_usage(self, response, estimated: int, text: str):
+        usage = getattr(response, "usage_metadata", None)
+        prompt = getattr(usage, "prompt_token_count", 0) or 0
+        source = "usage" if prompt else "estimate"
+        if prompt:
+            cached = getattr(usage, "cached_content_token_count", 0) or 0
+            output = getattr(usage, "candidates_token_count", 0) or 0
+        else:
+            prompt, output = estimated, estimate_tokens(text)
+            cached = self.examiner.system_tokens if self.examiner.cached else 0
+        LLM_PROMPT_TOKENS.observe(prompt)
+        LLM_TOKENS_TOTAL.labels("prompt").inc(prompt)
+        LLM_TOKENS_TOTAL.labels("cached").inc(cached)
+        LLM_TOKENS_TOTAL.labels("output").inc(output)
+        self.prompt_tokens += prompt
+        self.cached_tokens += cached
+        log("LLM", "Turn tokens.", prompt_tokens=prompt, cached_tokens=cached, output_tokens=output,
+            history_turns=len(self.turns), source=source)
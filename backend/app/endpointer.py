@@ -0,0 +1,128 @@
+# backend/app/endpointer.py
+#
+# Frame-accurate endpointing. Incoming PCM is reframed into Silero's native 512-sample
+# windows; speech onset/offset use hysteresis thresholds; a pre-roll ring keeps the
+# audio just before onset so word beginnings aren't lost; and the end-of-turn silence
+# timeout adapts to the exam state and to how this candidate speaks.
+
+from collections import deque
+
+import numpy as np
+
+from .vad import VAD_FRAME_SAMPLES, VAD_SAMPLE_RATE
+
+FRAME_S = VAD_FRAME_SAMPLES / VAD_SAMPLE_RATE
+
+SPEECH_START = "speech_start"  # payload: pre-roll PCM (bytes) captured before onset
+AUDIO = "audio"                # payload: (frame PCM, is_speech) for every frame inside an utterance
+ENDPOINT = "endpoint"          # payload: voiced seconds in the utterance
+
+# Base end-of-turn silence per exam state. None means never endpoint (Part 2 is ended by its timer).
+SILENCE_TIMEOUT_S = {
+    "PART_1": 0.9,
+    "PART_2_SPEAKING": None,
+    "PART_2_FOLLOW_UP": 1.0,
+    "PART_3": 1.3,
+}
+DEFAULT_SILENCE_TIMEOUT_S = 1.2
+MIN_SILENCE_TIMEOUT_S = 0.5
+MAX_SILENCE_TIMEOUT_S = 2.0
+
+
+def reframe(remainder: np.ndarray, pcm):
+    """Splits remainder + pcm into (n, 512) int16 and float32 frames plus the new remainder.
+    A stray odd byte at the end of `pcm` is dropped."""
+    samples = np.frombuffer(pcm, dtype=np.int16, count=len(pcm) // 2)
+    if remainder.size: samples = np.concatenate([remainder, samples])
+    n_frames = len(samples) // VAD_FRAME_SAMPLES
+    frames_i16 = samples[:n_frames * VAD_FRAME_SAMPLES].reshape(n_frames, VAD_FRAME_SAMPLES)
+    frames_f32 = frames_i16.astype(np.float32) * (1.0 / 32768.0)
+    return frames_i16, frames_f32, samples[n_frames * VAD_FRAME_SAMPLES:].copy()
+
+
+class Endpointer:
+    def __init__(self, onset_threshold: float = 0.5, offset_threshold: float = 0.35,
+                 pre_roll_s: float = 0.3, adaptive: bool = True,
+                 silence_timeouts: dict = None, default_timeout_s: float = DEFAULT_SILENCE_TIMEOUT_S):
+        self.onset_threshold = onset_threshold
+        self.offset_threshold = offset_threshold
+        self.adaptive = adaptive
+        self.silence_timeouts = SILENCE_TIMEOUT_S if silence_timeouts is None else silence_timeouts
+        self.default_timeout_s = default_timeout_s
+        self.pre_roll = deque(maxlen=max(0, round(pre_roll_s / FRAME_S)))
+        self.remainder = np.zeros(0, dtype=np.int16)
+        self.frames_seen = 0
+        # Candidate profile, updated as the exam goes on.
+        self.words_per_second = None
+        self.pause_s = None  # smoothed length of the longer pauses inside a turn
+        self._reset_utterance()
+
+    def _reset_utterance(self):
+        self.in_speech = False
+        self.voiced_frames = 0
+        self.silent_frames = 0
+
+    def reset(self):
+        self._reset_utterance()
+        self.pre_roll.clear()
+        self.remainder = np.zeros(0, dtype=np.int16)
+
+    def reframe(self, pcm):
+        frames_i16, frames_f32, self.remainder = reframe(self.remainder, pcm)
+        return frames_i16, frames_f32
+
+    def silence_timeout(self, exam_state: str):
+        base = self.silence_timeouts.get(exam_state, self.default_timeout_s)
+        if base is None or not self.adaptive: return base
+        timeout = base
+        if self.words_per_second:
+            # Slow speakers pause longer between phrases; fast ones can be answered sooner.
+            timeout *= float(np.clip(2.3 / self.words_per_second, 0.85, 1.3))
+        if self.pause_s:
+            # Never shorter than this candidate's typical mid-answer pause, with some margin.
+            timeout = max(timeout, 1.25 * self.pause_s)
+        return float(np.clip(timeout, MIN_SILENCE_TIMEOUT_S, MAX_SILENCE_TIMEOUT_S))
+
+    def process(self, frames_i16: np.ndarray, probs, exam_state: str) -> list:
+        """Returns [(event, payload), ...]. Frames after an ENDPOINT in the same call are dropped."""
+        events = []
+        timeout = self.silence_timeout(exam_state)
+        timeout_frames = None if timeout is None else max(1, round(timeout / FRAME_S))
+        for frame, prob in zip(frames_i16, probs):
+            pcm = memoryview(frame).cast("B")
+            self.frames_seen += 1
+            if not self.in_speech:
+                if prob >= self.onset_threshold:
+                    self.in_speech = True
+                    self.voiced_frames = 1
+                    self.silent_frames = 0
+                    events.append((SPEECH_START, b"".join(self.pre_roll)))
+                    self.pre_roll.clear()
+                    events.append((AUDIO, (pcm, True)))
+                elif self.pre_roll.maxlen:
+                    self.pre_roll.append(pcm.tobytes())
+                continue
+            is_speech = prob >= self.offset_threshold
+            events.append((AUDIO, (pcm, is_speech)))
+            if is_speech:
+                if self.silent_frames: self._observe_pause(self.silent_frames * FRAME_S)
+                self.voiced_frames += 1
+                self.silent_frames = 0
+            else:
+                self.silent_frames += 1
+                if timeout_frames is not None and self.silent_frames >= timeout_frames:
+                    events.append((ENDPOINT, self.voiced_frames * FRAME_S))
+                    self._reset_utterance()
+                    break
+        return events
+
+    def _observe_pause(self, pause_s: float):
+        # Only the longer hesitations matter for the timeout; short gaps between words are ignored.
+        if pause_s < 0.3: return
+        self.pause_s = pause_s if self.pause_s is None else 0.8 * self.pause_s + 0.2 * pause_s
+
+    def observe_turn(self, words: int, voiced_s: float):
+        """Feeds back the transcript length of a finished turn to estimate speaking rate."""
+        if words < 3 or voiced_s <= 0: return
+        rate = words / voiced_s
+        self.words_per_second = rate if self.words_per_second is None else 0.7 * self.words_per_second + 0.3 * rate
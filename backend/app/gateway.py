@@ -0,0 +1,216 @@
+# backend/app/gateway.py
+#
+# Admission control for the upstream providers. Every STT, LLM, TTS and scoring request
+# goes through the ProviderGateway for its provider. The gateway caps the requests in
+# flight and queues the rest up to a bound. A deadline covers the time spent queueing as
+# well as the call itself. When the queue is full, or no slot comes free before the
+# deadline, the request fails at once with ProviderBusy. The caller then degrades (text
+# without audio, a spoken apology) instead of every session slowing down together.
+# Latency-critical calls can be hedged: if the first request is slow, a second one is
+# sent while a slot is free, and whichever answers first wins.
+#
+# The REST SDKs (Deepgram, Cartesia) share one pooled httpx client, so sessions reuse
+# warm TLS connections instead of opening their own.
+
+import asyncio
+import collections
+import contextlib
+import os
+import time
+
+import httpx
+
+from .logs import log
+from .metrics import (PROVIDER_QUEUE_DEPTH, PROVIDER_IN_FLIGHT, PROVIDER_WAIT_SECONDS, PROVIDER_REJECTED_TOTAL,
+                      PROVIDER_TIMEOUTS_TOTAL, PROVIDER_HEDGED_TOTAL)
+
+RETRY_BACKOFF_S = 0.2
+
+
+class ProviderBusy(Exception):
+    """The provider is saturated: its queue is full or no slot came free before the deadline."""
+
+
+def create_http_pool(max_connections: int = 100, max_keepalive: int = 20, timeout_s: float = 30.0) -> httpx.AsyncClient:
+    return httpx.AsyncClient(limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+                             timeout=httpx.Timeout(timeout_s, connect=5.0))
+
+
+class Lease:
+    """A slot held in a gateway. release() may be called more than once, e.g. from a stream's finally."""
+    __slots__ = ("_gateway", "_holds_slot", "released")
+
+    def __init__(self, gateway, holds_slot: bool):
+        self._gateway = gateway
+        self._holds_slot = holds_slot
+        self.released = False
+
+    def release(self):
+        if self.released: return
+        self.released = True
+        self._gateway._release(self._holds_slot)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class ProviderGateway:
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, timeout_s: float, retries: int = 0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout_s = timeout_s
+        self.retries = retries
+        self.in_flight = 0     # leases not yet released, urgent ones included
+        self._held = 0         # slots taken out of max_concurrency
+        self._waiters = collections.deque()  # futures of queued requests, oldest first
+        self._queue_depth = PROVIDER_QUEUE_DEPTH.labels(name)
+        self._in_flight = PROVIDER_IN_FLIGHT.labels(name)
+        self._wait = PROVIDER_WAIT_SECONDS.labels(name)
+        self._rejected = PROVIDER_REJECTED_TOTAL.labels(name)
+        self._timeouts = PROVIDER_TIMEOUTS_TOTAL.labels(name)
+        self._hedges = PROVIDER_HEDGED_TOTAL.labels(name)
+
+    @classmethod
+    def from_env(cls, name: str, max_concurrency: int, max_queue: int, timeout_s: float, **kwargs):
+        """The defaults can be overridden with <NAME>_CONCURRENCY, <NAME>_QUEUE and <NAME>_TIMEOUT_S."""
+        prefix = name.upper()
+        return cls(name, int(os.getenv(f"{prefix}_CONCURRENCY", max_concurrency)), int(os.getenv(f"{prefix}_QUEUE", max_queue)),
+                   float(os.getenv(f"{prefix}_TIMEOUT_S", timeout_s)), **kwargs)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def saturated(self) -> bool:
+        """True once the queue is half full; new sessions are turned away then so running ones keep their place."""
+        return self.waiting > 0 and self.waiting * 2 >= self.max_queue
+
+    def deadline(self, timeout_s: float = None) -> float:
+        return time.monotonic() + (self.timeout_s if timeout_s is None else timeout_s)
+
+    # --- Slots ---
+    async def acquire(self, deadline: float = None, urgent: bool = False) -> Lease:
+        """Waits for a slot until `deadline` (time.monotonic(); default the gateway's timeout).
+        Urgent requests are admitted at once, past the limit."""
+        if urgent: return self._admit(False)
+        if self._held < self.max_concurrency and not self._waiters:
+            self._held += 1
+            self._wait.observe(0.0)
+            return self._admit(True)
+        if len(self._waiters) >= self.max_queue:
+            self._rejected.inc()
+            raise ProviderBusy(f"{self.name}: {len(self._waiters)} requests already queued")
+        deadline = self.deadline() if deadline is None else deadline
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._queue_depth.set(len(self._waiters))
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, max(0.0, deadline - started))
+        except BaseException as e:
+            # A slot handed over just as the wait ended passes on to the next in line.
+            if waiter.done() and not waiter.cancelled(): self._release_slot()
+            if isinstance(e, asyncio.TimeoutError):
+                self._rejected.inc()
+                raise ProviderBusy(f"{self.name}: no free slot within {deadline - started:.1f}s") from None
+            raise
+        finally:
+            if waiter in self._waiters: self._waiters.remove(waiter)
+            self._queue_depth.set(len(self._waiters))
+            self._wait.observe(time.monotonic() - started)
+        return self._admit(True)
+
+    def try_acquire(self):
+        """A lease if a slot is free right now, else None. Never queues."""
+        if self._held >= self.max_concurrency or self._waiters: return None
+        self._held += 1
+        return self._admit(True)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, deadline: float = None, urgent: bool = False):
+        lease = await self.acquire(deadline, urgent)
+        try:
+            yield lease
+        finally:
+            lease.release()
+
+    def _admit(self, holds_slot: bool) -> Lease:
+        self.in_flight += 1
+        self._in_flight.inc()
+        return Lease(self, holds_slot)
+
+    def _release(self, holds_slot: bool):
+        self.in_flight -= 1
+        self._in_flight.dec()
+        if holds_slot: self._release_slot()
+
+    def _release_slot(self):
+        # The slot goes straight to the oldest waiter, so a newcomer can't take it first.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._held -= 1
+
+    # --- Calls ---
+    async def call(self, fn, *args, timeout_s: float = None, hedge_after_s: float = None, urgent: bool = False, **kwargs):
+        """`await fn(*args, **kwargs)` in a slot, retried up to `retries` times. The deadline covers
+        queueing, every attempt and the backoff between them. With `hedge_after_s`, an attempt still
+        running after that long gets a second identical request if a slot is free right now."""
+        deadline = self.deadline(timeout_s)
+        for attempt in range(self.retries + 1):
+            with await self.acquire(deadline, urgent):
+                try:
+                    if hedge_after_s: return await self._hedged(fn, args, kwargs, deadline, hedge_after_s)
+                    return await self._within(fn(*args, **kwargs), deadline)
+                except Exception as e:
+                    if attempt == self.retries or deadline - time.monotonic() < RETRY_BACKOFF_S * 2: raise
+                    log("GATEWAY", f"{self.name} request failed, retrying: {e!r}", "WARNING")
+            await asyncio.sleep(RETRY_BACKOFF_S * (attempt + 1))
+
+    async def open(self, fn, *args, timeout_s: float = None, **kwargs):
+        """For a request that stays open after `fn` returns, such as a streamed reply: returns
+        (lease, result) with the slot still held. Release the lease when the stream ends."""
+        deadline = self.deadline(timeout_s)
+        lease = await self.acquire(deadline)
+        try:
+            return lease, await self._within(fn(*args, **kwargs), deadline)
+        except BaseException:
+            lease.release()
+            raise
+
+    async def _within(self, awaitable, deadline: float):
+        try:
+            return await asyncio.wait_for(awaitable, max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self._timeouts.inc()
+            raise
+
+    async def _hedged(self, fn, args, kwargs, deadline: float, hedge_after_s: float):
+        attempts = {asyncio.ensure_future(fn(*args, **kwargs))}
+        hedge = None
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=min(hedge_after_s, max(0.0, deadline - time.monotonic())))
+            if not done and (hedge := self.try_acquire()):
+                self._hedges.inc()
+                attempts.add(asyncio.ensure_future(fn(*args, **kwargs)))
+            error = None
+            while attempts:
+                done, _ = await asyncio.wait(attempts, timeout=max(0.0, deadline - time.monotonic()),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self._timeouts.inc()
+                    raise asyncio.TimeoutError(f"{self.name}: no reply before the deadline")
+                for task in done:
+                    attempts.discard(task)
+                    if task.exception() is None: return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in attempts: task.cancel()
+            if hedge: hedge.release()
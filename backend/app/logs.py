@@ -0,0 +1,65 @@
+# backend/app/logs.py
+#
+# Tagged logging. LOG_FORMAT=text (default) keeps the familiar "[TAG LOG] message"
+# lines; LOG_FORMAT=json writes one JSON object per line, with any keyword fields as
+# keys. Records are formatted and written on a background thread, so a slow stdout
+# never stalls the event loop. Per-frame hot paths only log when LOG_HOT_PATH=1 and
+# must check HOT_PATH_LOGGING before building the message.
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+HOT_PATH_LOGGING = os.getenv("LOG_HOT_PATH", "0") == "1"
+
+LEVELS = {"DEBUG": logging.DEBUG, "LOG": logging.INFO, "WARNING": logging.WARNING, "ERROR": logging.ERROR}
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = f"[{record.tag} {record.level}] {record.getMessage()}"
+        if record.fields: line += " (" + ", ".join(f"{k}={v}" for k, v in record.fields.items()) + ")"
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps({
+            "ts": round(record.created, 3), "level": record.level.lower(), "tag": record.tag.lower().replace(" ", "_"),
+            "msg": record.getMessage(), **record.fields,
+        }, default=str)
+
+
+class _PassThroughQueueHandler(logging.handlers.QueueHandler):
+    # The stock QueueHandler formats in the caller's thread; leave that to the listener.
+    def prepare(self, record):
+        return record
+
+
+def _build_logger():
+    logger = logging.getLogger("ielts")
+    logger.propagate = False
+    logger.setLevel(LEVELS.get(os.getenv("LOG_LEVEL", "LOG").upper(), logging.INFO))
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    records = queue.SimpleQueue()
+    logger.addHandler(_PassThroughQueueHandler(records))
+    listener = logging.handlers.QueueListener(records, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return logger
+
+
+_logger = _build_logger()
+
+
+def log(tag: str, message: str, level: str = "LOG", **fields):
+    """log("VAD", "Engine started.") prints "[VAD LOG] Engine started." in text mode."""
+    levelno = LEVELS[level]
+    if not _logger.isEnabledFor(levelno): return
+    _logger.log(levelno, message, extra={"tag": tag, "level": level, "fields": fields})
@@ -1,23 +1,38 @@
 import os
 import json
-import base64
 import asyncio
-import torch
-import wave
-import io
 import re
+import tempfile
+import time
+import uuid
+import weakref
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 import google.generativeai as genai
 
 # --- FINAL, CORRECTED IMPORTS for deepgram-sdk v5+ ---
 from deepgram import AsyncDeepgramClient
-from deepgram.core.api_error import ApiError
 # ----------------------------------------------------
 
-from cartesia import Cartesia
-from .prompts import SYSTEM_PROMPT
+from cartesia import AsyncCartesia
+from .prompts import SYSTEM_PROMPT, FIXED_EXAMINER_PHRASES, PREP_TIME_UP_PHRASE, BUSY_REPLY
+from .vad import VadEngine, VAD_BACKENDS, VAD_SAMPLE_RATE
+from .transport import AudioChannel
+from .stt import create_stt_provider
+from .pipeline import ExaminerTurn, speech_sentences
+from .tts_cache import TtsCache
+from .audio_store import RingBuffer, MonologueRecorder
+from .endpointer import Endpointer, SPEECH_START, AUDIO, ENDPOINT
+from .session_store import create_session_store
+from .archive import ArchiveWriter
+from .conversation import SystemPromptModel, ExamConversation
+from .scoring import ExamScorer, create_scoring_model, validate_evaluation
+from .timers import TimerScheduler
+from .gateway import ProviderGateway, ProviderBusy, create_http_pool
+from .metrics import REGISTRY, Counter, Gauge, SessionMetrics, span, STAGE_SECONDS, AUDIO_FRAMES_TOTAL
+from .logs import log, HOT_PATH_LOGGING
 
 # --- Load Environment Variables & Initialize APIs ---
 load_dotenv()
@@ -25,125 +40,336 @@ DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
 CARTESIA_API_KEY = os.getenv("CARTESIA_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# --- Provider Gateways ---
+# Every upstream request is admitted through its provider's gateway (see gateway.py):
+# <NAME>_CONCURRENCY requests in flight, <NAME>_QUEUE waiting, <NAME>_TIMEOUT_S to queue
+# and answer. Deepgram and Cartesia share one pooled HTTP client.
+HTTP_POOL = create_http_pool(int(os.getenv("HTTP_POOL_SIZE", "100")))
+STT_GATEWAY = ProviderGateway.from_env("stt", 64, 128, 10.0, retries=1)
+LLM_GATEWAY = ProviderGateway.from_env("llm", 64, 128, 15.0)
+TTS_GATEWAY = ProviderGateway.from_env("tts", 32, 128, 10.0, retries=1)
+SCORING_GATEWAY = ProviderGateway.from_env("scoring", 16, 1000, 120.0)
+EXAM_GATEWAYS = (STT_GATEWAY, LLM_GATEWAY, TTS_GATEWAY)  # a new test is only started while these keep up
+ADMISSION_RETRY_AFTER_S = 10
+
 # Use the ASYNC client for an async application
-deepgram_client = AsyncDeepgramClient() 
-cartesia_client = Cartesia(api_key=CARTESIA_API_KEY)
+deepgram_client = AsyncDeepgramClient(httpx_client=HTTP_POOL)
+STT_PROVIDER = create_stt_provider(os.getenv("STT_PROVIDER", "deepgram-streaming"), deepgram_client, STT_GATEWAY)
+cartesia_client = AsyncCartesia(api_key=CARTESIA_API_KEY, httpx_client=HTTP_POOL)
 genai.configure(api_key=GEMINI_API_KEY)
-gemini_model = genai.GenerativeModel('gemini-2.5-flash')
+# The system prompt is attached once per process (context cache, else system_instruction);
+# each exam's history is compacted part by part once it passes LLM_HISTORY_TOKEN_BUDGET.
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+EXAMINER_MODEL = SystemPromptModel(GEMINI_MODEL_NAME, SYSTEM_PROMPT, use_cache=os.getenv("GEMINI_CONTEXT_CACHE", "1") == "1")
+HISTORY_TOKEN_BUDGET = int(os.getenv("LLM_HISTORY_TOKEN_BUDGET", "1500"))
+# Finished parts are scored in the background through SCORING_GATEWAY.
+SCORING_MODEL = create_scoring_model(GEMINI_MODEL_NAME)
 
 # --- VAD Setup ---
-torch.set_num_threads(1)
-VAD_MODEL, VAD_UTILS = torch.hub.load(
-    repo_or_dir='snakers4/silero-vad',
-    model='silero_vad',
-    force_reload=False,
-    trust_repo=True
-)
-VAD_SAMPLE_RATE = 16000
-VAD_THRESHOLD = 0.5
+# One engine per process: frames from every session are batched on its worker thread.
+VAD_ENGINE = VadEngine(VAD_BACKENDS[os.getenv("VAD_BACKEND", "onnx")])
+VAD_THRESHOLD = 0.5           # speech onset
+VAD_OFFSET_THRESHOLD = 0.35   # speech continues while above this (hysteresis)
 MIN_SPEECH_DURATION_S = 0.25
-SILENCE_DURATION_S = 1.2
+SILENCE_DURATION_S = 1.2      # default end-of-turn silence; per-state values live in endpointer.py
+MAX_UTTERANCE_S = 60  # conversational turns keep at most the last minute of audio
+TIMER_DURATIONS_S = {"prep_timer": 60, "speak_timer": 120}
+
+# --- Timers ---
+# One scheduler per process owns every Part 2 deadline. Clients count down locally from
+# the deadline sent once in timer_start; TIMER_RESYNC_S > 0 adds a timer_sync that often.
+TIMER_SCHEDULER = TimerScheduler()
+TIMER_RESYNC_S = float(os.getenv("TIMER_RESYNC_S", "30"))
+
+# --- Session Store ---
+# Snapshots are saved at turn boundaries; with the default SQLite store any worker on the host can resume them.
+SESSION_STORE = create_session_store(os.getenv("SESSION_STORE", "sqlite"), float(os.getenv("SESSION_TTL_S", "3600")))
+
+# --- Recording Archive ---
+# Candidate audio, transcripts and examiner turns of every exam, for review and app/rescore.py; off unless ARCHIVE_DIR is set.
+ARCHIVE = ArchiveWriter(os.getenv("ARCHIVE_DIR", ""))
 
 app = FastAPI()
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
+# --- Metrics ---
+LIVE_CONNECTIONS = weakref.WeakSet()  # ConnectionManagers of open sessions, read at scrape time
+REGISTRY.register(Gauge("ielts_active_sessions", "Open WebSocket sessions.", fn=lambda: len(LIVE_CONNECTIONS)))
+REGISTRY.register(Gauge("ielts_buffered_audio_bytes", "Candidate audio held in speech buffers and Part 2 recordings.",
+                        fn=lambda: sum(c.buffered_bytes() for c in LIVE_CONNECTIONS)))
+REGISTRY.register(Gauge("ielts_pending_timers", "Part 2 timers currently running.", fn=lambda: TIMER_SCHEDULER.pending))
+REGISTRY.register(Counter("ielts_vad_frames_total", "Frames run through the shared VAD engine.", fn=lambda: VAD_ENGINE.frames_processed))
+REGISTRY.register(Counter("ielts_vad_batches_total", "Batched VAD inferences.", fn=lambda: VAD_ENGINE.batches_processed))
+REGISTRY.register(Counter("ielts_tts_cache_memory_hits_total", "TTS lines served from the in-memory cache.", fn=lambda: TTS_CACHE.memory_hits))
+REGISTRY.register(Counter("ielts_tts_cache_disk_hits_total", "TTS lines served from the shared disk cache.", fn=lambda: TTS_CACHE.disk_hits))
+REGISTRY.register(Counter("ielts_tts_cache_misses_total", "TTS lines that had to be synthesized.", fn=lambda: TTS_CACHE.misses))
+REGISTRY.register(Counter("ielts_tts_cache_evictions_total", "TTS lines evicted from the in-memory cache.", fn=lambda: TTS_CACHE.evictions))
+REGISTRY.register(Gauge("ielts_tts_cache_memory_bytes", "Audio held in the in-memory TTS cache.", fn=lambda: TTS_CACHE.memory_bytes))
+REGISTRY.register(Gauge("ielts_tts_cache_entries", "Lines held in the in-memory TTS cache.", fn=lambda: TTS_CACHE.stats()["memory_entries"]))
+REGISTRY.register(Gauge("ielts_archive_queued_records", "Archive records waiting for the writer.", fn=lambda: ARCHIVE.queued))
+REGISTRY.register(Counter("ielts_archive_bytes_total", "Compressed audio bytes written to the archive.", fn=lambda: ARCHIVE.bytes_written))
+SESSIONS_REJECTED_TOTAL = REGISTRY.register(Counter("ielts_sessions_rejected_total", "Tests not started because a provider was saturated."))
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+async def start_vad_engine():
+    await VAD_ENGINE.start()
+
+@app.on_event("startup")
+async def cache_system_prompt():
+    await EXAMINER_MODEL.start()
+
+@app.on_event("startup")
+async def start_timer_scheduler():
+    await TIMER_SCHEDULER.start()
+
+@app.on_event("startup")
+async def start_archive():
+    await ARCHIVE.start()
+
+@app.on_event("startup")
+async def prewarm_tts_cache():
+    if os.getenv("TTS_PREWARM", "0") == "1":
+        lines = [sentence for phrase in FIXED_EXAMINER_PHRASES for sentence in speech_sentences(phrase)]
+        app.state.tts_prewarm = asyncio.create_task(TTS_CACHE.prewarm(lines))
+
+@app.on_event("shutdown")
+async def stop_vad_engine():
+    await VAD_ENGINE.stop()
+
+@app.on_event("shutdown")
+async def release_system_prompt_cache():
+    await EXAMINER_MODEL.stop()
+
+@app.on_event("shutdown")
+async def stop_timer_scheduler():
+    await TIMER_SCHEDULER.stop()
+
+@app.on_event("shutdown")
+async def stop_archive():
+    await ARCHIVE.stop()
+
+@app.on_event("shutdown")
+async def close_http_pool():
+    await HTTP_POOL.aclose()
+
+@app.on_event("shutdown")
+async def close_session_store():
+    SESSION_STORE.close()
+
 # --- Connection Manager ---
 class ConnectionManager:
-    def __init__(self):
-        self.speech_buffer = bytearray()
-        self.last_speech_time = None
+    def __init__(self, archive):
+        self.archive = archive
+        self.speech_buffer = RingBuffer(MAX_UTTERANCE_S * VAD_SAMPLE_RATE * 2)
+        self.monologue = None
         self.is_speaking = False
+        self.stt_stream = None
+
+    def buffered_bytes(self) -> int:
+        return len(self.speech_buffer) + (len(self.monologue) if self.monologue is not None else 0)
+
+    def start_utterance(self, long_turn: bool = False):
+        self.is_speaking = True
+        self.speech_buffer.clear()  # nothing fed between utterances belongs to this one
+        if long_turn: self.monologue = MonologueRecorder(STT_PROVIDER, on_segment=self.archive.add_audio)
+        else: self.stt_stream = STT_PROVIDER.open_stream()
+
+    def feed(self, chunk, is_speech: bool = True):
+        if self.monologue is not None:
+            self.monologue.append(chunk, is_speech); return
+        self.speech_buffer.extend(chunk)
+        if self.stt_stream: self.stt_stream.send(chunk)
+
+    async def transcribe_utterance(self) -> str:
+        # The stream has been fed while the candidate spoke; fall back to batch if it failed.
+        stream, speech_data = self.stt_stream, self.speech_buffer.getvalue()
+        self.stt_stream = None
+        self.reset()
+        self.archive.add_audio(speech_data)
+        if stream:
+            transcript = await stream.finish()
+            if transcript is not None: return transcript
+        return await STT_PROVIDER.transcribe(speech_data)
+
+    async def transcribe_monologue(self) -> str:
+        # Completed segments were transcribed while the candidate spoke; only the tail is left.
+        monologue, self.monologue = self.monologue, None
+        self.reset()
+        return await monologue.finish() if monologue is not None else ""
 
     def reset(self):
-        self.speech_buffer = bytearray()
-        self.last_speech_time = None
+        if self.stt_stream: self.stt_stream.abort()
+        if self.monologue is not None:
+            # An abandoned monologue's segments are already archived; keep them out of the next answer.
+            self.monologue.close()
+            self.archive.discard_audio()
+        self.speech_buffer.clear()
+        self.monologue = None
         self.is_speaking = False
+        self.stt_stream = None
 
 # --- IELTS Logic ---
 class IeltsTestManager:
     def __init__(self):
-        self.chat_history = [{'role': 'user', 'parts': [SYSTEM_PROMPT]}, {'role': 'model', 'parts': ["OK. I am ready to begin the test."]}]
+        self.conversation = ExamConversation(EXAMINER_MODEL, HISTORY_TOKEN_BUDGET)
+        self.scorer = ExamScorer(SCORING_MODEL, SCORING_GATEWAY)
         self.exam_state = "START"
         self.part_1_question_count = 0
         self.part_3_question_count = 0
+        self.transcript = []     # [speaker, text] as shown to the candidate, replayed on resume
+        self.timer = None        # (timer_type, wall-clock deadline) while a Part 2 timer runs
+        self.evaluation = None
+
+    def snapshot(self) -> dict:
+        return {
+            "exam_state": self.exam_state,
+            "part_1_question_count": self.part_1_question_count,
+            "part_3_question_count": self.part_3_question_count,
+            "history": self.conversation.turns,
+            "transcript": self.transcript,
+            "timer": self.timer,
+            "evaluation": self.evaluation,
+            "assessments": self.scorer.snapshot(),
+        }
+
+    def restore(self, snapshot: dict):
+        self.conversation.restore(snapshot["history"])
+        self.exam_state = snapshot["exam_state"]
+        self.part_1_question_count = snapshot["part_1_question_count"]
+        self.part_3_question_count = snapshot["part_3_question_count"]
+        self.transcript = snapshot["transcript"]
+        self.timer = tuple(snapshot["timer"]) if snapshot["timer"] else None
+        self.evaluation = snapshot["evaluation"]
+        self.scorer.restore(snapshot.get("assessments", {}))
+
+    def apply_transition(self, transition: str) -> dict:
+        """Enters the state a complete examiner reply leads to; returns the transcript message's extra fields."""
+        if transition == "prep_timer":
+            self.exam_state = "PART_2_PREP"
+            # The cue card is only seen once the reply is complete; it belongs to Part 2, not Part 1.
+            self.conversation.move_last_reply(self.exam_state)
+        elif transition == "speak_timer":
+            self.exam_state = "PART_2_SPEAKING"
+        else:
+            return {}
+        return {"start_timer_on_finish": transition}
+
+    def _prompt(self) -> str:
+        if self.exam_state == "START":
+            return "What is the very first thing you should say to the user to start the test?"
+        elif self.exam_state == "EVALUATION":
+            return "[SYSTEM: The test is complete. Provide the final evaluation JSON.]"
+        return "PROCEED"
+
+    async def stream_turn(self, user_response: str = "", reply_state: str = None):
+        # Starts the turn now and returns an async iterator over the reply as Gemini streams it.
+        # A reply that opens the next part (reply_state) is recorded, scored and compacted with that part.
+        started = time.perf_counter()
+        lease = response = None
+        try:
+            lease, response = await LLM_GATEWAY.open(self.conversation.send, user_response, self._prompt(), self.exam_state, stream=True)
+        except ProviderBusy as e:
+            # Nothing was sent: keep the answer for scoring and apologise without asking the model.
+            log("MANAGER", f"Gemini request not sent: {e}", "WARNING")
+            if user_response: self.conversation.add_candidate_line(user_response, self.exam_state)
+            self.conversation.add_examiner_line(BUSY_REPLY, self.exam_state)
+            return single_chunk(BUSY_REPLY)
+        except Exception as e:
+            log("MANAGER", f"Gemini API call failed: {e}", "ERROR")
+        return self._stream_reply(response, started, lease, reply_state)
+
+    async def _stream_reply(self, response, started: float, lease=None, reply_state: str = None):
+        parts, complete = [], response is not None
+        try:
+            if response:
+                # The slot is held until the stream ends; a stall longer than the gateway timeout ends it.
+                chunks = aiter(response)
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(anext(chunks), LLM_GATEWAY.timeout_s)
+                    except StopAsyncIteration:
+                        break
+                    if not parts: STAGE_SECONDS.labels("llm_first_token").observe(time.perf_counter() - started)
+                    parts.append(chunk.text)
+                    yield chunk.text
+        except Exception as e:
+            log("MANAGER", f"Gemini stream failed: {e!r}", "ERROR")
+            complete = False
+        finally:
+            if lease: lease.release()
+        STAGE_SECONDS.labels("llm").observe(time.perf_counter() - started)
+        if not parts:
+            parts.append("I'm sorry, an error occurred.")
+            yield parts[0]
+        self.conversation.reply_received("".join(parts).strip(), response, complete, exam_state=reply_state)
 
     async def next_turn(self, user_response: str = "") -> str:
-        if user_response: self.chat_history.append({"role": "user", "parts": [user_response]})
         try:
-            chat = gemini_model.start_chat(history=self.chat_history)
-            prompt = "PROCEED"
-            if self.exam_state == "START":
-                prompt = "What is the very first thing you should say to the user to start the test?"
-            elif self.exam_state == "EVALUATION":
-                prompt = "[SYSTEM: The test is complete. Provide the final evaluation JSON.]"
-            
-            response = await chat.send_message_async(prompt)
+            with span("llm"):
+                response = await LLM_GATEWAY.call(self.conversation.send, user_response, self._prompt(), self.exam_state)
             ai_response = response.text.strip()
-            if self.exam_state != "EVALUATION":
-                self.chat_history.append({"role": "model", "parts": [ai_response]})
+            self.conversation.reply_received(ai_response, response, record=self.exam_state != "EVALUATION")
             return ai_response
         except Exception as e:
-            print(f"[MANAGER ERROR] Gemini API call failed: {e}")
+            log("MANAGER", f"Gemini API call failed: {e}", "ERROR")
             return "I'm sorry, an error occurred."
 
-# --- Transcription Function (Deepgram) ---
-async def transcribe_audio(pcm_data: bytes) -> str:
-    print("[DEBUG] Entered transcribe_audio function.")
-    try:
-        if len(pcm_data) < 2048:
-            print("[DEEPGRAM LOG] Audio data too short — skipping.")
-            return ""
-
-        with io.BytesIO() as in_memory_wav:
-            with wave.open(in_memory_wav, 'wb') as wf:
-                wf.setnchannels(1)
-                wf.setsampwidth(2)
-                wf.setframerate(VAD_SAMPLE_RATE)
-                wf.writeframes(pcm_data)
-            wav_data = in_memory_wav.getvalue()
-
-        print("[DEEPGRAM LOG] Sending audio to Deepgram for transcription...")
-        
-        # *** THE FINAL, DEFINITIVE FIX IS HERE ***
-        # Using the modern, simplified syntax with all arguments as keyword arguments
-        response = await deepgram_client.listen.v1.media.transcribe_file(
-            request=wav_data,
-            model="nova-2",
-            punctuate=True,
-            smart_format=True,
-            language="en",
-            keywords=["IELTS:5", "examiner:3", "Sheldon:5"]
-        )
-
-        transcript = response.results.channels[0].alternatives[0].transcript.strip()
-        if transcript:
-            print(f"[DEEPGRAM LOG] Transcription successful: {transcript}")
-            return transcript
-        else:
-            print("[DEEPGRAM WARNING] Empty transcript — likely silence or bad API key.")
-            return ""
-
-    except ApiError as e:
-        print(f"Deepgram API Error: {e.status_code} - {e.body}")
-        return ""
-    except Exception as e:
-        print(f"Deepgram transcription error: {e}")
-        return ""
+    async def full_evaluation(self, attempts: int = 2):
+        # Fallback when per-part scoring is incomplete: the whole report in one request.
+        for attempt in range(1, attempts + 1):
+            try:
+                return validate_evaluation(parse_evaluation_json(await self.next_turn()))
+            except ValueError as e:
+                log("MANAGER", f"Full evaluation attempt {attempt} unusable: {e}", "WARNING")
+        return None
 
 # --- TTS Function (Cartesia) ---
-async def generate_tts_audio(text: str) -> bytes:
+TTS_MODEL_ID = "sonic-english"
+TTS_VOICE_ID = "5cad89c9-d88a-4832-89fb-55f2f16d13d3"
+TTS_OUTPUT_FORMAT = {"container": "wav", "encoding": "pcm_s16le", "sample_rate": 24000}
+# Short lines are hedged: if Cartesia hasn't answered in TTS_HEDGE_AFTER_S, a second request races the first.
+TTS_HEDGE_AFTER_S = float(os.getenv("TTS_HEDGE_AFTER_S", "0.8"))
+TTS_HEDGE_MAX_CHARS = 120
+
+async def request_tts_audio(text: str) -> bytes:
+    tts_generator = cartesia_client.tts.bytes(
+        model_id=TTS_MODEL_ID,
+        transcript=text,
+        voice={"mode": "id", "id": TTS_VOICE_ID},
+        output_format=TTS_OUTPUT_FORMAT
+    )
+    return b"".join([chunk async for chunk in tts_generator])
+
+async def synthesize_tts_audio(text: str) -> bytes:
+    # On failure the line is sent as text only (empty audio), and isn't cached.
+    hedge_after_s = TTS_HEDGE_AFTER_S if len(text) <= TTS_HEDGE_MAX_CHARS else None
     try:
-        tts_generator = cartesia_client.tts.bytes(
-            model_id="sonic-english",
-            transcript=text,
-            voice={"mode": "id", "id": "5cad89c9-d88a-4832-89fb-55f2f16d13d3"},
-            output_format={"container": "wav", "encoding": "pcm_s16le", "sample_rate": 24000}
-        )
-        return b"".join([chunk for chunk in tts_generator])
+        return await TTS_GATEWAY.call(request_tts_audio, text, hedge_after_s=hedge_after_s)
+    except ProviderBusy as e:
+        log("TTS", f"Speech not synthesized: {e}", "WARNING")
+        return b""
     except Exception as e:
-        print(f"Cartesia TTS error: {e}")
+        log("TTS", f"Cartesia TTS error: {e!r}", "ERROR")
         return b""
 
+# Sentence-level synthesis means long turns reuse cached fragments as well as whole fixed lines.
+TTS_CACHE = TtsCache(
+    synthesize_tts_audio, TTS_MODEL_ID, TTS_VOICE_ID, TTS_OUTPUT_FORMAT,
+    memory_budget_bytes=int(os.getenv("TTS_CACHE_MEMORY_MB", "64")) * 1024 * 1024,
+    disk_dir=os.getenv("TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ielts_tts_cache")) or None,
+)
+
+async def generate_tts_audio(text: str) -> bytes:
+    with span("tts"):
+        return await TTS_CACHE.get(text)
+
+async def single_chunk(text: str):
+    yield text
+
 def parse_evaluation_json(text: str):
     match = re.search(r"\[EVALUATION_JSON_START\](.*)\[EVALUATION_JSON_END\]", text, re.DOTALL)
     if not match: return None
@@ -155,137 +381,255 @@ def parse_evaluation_json(text: str):
 # --- Main WebSocket Logic ---
 @app.websocket("/")
 async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
+    channel = AudioChannel(websocket)
+    await channel.accept()
+    session_id = uuid.uuid4().hex
+    archive = ARCHIVE.open(session_id)
     ielts_manager = IeltsTestManager()
-    vad_manager = ConnectionManager()
-    active_timer_task = None
+    vad_manager = ConnectionManager(archive)
+    vad_session = VAD_ENGINE.open_session()
+    endpointer = Endpointer(VAD_THRESHOLD, VAD_OFFSET_THRESHOLD, default_timeout_s=SILENCE_DURATION_S)
+    session_metrics = SessionMetrics()
+    last_voiced_at = None
+    session_timer = None  # this session's entry in TIMER_SCHEDULER
+    LIVE_CONNECTIONS.add(vad_manager)
 
-    async def send_ai_turn(ai_text: str):
-        nonlocal active_timer_task
-        
-        if "[EVALUATION_JSON_START]" in ai_text:
-            print("[BACKEND LOG] Final evaluation received from AI.")
-            ielts_manager.exam_state = "ENDED"
-            evaluation_data = parse_evaluation_json(ai_text)
-            if evaluation_data:
-                await websocket.send_json({"type": "final_evaluation", "data": evaluation_data})
+    async def persist():
+        if ielts_manager.exam_state == "START": return
+        snapshot = ielts_manager.snapshot()
+        snapshot["speaker_profile"] = [endpointer.words_per_second, endpointer.pause_s]
+        try:
+            await SESSION_STORE.save(session_id, snapshot)
+        except Exception as e:
+            log("SESSION", f"Could not save session {session_id}: {e}", "ERROR")
+
+    async def resume_session(requested_id: str):
+        nonlocal session_id
+        snapshot = None
+        if requested_id and ielts_manager.exam_state == "START":
+            try:
+                snapshot = await SESSION_STORE.load(requested_id)
+            except Exception as e:
+                log("SESSION", f"Could not load session {requested_id}: {e}", "ERROR")
+        if not snapshot:
+            log("SESSION", f"Session {requested_id} not found. Starting a new one.")
+            await channel.send_json({"type": "session", "session_id": session_id, "resumed": False})
             return
 
-        response_data = {"type": "transcript", "speaker": "AI", "data": ai_text}
-        text_for_speech = ai_text
-        lower_ai_text = ai_text.lower()
-
-        text_for_speech = re.sub(r'\[SYSTEM:.*?\]', '', text_for_speech)
-        
-        if "alright, that's the end of part 1" in lower_ai_text:
-            ielts_manager.exam_state = "PART_2_PREP"
-            response_data["start_timer_on_finish"] = "prep_timer"
-            text_for_speech = re.sub(r'\[CUE_CARD_(START|END)\]|\*|_', '', text_for_speech)
-        elif "your preparation time is up" in lower_ai_text:
-            ielts_manager.exam_state = "PART_2_SPEAKING"
-            response_data["start_timer_on_finish"] = "speak_timer"
-        
-        await websocket.send_json(response_data)
-        
-        audio_bytes = await generate_tts_audio(text_for_speech.strip())
-        if audio_bytes:
-            await websocket.send_json({"type": "audio", "data": base64.b64encode(audio_bytes).decode("utf-8")})
+        session_id = archive.session_id = requested_id
+        ielts_manager.restore(snapshot)
+        endpointer.words_per_second, endpointer.pause_s = snapshot.get("speaker_profile", [None, None])
+        log("SESSION", f"Resumed session {session_id} in state {ielts_manager.exam_state}.")
+        ielts_manager.scorer.score_finished_parts(ielts_manager.exam_state, ielts_manager.conversation.turns)
+        await channel.send_json({
+            "type": "session_resumed", "session_id": session_id, "exam_state": ielts_manager.exam_state,
+            "transcript": [{"speaker": speaker, "data": text} for speaker, text in ielts_manager.transcript],
+            "evaluation": ielts_manager.evaluation,
+        })
+
+        # A Part 2 timer keeps its original deadline; one that expired while disconnected ends at once.
+        timer_type = {"PART_2_PREP": "prep_timer", "PART_2_SPEAKING": "speak_timer"}.get(ielts_manager.exam_state)
+        if timer_type:
+            if ielts_manager.timer and ielts_manager.timer[0] == timer_type:
+                await start_timer(timer_type, ielts_manager.timer[1])
+            else:
+                await start_timer(timer_type, time.time() + TIMER_DURATIONS_S[timer_type])
+        elif ielts_manager.exam_state == "EVALUATION":
+            await finish_evaluation()
+
+    async def send_audio(audio: bytes, last: bool = True):
+        with span("ws_send"):
+            await channel.send_audio(audio, last)
+        if audio and (latency := session_metrics.first_audio()) is not None:
+            log("TURN", "First examiner audio sent.", session_id=session_id, latency_ms=round(latency * 1000))
+
+    async def send_transcript(speaker: str, text: str, **extra):
+        ielts_manager.transcript.append([speaker, text])
+        await channel.send_json({"type": "transcript", "speaker": speaker, "data": text, **extra})
+
+    async def send_ai_turn(ai_text: str):
+        await stream_ai_turn(single_chunk(ai_text))
+
+    async def finish_evaluation():
+        # Earlier parts were scored in the background; sections are sent as each one is complete.
+        started = time.perf_counter()
+
+        async def send_section(index, section):
+            await channel.send_json({"type": "evaluation_section", "index": index, "data": section})
+
+        evaluation = await ielts_manager.scorer.finish(ielts_manager.conversation.turns, send_section)
+        if evaluation is None:
+            log("BACKEND", "Per-part scoring incomplete. Requesting the full evaluation.", "WARNING")
+            evaluation = await ielts_manager.full_evaluation()
+        STAGE_SECONDS.labels("evaluation").observe(time.perf_counter() - started)
+        log("BACKEND", "Final evaluation ready.", session_id=session_id, seconds=round(time.perf_counter() - started, 2))
+        ielts_manager.exam_state = "ENDED"
+        if evaluation:
+            ielts_manager.evaluation = evaluation
+            archive.add_evaluation(evaluation)
+            await channel.send_json({"type": "final_evaluation", "data": evaluation})
+        await persist()
+
+    async def stream_ai_turn(text_stream):
+        async def on_text_complete(ai_text, transition):
+            # Before Part 1 is scored, so its scoring transcript ends where Part 2's begins.
+            extra = ielts_manager.apply_transition(transition)
+            archive.add_examiner(ai_text, ielts_manager.exam_state)
+            await send_transcript("AI", ai_text, **extra)
+            ielts_manager.scorer.score_finished_parts(ielts_manager.exam_state, ielts_manager.conversation.turns)
+            await persist()
+
+        turn = ExaminerTurn(generate_tts_audio, send_audio)
+        await turn.run(text_stream, on_text_complete)
 
     async def handle_prep_timer_end():
-        print("[TIMER LOG] Prep timer ended.")
-        next_prompt = "Your preparation time is up. Please start speaking now."
-        ielts_manager.chat_history.append({"role": "model", "parts": [next_prompt]})
+        log("TIMER", "Prep timer ended.")
+        next_prompt = PREP_TIME_UP_PHRASE
+        ielts_manager.conversation.add_examiner_line(next_prompt, ielts_manager.exam_state)
         await send_ai_turn(next_prompt)
 
     async def handle_speak_timer_end():
-        print("[TIMER LOG] Speak timer ended. Finalizing Part 2 turn.")
-        await websocket.send_json({"type": "force_stop_listening"})
-        user_monologue = await transcribe_audio(bytes(vad_manager.speech_buffer)) or "(User was silent or STT failed)"
-        vad_manager.reset()
-        await websocket.send_json({"type": "transcript", "speaker": "User", "data": user_monologue})
+        log("TIMER", "Speak timer ended. Finalizing Part 2 turn.")
+        await channel.send_json({"type": "force_stop_listening"})
+        session_metrics.end_of_speech(time.perf_counter())
+        # Before the await: audio still arriving must not be fed to the next answer's buffer.
+        endpointer.reset()
+        with span("stt_monologue"):
+            user_monologue = await vad_manager.transcribe_monologue()
+        archive.add_candidate(user_monologue, ielts_manager.exam_state)
+        user_monologue = user_monologue or "(User was silent or STT failed)"
+        await send_transcript("User", user_monologue)
         prompt_for_ai = f"{user_monologue}\n\n[SYSTEM: The user's Part 2 monologue is complete. Ask one follow-up question.]"
-        ai_text = await ielts_manager.next_turn(prompt_for_ai)
+        reply = await ielts_manager.stream_turn(prompt_for_ai)
         ielts_manager.exam_state = "PART_2_FOLLOW_UP"
-        await send_ai_turn(ai_text)
+        await stream_ai_turn(reply)
 
-    async def start_timer(duration, timer_type):
-        nonlocal active_timer_task
-        print(f"[TIMER LOG] Starting {timer_type} for {duration} seconds.")
-        await websocket.send_json({"type": "timer_start", "timer_type": timer_type, "duration": duration})
-        try:
-            for i in range(duration, 0, -1):
-                await asyncio.sleep(1)
-                await websocket.send_json({"type": "timer_update", "remaining": i - 1})
-            print(f"[TIMER LOG] Timer {timer_type} finished.")
-            await websocket.send_json({"type": "timer_end"})
-            if timer_type == "prep_timer": await handle_prep_timer_end()
-            elif timer_type == "speak_timer": await handle_speak_timer_end()
-        except asyncio.CancelledError:
-            print(f"[TIMER LOG] Timer {timer_type} was cancelled by user.")
-        finally:
-            active_timer_task = None
+    async def handle_user_turn(voiced_s: float):
+        with span("stt"):
+            user_text = await vad_manager.transcribe_utterance()
+        archive.add_candidate(user_text, ielts_manager.exam_state)
+
+        if not user_text or len(user_text.split()) < 2:
+            log("BACKEND", "User speech was too short or empty. Re-prompting.")
+            display_text = "(User was silent or response was too short)"
+            system_prompt = "[SYSTEM: The user was silent or their response was too short. Ask the question again in a slightly different way.]"
+            await send_transcript("User", display_text)
+            await stream_ai_turn(await ielts_manager.stream_turn(system_prompt))
+            return
+
+        endpointer.observe_turn(len(user_text.split()), voiced_s)
+        await send_transcript("User", user_text)
+        if ielts_manager.exam_state == "PART_3": ielts_manager.part_3_question_count += 1
+        if ielts_manager.part_3_question_count >= 2:
+            log("BACKEND", "Test finished. Merging the per-part evaluation.")
+            ielts_manager.conversation.add_candidate_line(user_text, ielts_manager.exam_state)
+            ielts_manager.exam_state = "EVALUATION"
+            await persist()
+            await finish_evaluation()
+        else:
+            # The examiner's reply to the Part 2 follow-up is the first Part 3 question.
+            reply_state = "PART_3" if ielts_manager.exam_state == "PART_2_FOLLOW_UP" else None
+            reply = await ielts_manager.stream_turn(user_text, reply_state)
+            if ielts_manager.exam_state == "PART_1": ielts_manager.part_1_question_count += 1
+            elif ielts_manager.exam_state == "PART_2_FOLLOW_UP": ielts_manager.exam_state = "PART_3"; ielts_manager.part_3_question_count = 1
+            await stream_ai_turn(reply)
+
+    async def start_timer(timer_type: str, deadline: float):
+        nonlocal session_timer
+        remaining = max(0.0, deadline - time.time())
+        log("TIMER", f"Starting {timer_type} for {remaining:.1f} seconds.")
+        ielts_manager.timer = (timer_type, deadline)
+        await persist()
+        # The client counts down from `duration`; `deadline` is the same moment on the server's clock.
+        await channel.send_json({"type": "timer_start", "timer_type": timer_type, "duration": round(remaining, 3), "deadline": deadline})
+
+        async def on_resync(remaining_s):
+            await channel.send_json({"type": "timer_sync", "timer_type": timer_type, "remaining": round(remaining_s, 3)})
+
+        async def on_deadline():
+            nonlocal session_timer
+            try:
+                log("TIMER", f"Timer {timer_type} finished.")
+                ielts_manager.timer = None
+                await channel.send_json({"type": "timer_end"})
+                if timer_type == "prep_timer": await handle_prep_timer_end()
+                elif timer_type == "speak_timer": await handle_speak_timer_end()
+            finally:
+                session_timer = None
+
+        session_timer = TIMER_SCHEDULER.schedule(deadline, on_deadline, TIMER_RESYNC_S, on_resync)
+
+    def cancel_timer() -> bool:
+        """Cancels the running Part 2 timer. False if it has already fired and its handler is running."""
+        nonlocal session_timer
+        if session_timer:
+            if not session_timer.cancel(): return False
+            log("TIMER", "Timer was cancelled by user.")
+            session_timer = None
+        ielts_manager.timer = None
+        return True
 
     try:
         while True:
-            message = await websocket.receive_text()
-            data = json.loads(message)
-            msg_type = data.get("type")
+            msg_type, data = await channel.receive()
 
-            if msg_type == "start_test":
-                ai_text = await ielts_manager.next_turn()
+            if msg_type == "resume":
+                await resume_session(data.get("session_id"))
+            elif msg_type == "start_test":
+                # Admission control: while a provider's queue is backed up, new tests wait and running ones carry on.
+                if busy := next((gateway for gateway in EXAM_GATEWAYS if gateway.saturated()), None):
+                    log("SESSION", f"Test not started: the {busy.name} queue is backed up.", "WARNING",
+                        session_id=session_id, waiting=busy.waiting)
+                    SESSIONS_REJECTED_TOTAL.inc()
+                    await channel.send_json({"type": "server_busy", "retry_after_s": ADMISSION_RETRY_AFTER_S})
+                    continue
+                await channel.send_json({"type": "session", "session_id": session_id, "resumed": False})
+                reply = await ielts_manager.stream_turn()
                 ielts_manager.exam_state = "PART_1"
                 ielts_manager.part_1_question_count = 1
-                await send_ai_turn(ai_text)
+                await stream_ai_turn(reply)
             elif msg_type == "tts_finished_start_timer":
                 timer_type = data.get("timer_type")
-                duration = 60 if timer_type == "prep_timer" else 120
-                if not active_timer_task:
-                    active_timer_task = asyncio.create_task(start_timer(duration, timer_type))
+                duration = TIMER_DURATIONS_S.get(timer_type, 120)
+                if not session_timer:
+                    await start_timer(timer_type, time.time() + duration)
             elif msg_type == "skip_prep_timer":
-                if active_timer_task: active_timer_task.cancel()
-                await handle_prep_timer_end()
+                if cancel_timer(): await handle_prep_timer_end()
             elif msg_type == "finish_speaking":
-                if active_timer_task: active_timer_task.cancel()
-                await handle_speak_timer_end()
+                if cancel_timer(): await handle_speak_timer_end()
             elif msg_type == "audio_chunk":
                 if ielts_manager.exam_state in ["PART_2_PREP", "ENDED"]: continue
-                chunk = bytearray(base64.b64decode(data["data"]))
-                audio_tensor = torch.frombuffer(chunk, dtype=torch.int16).float() / 32768.0
-                speech_prob = VAD_MODEL(audio_tensor, VAD_SAMPLE_RATE).item()
-                current_time = asyncio.get_event_loop().time()
-                if speech_prob > VAD_THRESHOLD:
-                    if not vad_manager.is_speaking: vad_manager.is_speaking = True
-                    vad_manager.speech_buffer.extend(chunk)
-                    vad_manager.last_speech_time = current_time
-                elif vad_manager.is_speaking:
-                    if ielts_manager.exam_state == "PART_2_SPEAKING":
-                        vad_manager.speech_buffer.extend(chunk); continue
-                    if current_time - vad_manager.last_speech_time > SILENCE_DURATION_S:
-                        if len(vad_manager.speech_buffer) / (VAD_SAMPLE_RATE * 2) > MIN_SPEECH_DURATION_S:
-                            user_speech_data = bytes(vad_manager.speech_buffer)
-                            vad_manager.reset()
-                            user_text = await transcribe_audio(user_speech_data)
-                            
-                            if not user_text or len(user_text.split()) < 2:
-                                print("[BACKEND LOG] User speech was too short or empty. Re-prompting.")
-                                display_text = "(User was silent or response was too short)"
-                                system_prompt = "[SYSTEM: The user was silent or their response was too short. Ask the question again in a slightly different way.]"
-                                await websocket.send_json({"type": "transcript", "speaker": "User", "data": display_text})
-                                ai_text = await ielts_manager.next_turn(system_prompt)
-                            else:
-                                await websocket.send_json({"type": "transcript", "speaker": "User", "data": user_text})
-                                if ielts_manager.exam_state == "PART_3": ielts_manager.part_3_question_count += 1
-                                if ielts_manager.part_3_question_count >= 2:
-                                    print("[BACKEND LOG] Test finished. Requesting final evaluation.")
-                                    ielts_manager.exam_state = "EVALUATION"
-                                    ai_text = await ielts_manager.next_turn(user_text)
-                                else:
-                                    ai_text = await ielts_manager.next_turn(user_text)
-                                    if ielts_manager.exam_state == "PART_1": ielts_manager.part_1_question_count += 1
-                                    elif ielts_manager.exam_state == "PART_2_FOLLOW_UP": ielts_manager.exam_state = "PART_3"; ielts_manager.part_3_question_count = 1
-                            await send_ai_turn(ai_text)
-                        else:
-                            vad_manager.reset()
-
-    except WebSocketDisconnect: print("[BACKEND LOG] Client disconnected.")
-    except Exception as e: print(f"[BACKEND ERROR] Unexpected error: {e}")
\ No newline at end of file
+                frames_i16, frames = endpointer.reframe(data)
+                if not len(frames): continue
+                received_at = time.perf_counter()
+                AUDIO_FRAMES_TOTAL.inc(len(frames))
+                with span("vad"):
+                    probs = await VAD_ENGINE.infer(vad_session, frames)
+                if HOT_PATH_LOGGING: log("VAD", "Frames processed.", session_id=session_id, frames=len(frames), max_prob=round(float(probs.max()), 3))
+                for event, payload in endpointer.process(frames_i16, probs, ielts_manager.exam_state):
+                    if event == SPEECH_START:
+                        vad_manager.start_utterance(long_turn=ielts_manager.exam_state == "PART_2_SPEAKING")
+                        if payload: vad_manager.feed(payload)
+                    elif event == AUDIO:
+                        vad_manager.feed(*payload)
+                        if payload[1]: last_voiced_at = received_at
+                    elif event == ENDPOINT:
+                        STAGE_SECONDS.labels("endpoint").observe(received_at - last_voiced_at)
+                        if payload > MIN_SPEECH_DURATION_S:
+                            session_metrics.end_of_speech(last_voiced_at)
+                            await handle_user_turn(payload)
+                        else: vad_manager.reset()
+
+    except WebSocketDisconnect: log("BACKEND", "Client disconnected.")
+    except Exception as e: log("BACKEND", f"Unexpected error: {e}", "ERROR")
+    finally:
+        # Saved before the timer is cancelled so a reconnect keeps the running deadline.
+        await persist()
+        if session_timer: session_timer.cancel(running=True)
+        ielts_manager.scorer.close()
+        vad_manager.reset()
+        archive.close()
+        VAD_ENGINE.close_session(vad_session)
+        LIVE_CONNECTIONS.discard(vad_manager)
+        log("SESSION", "Session closed.", session_id=session_id, **session_metrics.summary(),
+            llm_prompt_tokens=ielts_manager.conversation.prompt_tokens, llm_cached_tokens=ielts_manager.conversation.cached_tokens)
@@ -0,0 +1,229 @@
+# backend/app/metrics.py
+#
+# In-process metrics with Prometheus text exposition. Stage timings are recorded as
+# spans around each step of a turn (VAD, endpoint, STT, LLM, TTS, WebSocket sends);
+# the headline number is end of candidate speech -> first examiner audio, kept as a
+# global histogram and per session. Quantiles are over a sliding window of recent
+# observations in this worker process; bucket counts can be summed across workers.
+
+import time
+from bisect import bisect_left
+from collections import deque
+
+import numpy as np
+
+LATENCY_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+TOKEN_BUCKETS = (250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 16000)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs: return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._children = {}
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self._children.items():
+            lines += child.render(self.name, _labels(self.labelnames, values), lambda extra, v=values: _labels(self.labelnames, v, extra))
+        return lines
+
+
+class _Value:
+    def __init__(self, fn=None):
+        self.value = 0.0
+        self.fn = fn
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+    def render(self, name, labels, _):
+        return [f"{name}{labels} {self.fn() if self.fn else self.value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), fn=None):
+        super().__init__(name, help_text, labelnames)
+        self._fn = fn
+        if not labelnames: self._default = self.labels()
+
+    def _new_child(self):
+        return _Value(self._fn)
+
+    def inc(self, amount: float = 1.0):
+        self._default.value += amount
+
+
+class Gauge(Counter):
+    """A value that goes up and down; `fn` makes it computed at scrape time."""
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0):
+        self._default.value -= amount
+
+    def set(self, value: float):
+        self._default.value = value
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple, window: int):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def quantiles(self, qs: tuple = QUANTILES) -> dict:
+        if not self.recent: return {}
+        return dict(zip(qs, np.quantile(np.fromiter(self.recent, dtype=float), qs).tolist()))
+
+    def render(self, name, labels, with_labels):
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{with_labels([('le', bound)])} {cumulative}")
+        lines.append(f"{name}_bucket{with_labels([('le', '+Inf')])} {self.count}")
+        lines.append(f"{name}_sum{labels} {self.sum}")
+        lines.append(f"{name}_count{labels} {self.count}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Bucketed histogram plus p50/p95/p99 over the last `window` observations."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (),
+                 buckets: tuple = LATENCY_BUCKETS_S, window: int = 2048):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = buckets
+        self.window = window
+        if not labelnames: self._default = self.labels()
+
+    def _new_child(self):
+        return _Histogram(self.buckets, self.window)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def quantiles(self, qs: tuple = QUANTILES) -> dict:
+        return self._default.quantiles(qs)
+
+    def render(self) -> list:
+        lines = super().render()
+        # Windowed quantiles as a separate gauge family, since a histogram family can't carry them.
+        lines += [f"# HELP {self.name}_recent Quantiles of the last {self.window} observations in this worker.",
+                  f"# TYPE {self.name}_recent gauge"]
+        for values, child in self._children.items():
+            for q, v in child.quantiles().items():
+                lines.append(f"{self.name}_recent{_labels(self.labelnames, values, [('quantile', q)])} {v}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "ielts_stage_seconds", "Time spent in each stage of a turn.", ("stage", )))
+TURN_LATENCY_SECONDS = REGISTRY.register(Histogram(
+    "ielts_turn_latency_seconds", "End of candidate speech to first examiner audio sent."))
+TURNS_TOTAL = REGISTRY.register(Counter("ielts_turns_total", "Candidate turns handled."))
+AUDIO_FRAMES_TOTAL = REGISTRY.register(Counter("ielts_audio_frames_total", "VAD frames received from clients."))
+LLM_PROMPT_TOKENS = REGISTRY.register(Histogram(
+    "ielts_llm_prompt_tokens", "Input tokens sent to the LLM per request, cached ones included.", buckets=TOKEN_BUCKETS))
+LLM_TOKENS_TOTAL = REGISTRY.register(Counter(
+    "ielts_llm_tokens_total", "LLM tokens by kind: prompt (all input), cached (input served from the context cache), output.", ("kind", )))
+PROVIDER_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "ielts_provider_queue_depth", "Requests waiting for a free slot, per upstream provider.", ("provider", )))
+PROVIDER_IN_FLIGHT = REGISTRY.register(Gauge(
+    "ielts_provider_in_flight", "Requests holding a slot, per upstream provider.", ("provider", )))
+PROVIDER_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "ielts_provider_wait_seconds", "Time a request waited for a provider slot.", ("provider", )))
+PROVIDER_REJECTED_TOTAL = REGISTRY.register(Counter(
+    "ielts_provider_rejected_total", "Requests turned away because the provider's queue was full or its deadline passed.", ("provider", )))
+PROVIDER_TIMEOUTS_TOTAL = REGISTRY.register(Counter(
+    "ielts_provider_timeouts_total", "Requests that missed their deadline.", ("provider", )))
+PROVIDER_HEDGED_TOTAL = REGISTRY.register(Counter(
+    "ielts_provider_hedged_total", "Second requests started because the first one was slow.", ("provider", )))
+
+
+class span:
+    """`with span("stt"):` records the block's duration under ielts_stage_seconds{stage="stt"}."""
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, stage: str):
+        self.histogram = STAGE_SECONDS.labels(stage)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class SessionMetrics:
+    """Per-session turn latencies, plus the timestamps of the turn currently in flight."""
+
+    def __init__(self, window: int = 256):
+        self.turn_latencies = _Histogram(LATENCY_BUCKETS_S, window)
+        self.speech_end = None   # perf_counter of the last voiced frame of the candidate's turn
+        self._awaiting_audio = False
+
+    def end_of_speech(self, speech_end: float):
+        self.speech_end = speech_end
+        self._awaiting_audio = True
+        TURNS_TOTAL.inc()
+
+    def first_audio(self):
+        """Called on every examiner audio send; returns the turn latency for the first one after end of speech."""
+        if not self._awaiting_audio: return None
+        self._awaiting_audio = False
+        latency = time.perf_counter() - self.speech_end
+        TURN_LATENCY_SECONDS.observe(latency)
+        self.turn_latencies.observe(latency)
+        return latency
+
+    def summary(self) -> dict:
+        return {"turns": self.turn_latencies.count,
+                **{f"p{round(q * 100)}_s": round(v, 3) for q, v in self.turn_latencies.quantiles().items()}}
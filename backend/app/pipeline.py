@@ -0,0 +1,120 @@
+# backend/app/pipeline.py
+#
+# Pipelined examiner turn: Gemini tokens are split into sentences as they stream in,
+# each sentence is synthesized concurrently, and the audio is pushed to the client in
+# order as soon as it is ready. Time-to-first-audio becomes roughly "first sentence"
+# instead of "whole LLM reply + whole TTS".
+
+import asyncio
+import re
+
+PART_1_END_PHRASE = "alright, that's the end of part 1"
+PREP_END_PHRASE = "your preparation time is up"
+
+SYSTEM_TAG_RE = re.compile(r'\[SYSTEM:.*?\]', re.DOTALL)
+CUE_CARD_RE = re.compile(r'\[CUE_CARD_(START|END)\]|\*|_')
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])["\')\]*_]*\s+|\n+')
+
+
+def detect_transition(text: str):
+    """Returns the timer the client should start after this turn's audio, if any."""
+    lower_text = text.lower()
+    if PART_1_END_PHRASE in lower_text: return "prep_timer"
+    if PREP_END_PHRASE in lower_text: return "speak_timer"
+    return None
+
+
+def text_for_speech(text: str, strip_cue_card: bool) -> str:
+    text = SYSTEM_TAG_RE.sub('', text)
+    if strip_cue_card: text = CUE_CARD_RE.sub('', text)
+    return text.strip()
+
+
+class SentenceSplitter:
+    """Accumulates streamed text and emits complete sentences. Never splits inside a [...] tag."""
+
+    def __init__(self, min_chars: int = 20):
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, text: str) -> list:
+        self.buffer += text
+        sentences = []
+        pos = 0
+        while (match := SENTENCE_END_RE.search(self.buffer, pos)):
+            candidate = self.buffer[:match.end()]
+            # Inside a [SYSTEM: ...] / [CUE_CARD_*] tag, or too short to be worth a TTS call: keep going.
+            if candidate.count('[') > candidate.count(']') or len(candidate.strip()) < self.min_chars:
+                pos = match.end()
+                continue
+            sentences.append(candidate)
+            self.buffer = self.buffer[match.end():]
+            pos = 0
+        return sentences
+
+    def flush(self) -> list:
+        rest, self.buffer = self.buffer, ""
+        return [rest] if rest.strip() else []
+
+
+def speech_sentences(text: str) -> list:
+    """The cleaned sentences ExaminerTurn would synthesize for `text`, e.g. for cache prewarming."""
+    splitter = SentenceSplitter()
+    sentences = splitter.feed(text) + splitter.flush()
+    strip_cue_card = detect_transition(text) == "prep_timer"
+    return [speech for speech in (text_for_speech(s, strip_cue_card) for s in sentences) if speech]
+
+
+class ExaminerTurn:
+    def __init__(self, synthesize, send_audio, max_concurrent_tts: int = 3):
+        self.synthesize = synthesize
+        self.send_audio = send_audio
+        self.max_concurrent_tts = max_concurrent_tts
+        self.text = ""
+        self.transition = None
+
+    async def run(self, text_stream, on_text_complete=None) -> str:
+        """Consumes the text stream, speaks it sentence by sentence and returns the full text.
+
+        `on_text_complete(text, transition)` is awaited once the LLM has finished, before the
+        remaining audio has been sent, so the transcript reaches the client early.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_tts)
+        ordered = asyncio.Queue()
+        splitter = SentenceSplitter()
+
+        async def synthesize(sentence):
+            async with semaphore:
+                return await self.synthesize(sentence)
+
+        async def sender():
+            while (task := await ordered.get()) is not None:
+                audio = await task
+                if audio: await self.send_audio(audio, last=False)
+            await self.send_audio(b"", last=True)
+
+        def schedule(sentences):
+            for sentence in sentences:
+                # The transition phrase precedes the cue card, so it is known before the markers are spoken.
+                self.transition = self.transition or detect_transition(self.text)
+                speech = text_for_speech(sentence, strip_cue_card=self.transition == "prep_timer")
+                if speech: ordered.put_nowait(asyncio.create_task(synthesize(speech)))
+
+        sender_task = asyncio.create_task(sender())
+        try:
+            async for chunk in text_stream:
+                self.text += chunk
+                schedule(splitter.feed(chunk))
+            schedule(splitter.flush())
+            self.text = self.text.strip()
+            self.transition = self.transition or detect_transition(self.text)
+            if on_text_complete: await on_text_complete(self.text, self.transition)
+            ordered.put_nowait(None)
+            await sender_task
+        finally:
+            if not sender_task.done():
+                sender_task.cancel()
+                while not ordered.empty():
+                    task = ordered.get_nowait()
+                    if task: task.cancel()
+        return self.text
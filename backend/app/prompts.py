@@ -1,4 +1,14 @@
 # Prompts from your ai_examiner/prompts.py
+
+# Fixed examiner lines. They are spoken verbatim, so their audio can be cached and prewarmed.
+GREETING_PHRASE = "Hi. I'm your Mock IELTS speaking examiner. I will be your examiner for the speaking part of the IELTS exam. This test will be recorded. To start, could you please tell me a little about yourself?"
+PART_1_END_TRANSITION = "Alright, that's the end of Part 1. Now we will move on to Part 2."
+PREP_TIME_START_PHRASE = "Your one minute of preparation time begins now."
+PREP_TIME_UP_PHRASE = "Your preparation time is up. Please start speaking now."
+# Said instead of a model reply when the examiner model is overloaded.
+BUSY_REPLY = "I'm sorry, could you give me a moment? Please say that again."
+FIXED_EXAMINER_PHRASES = [GREETING_PHRASE, PART_1_END_TRANSITION, PREP_TIME_START_PHRASE, PREP_TIME_UP_PHRASE, BUSY_REPLY]
+
 SYSTEM_PROMPT = """
 # [MASTER PROMPT: IELTS Speaking Examiner Simulation]
 
@@ -126,3 +136,18 @@ SYSTEM_PROMPT = """
 }
 [EVALUATION_JSON_END]
 """
+
+# System prompt for the background scorer: one part of the test, one criterion per request.
+SCORING_PROMPT = """
+You are a certified IELTS Speaking examiner marking one part of a speaking test against one
+assessment criterion. You will receive the criterion, the part of the test, the JSON fields to
+fill in, and the transcript of that part: the examiner's questions and the candidate's answers,
+transcribed by speech recognition.
+
+- Judge only the criterion you are given, using the official IELTS band descriptors.
+- Base every comment on what the candidate actually said; quote short examples where useful.
+- For Pronunciation, judge from the transcript as best you can (recognition errors, fillers,
+  fragments) and say so where the evidence is thin.
+- "score" is a number from 1.0 to 9.0 in steps of 0.5.
+- Reply with ONLY the JSON object, no other text.
+"""
@@ -0,0 +1,119 @@
+# backend/app/rescore.py
+#
+# Batch re-scoring of archived exams (see archive.py), e.g. after a change to the
+# scoring prompt or model. Each session runs in a worker process: the candidate's
+# recorded answers are transcribed again, the exam is scored part by part with the
+# same ExamScorer the live server uses, and the result is written next to the
+# original evaluation as <session_id>.rescore.json. Run from backend/:
+#
+#   python -m app.rescore --archive-dir /var/lib/ielts/archive [--sessions ID ...] [--workers N]
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from .archive import list_sessions, load_events, load_audio
+from .conversation import EXAM_PARTS
+from .gateway import ProviderGateway
+from .logs import log
+from .scoring import ExamScorer, create_scoring_model
+
+
+def _band(evaluation):
+    return evaluation.get("overall_band_score") if evaluation else None
+
+
+async def _transcribe(stt, directory: str, session_id: str, event: dict) -> str:
+    # An answer without audio (silence, or recorded before it was cut off) keeps its transcript.
+    if not event.get("audio"): return event["text"]
+    pcm = await asyncio.to_thread(load_audio, directory, session_id, event["audio"])
+    return await stt.transcribe(pcm) or event["text"]
+
+
+async def _rescore(directory: str, session_id: str, options: dict) -> dict:
+    import google.generativeai as genai
+    from .stt import create_stt_provider
+
+    started = time.perf_counter()
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    events = load_events(directory, session_id)
+    answers = [event for event in events if event["event"] == "candidate"]
+    original = next((event["data"] for event in reversed(events) if event["event"] == "evaluation"), None)
+
+    transcripts = [answer["text"] for answer in answers]
+    if not options["keep_transcripts"]:
+        deepgram_client = None
+        if options["stt"] != "fake":
+            from deepgram import AsyncDeepgramClient
+            deepgram_client = AsyncDeepgramClient()
+        stt = create_stt_provider(options["stt"], deepgram_client, ProviderGateway.from_env("stt", 8, 1000, 60.0, retries=1))
+        transcripts = await asyncio.gather(*(_transcribe(stt, directory, session_id, answer) for answer in answers))
+
+    texts = iter(transcripts)
+    turns = [["model" if event["event"] == "examiner" else "user",
+              event["text"] if event["event"] == "examiner" else next(texts), EXAM_PARTS[event["state"]]]
+             for event in events if event["event"] in ("examiner", "candidate")]
+
+    scorer = ExamScorer(create_scoring_model(options["model"]), ProviderGateway.from_env("scoring", 8, 1000, 120.0))
+    try:
+        scorer.score_finished_parts("ENDED", turns)
+        evaluation = await scorer.finish(turns, lambda index, section: asyncio.sleep(0))
+    finally:
+        scorer.close()
+
+    result = {"session_id": session_id, "answers": len(answers), "original_evaluation": original,
+              "evaluation": evaluation, "transcripts": transcripts}
+    with open(os.path.join(options["out"] or directory, f"{session_id}.rescore.json"), "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    return {"session": session_id, "answers": len(answers), "original": _band(original), "new": _band(evaluation),
+            "seconds": time.perf_counter() - started}
+
+
+def rescore_session(directory: str, session_id: str, options: dict) -> dict:
+    """Runs in a worker process; one event loop per session."""
+    load_dotenv()
+    return asyncio.run(_rescore(directory, session_id, options))
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Re-transcribe and re-score archived exams.")
+    parser.add_argument("--archive-dir", default=os.getenv("ARCHIVE_DIR") or None, required=not os.getenv("ARCHIVE_DIR"),
+                        help="Default is ARCHIVE_DIR.")
+    parser.add_argument("--sessions", nargs="+", help="Session ids; default is every session in the archive.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Sessions scored in parallel, one process each.")
+    parser.add_argument("--stt", default="deepgram", choices=["deepgram", "fake"])
+    parser.add_argument("--keep-transcripts", action="store_true", help="Score the archived transcripts as they are.")
+    parser.add_argument("--model", default=os.getenv("GEMINI_MODEL", "gemini-2.5-flash"))
+    parser.add_argument("--out", help="Directory for the .rescore.json files; default is the archive directory.")
+    args = parser.parse_args()
+
+    sessions = args.sessions or list_sessions(args.archive_dir)
+    if not sessions:
+        print(f"No sessions in {args.archive_dir}.")
+        return
+    if args.out: os.makedirs(args.out, exist_ok=True)
+    options = {"stt": args.stt, "keep_transcripts": args.keep_transcripts, "model": args.model, "out": args.out}
+
+    print(f"{'session':<34} {'answers':>8} {'original':>9} {'new':>6} {'s':>7}")
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(sessions)))) as pool:
+        futures = {pool.submit(rescore_session, args.archive_dir, session_id, options): session_id for session_id in sessions}
+        for future in as_completed(futures):
+            try:
+                row = future.result()
+            except Exception as e:
+                failed += 1
+                log("RESCORE", f"Session {futures[future]} failed: {e!r}", "ERROR")
+                continue
+            print(f"{row['session']:<34} {row['answers']:>8} {row['original'] or '-':>9} {row['new'] or '-':>6} {row['seconds']:>7.1f}")
+    print(f"{len(sessions) - failed} of {len(sessions)} sessions re-scored.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# backend/app/scoring.py
+#
+# Incremental evaluation. As each part of the test finishes, its transcript is scored
+# in the background, one request per assessment criterion, and the results are saved
+# with the session. When the test ends only the last part is left to score; each
+# criterion's section is merged and pushed as soon as all its parts are in, and the
+# final report is assembled in the template from prompts.py without one large model
+# call. Every reply is validated and, if unusable, retried with the reason attached.
+
+import asyncio
+import json
+import math
+
+import google.generativeai as genai
+
+from .conversation import EXAM_PARTS, summarize_part
+from .gateway import ProviderBusy
+from .logs import log
+from .metrics import span
+from .prompts import SYSTEM_PROMPT, SCORING_PROMPT
+
+# The report template is the example JSON at the end of the system prompt.
+EVALUATION_TEMPLATE = json.loads(SYSTEM_PROMPT.rsplit("[EVALUATION_JSON_START]", 1)[1].split("[EVALUATION_JSON_END]")[0])
+SECTION_TITLES = [section["title"] for section in EVALUATION_TEMPLATE["sections"]]
+TEMPLATE_SECTIONS = {section["title"]: section for section in EVALUATION_TEMPLATE["sections"]}
+# final_suggestions keys follow the section order; Pronunciation has none.
+SUGGESTION_KEYS = dict(zip(SECTION_TITLES, EVALUATION_TEMPLATE["final_suggestions"]))
+
+SCORED_PARTS = (1, 2, 3)
+PART_NAMES = {1: "Part 1 (introduction and interview)", 2: "Part 2 (long turn and follow-up question)", 3: "Part 3 (discussion)"}
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def round_band(score: float) -> float:
+    """IELTS rounding to the nearest half band, with quarters rounding up."""
+    return math.floor(score * 2 + 0.5) / 2
+
+
+def create_scoring_model(model_name: str):
+    return genai.GenerativeModel(model_name, system_instruction=SCORING_PROMPT,
+                                 generation_config={"response_mime_type": "application/json", "temperature": 0.2})
+
+
+def parse_json_reply(text: str):
+    """The JSON object in a model reply, tolerating code fences or tags around it."""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start: raise ValueError("no JSON object in the reply")
+    return json.loads(text[start:end + 1])
+
+
+# --- Validation ---
+def _check_score(value, where: str) -> float:
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{where} is not a number: {value!r}") from None
+    if not 1.0 <= score <= 9.0: raise ValueError(f"{where} {score} is outside 1.0-9.0")
+    return round_band(score)
+
+
+def _check_feedback(group, expected: dict, where: str):
+    if not isinstance(group, dict) or set(group) != set(expected):
+        raise ValueError(f"{where} must have exactly the keys {sorted(expected)}")
+    for key, value in group.items():
+        if not isinstance(value, str) or not value.strip(): raise ValueError(f"{where}.{key} must be a non-empty string")
+
+
+def validate_assessment(data, title: str) -> dict:
+    """Checks one criterion's assessment of one part; returns it with the score rounded to a half band."""
+    if not isinstance(data, dict): raise ValueError("reply is not a JSON object")
+    for group in ("strengths", "improvements"):
+        _check_feedback(data.get(group), TEMPLATE_SECTIONS[title][group], group)
+    suggestion = data.get("suggestion")
+    if not isinstance(suggestion, str) or not suggestion.strip(): raise ValueError("suggestion must be a non-empty string")
+    return {"score": _check_score(data.get("score"), "score"), "strengths": data["strengths"],
+            "improvements": data["improvements"], "suggestion": suggestion.strip()}
+
+
+def validate_evaluation(report) -> dict:
+    """Checks a full report against EVALUATION_TEMPLATE; raises ValueError naming the first problem."""
+    if not isinstance(report, dict): raise ValueError("evaluation is not a JSON object")
+    _check_score(report.get("overall_band_score"), "overall_band_score")
+    sections = report.get("sections")
+    if not isinstance(sections, list) or [s.get("title") if isinstance(s, dict) else None for s in sections] != SECTION_TITLES:
+        raise ValueError(f"sections must be {SECTION_TITLES}")
+    for section in sections:
+        _check_score(section.get("score"), f"{section['title']} score")
+        for group in ("strengths", "improvements"):
+            _check_feedback(section.get(group), TEMPLATE_SECTIONS[section["title"]][group], f"{section['title']} {group}")
+    _check_feedback(report.get("final_suggestions"), EVALUATION_TEMPLATE["final_suggestions"], "final_suggestions")
+    return report
+
+
+# --- Requests and merging ---
+def part_transcript(turns: list, part: int):
+    """The part as examiner questions and verbatim candidate answers, and the candidate's word count."""
+    part_turns = [turn for turn in turns if turn[2] == part]
+    summary = next((text for role, text, _ in part_turns if role == "summary"), None)
+    lines = (summary if summary is not None else summarize_part(part, part_turns)).split("\n")[1:]
+    words = sum(len(line.split()) - 1 for line in lines if line.startswith("Candidate: "))
+    return "\n".join(lines), words
+
+
+def assessment_request(part: int, title: str, transcript: str) -> str:
+    template = TEMPLATE_SECTIONS[title]
+    fields = {"score": "[1.0 - 9.0]", "strengths": template["strengths"], "improvements": template["improvements"],
+              "suggestion": "[One concrete, actionable tip for this criterion]"}
+    return f"Criterion: {title}\nPart: {PART_NAMES[part]}\nJSON fields to fill in:\n{json.dumps(fields, indent=2)}\n\nTranscript:\n{transcript}"
+
+
+def merge_section(title: str, by_part: dict):
+    """`by_part` maps part -> (candidate words, assessment). Returns the template section, with the
+    score weighted by how much the candidate said in each part, and the weakest part's suggestion."""
+    weights = {part: max(words, 1) for part, (words, _) in by_part.items()}
+    score = round_band(sum(a["score"] * weights[part] for part, (_, a) in by_part.items()) / sum(weights.values()))
+    ordered = sorted(by_part.items())
+
+    def notes(group, key):
+        if len(ordered) == 1: return ordered[0][1][1][group][key]
+        return " ".join(f"Part {part}: {a[group][key]}" for part, (_, a) in ordered)
+
+    template = TEMPLATE_SECTIONS[title]
+    section = {"title": title, "score": f"{score:.1f}",
+               "strengths": {key: notes("strengths", key) for key in template["strengths"]},
+               "improvements": {key: notes("improvements", key) for key in template["improvements"]}}
+    weakest = min(ordered, key=lambda item: item[1][1]["score"])[1][1]
+    return section, weakest["suggestion"]
+
+
+def merge_report(sections: dict, suggestions: dict) -> dict:
+    overall = round_band(sum(float(sections[title]["score"]) for title in SECTION_TITLES) / len(SECTION_TITLES))
+    return {"overall_band_score": f"{overall:.1f}", "sections": [sections[title] for title in SECTION_TITLES],
+            "final_suggestions": {key: suggestions[title] for title, key in SUGGESTION_KEYS.items()}}
+
+
+class ExamScorer:
+    """Scores each finished part of one exam in the background and merges the results at the end."""
+
+    def __init__(self, model, gateway, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.model = model
+        self.gateway = gateway  # a ProviderGateway shared by every session's scoring requests
+        self.max_attempts = max_attempts
+        self.assessments = {}  # part -> {"words": n, "criteria": {title: assessment}}
+        self._tasks = {}       # (part, title) -> task
+
+    def snapshot(self) -> dict:
+        return {str(part): entry for part, entry in self.assessments.items()}
+
+    def restore(self, snapshot: dict):
+        self.assessments = {int(part): entry for part, entry in snapshot.items()}
+
+    def score_finished_parts(self, exam_state: str, turns: list, urgent: bool = False):
+        """Starts scoring every part before the current one that isn't scored or being scored yet.
+        Urgent requests (the candidate is waiting for the result) don't queue for a gateway slot."""
+        for part in SCORED_PARTS:
+            if part >= EXAM_PARTS[exam_state]: break
+            done = self.assessments.get(part, {}).get("criteria", {})
+            # A criterion whose earlier attempts all failed (e.g. the gateway was busy) is tried again.
+            todo = [title for title in SECTION_TITLES if title not in done
+                    and not ((task := self._tasks.get((part, title))) and not task.done())]
+            if not todo: continue
+            transcript, words = part_transcript(turns, part)
+            if not words: continue
+            self.assessments.setdefault(part, {"words": words, "criteria": {}})
+            log("SCORING", f"Scoring Part {part} in the background.", words=words)
+            for title in todo:
+                self._tasks[(part, title)] = asyncio.create_task(self._assess(part, title, transcript, urgent))
+
+    async def _assess(self, part: int, title: str, transcript: str, urgent: bool = False):
+        request = message = assessment_request(part, title, transcript)
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                with span("scoring"):
+                    response = await self.gateway.call(self.model.generate_content_async, message, urgent=urgent)
+                assessment = validate_assessment(parse_json_reply(response.text), title)
+                self.assessments[part]["criteria"][title] = assessment
+                return assessment
+            except ProviderBusy as e:
+                log("SCORING", f"Part {part} {title}: not sent, retried at a later turn: {e}", "WARNING")
+                return None
+            except Exception as e:
+                log("SCORING", f"Part {part} {title}: attempt {attempt} failed: {e}", "WARNING")
+                message = f"{request}\n\nYour previous reply could not be used ({e}). Reply again with only the corrected JSON object."
+        log("SCORING", f"Part {part} {title}: no usable assessment after {self.max_attempts} attempts.", "ERROR")
+        return None
+
+    async def finish(self, turns: list, on_section):
+        """Scores what is left, calls `await on_section(index, section)` as each section is complete,
+        and returns the merged report, or None if some criterion couldn't be scored at all."""
+        self.score_finished_parts("ENDED", turns, urgent=True)
+
+        async def merge(title):
+            await asyncio.gather(*(task for (_, t), task in self._tasks.items() if t == title))
+            by_part = {part: (entry["words"], entry["criteria"][title])
+                       for part, entry in self.assessments.items() if title in entry["criteria"]}
+            return title, merge_section(title, by_part) if by_part else None
+
+        sections, suggestions = {}, {}
+        for next_section in asyncio.as_completed([merge(title) for title in SECTION_TITLES]):
+            title, merged = await next_section
+            if merged is None: continue
+            sections[title], suggestions[title] = merged
+            await on_section(SECTION_TITLES.index(title), sections[title])
+        if len(sections) < len(SECTION_TITLES): return None
+        return validate_evaluation(merge_report(sections, suggestions))
+
+    def close(self):
+        for task in self._tasks.values(): task.cancel()
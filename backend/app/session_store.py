@@ -0,0 +1,132 @@
+# backend/app/session_store.py
+#
+# Externalized exam session state. A session is saved as a compact snapshot (zlib'd
+# JSON) at every turn boundary, so a candidate whose WebSocket drops can reconnect to
+# any worker process and pick the test up where it stopped.
+
+import abc
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+
+from .logs import log
+
+SNAPSHOT_VERSION = 2
+DEFAULT_SESSION_TTL_S = 3600
+
+
+def encode_snapshot(snapshot: dict) -> bytes:
+    data = json.dumps({"v": SNAPSHOT_VERSION, **snapshot}, separators=(",", ":"), ensure_ascii=False)
+    return zlib.compress(data.encode("utf-8"), 6)
+
+
+def decode_snapshot(blob: bytes):
+    """Returns the snapshot dict, or None if it is unreadable or from another snapshot version."""
+    try:
+        snapshot = json.loads(zlib.decompress(blob).decode("utf-8"))
+    except (zlib.error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        log("SESSION STORE", f"Discarding unreadable snapshot: {e}", "ERROR")
+        return None
+    if snapshot.pop("v", None) != SNAPSHOT_VERSION: return None
+    return snapshot
+
+
+class SessionStore(abc.ABC):
+    """Base class: async load/save/delete of session snapshots keyed by session id."""
+
+    def __init__(self, ttl_s: float = DEFAULT_SESSION_TTL_S):
+        self.ttl_s = ttl_s
+
+    async def load(self, session_id: str):
+        blob = await self._get(session_id)
+        return decode_snapshot(blob) if blob is not None else None
+
+    async def save(self, session_id: str, snapshot: dict):
+        await self._put(session_id, encode_snapshot(snapshot), time.time() + self.ttl_s)
+
+    @abc.abstractmethod
+    async def delete(self, session_id: str):
+        """Removes the snapshot, if there is one."""
+
+    @abc.abstractmethod
+    async def _get(self, session_id: str):
+        """The stored blob, or None if it is missing or expired."""
+
+    @abc.abstractmethod
+    async def _put(self, session_id: str, blob: bytes, expires_at: float):
+        """Stores the blob, replacing any earlier one, until `expires_at` (time.time())."""
+
+    def close(self):
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    """Snapshots live in this process only: survives reconnects, not other workers or restarts."""
+
+    def __init__(self, ttl_s: float = DEFAULT_SESSION_TTL_S):
+        super().__init__(ttl_s)
+        self._sessions = {}  # session_id -> (blob, expires_at)
+
+    async def _get(self, session_id: str):
+        entry = self._sessions.get(session_id)
+        if entry is None: return None
+        if entry[1] < time.time():
+            del self._sessions[session_id]
+            return None
+        return entry[0]
+
+    async def _put(self, session_id: str, blob: bytes, expires_at: float):
+        self._sessions[session_id] = (blob, expires_at)
+
+    async def delete(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+
+class SqliteSessionStore(SessionStore):
+    """Snapshots in a local SQLite file (WAL mode), shared by every worker process on the host."""
+
+    def __init__(self, path: str, ttl_s: float = DEFAULT_SESSION_TTL_S):
+        super().__init__(ttl_s)
+        self.path = path
+        if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, snapshot BLOB NOT NULL, expires_at REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+        self._db.execute("DELETE FROM sessions WHERE expires_at < ?", (time.time(), ))
+
+    def _execute(self, sql: str, params: tuple):
+        with self._lock:
+            return self._db.execute(sql, params).fetchone()
+
+    async def _get(self, session_id: str):
+        row = await asyncio.to_thread(self._execute, "SELECT snapshot FROM sessions WHERE id = ? AND expires_at >= ?", (session_id, time.time()))
+        return row[0] if row else None
+
+    async def _put(self, session_id: str, blob: bytes, expires_at: float):
+        await asyncio.to_thread(self._execute, "INSERT OR REPLACE INTO sessions (id, snapshot, expires_at) VALUES (?, ?, ?)", (session_id, blob, expires_at))
+
+    async def delete(self, session_id: str):
+        await asyncio.to_thread(self._execute, "DELETE FROM sessions WHERE id = ?", (session_id, ))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def create_session_store(spec: str, ttl_s: float = DEFAULT_SESSION_TTL_S) -> SessionStore:
+    """`memory`, `sqlite` (a file in the temp dir) or `sqlite:///path/to/sessions.db`."""
+    if spec == "memory":
+        return InMemorySessionStore(ttl_s)
+    if spec == "sqlite":
+        return SqliteSessionStore(os.path.join(tempfile.gettempdir(), "ielts_sessions.db"), ttl_s)
+    if spec.startswith("sqlite:///"):
+        return SqliteSessionStore(spec[len("sqlite:///"):], ttl_s)
+    raise ValueError(f"Unknown SESSION_STORE '{spec}'. Use memory, sqlite or sqlite:///path.")
@@ -0,0 +1,273 @@
+# backend/app/stt.py
+#
+# Pluggable speech-to-text. Every provider offers batch transcription of a finished
+# utterance and a stream that is fed PCM while the candidate is still speaking, so the
+# final transcript is ready soon after the endpoint is detected.
+#
+#   STT_PROVIDER=deepgram-streaming  (default) Deepgram live transcription
+#   STT_PROVIDER=deepgram            Deepgram pre-recorded transcription after silence
+#   STT_PROVIDER=fake                Local stand-in with configurable latency, no network
+#
+# Given a ProviderGateway, batch requests go through it and a stream holds one of its
+# slots for the whole utterance.
+
+import abc
+import asyncio
+import contextlib
+import io
+import random
+import wave
+
+from deepgram.core.api_error import ApiError
+
+from .vad import VAD_SAMPLE_RATE
+from .gateway import ProviderBusy
+from .logs import log
+
+PCM_BYTES_PER_SECOND = VAD_SAMPLE_RATE * 2
+MIN_TRANSCRIBE_BYTES = 2048
+STREAM_FINISH_TIMEOUT_S = 5.0
+DEEPGRAM_FINALIZE_TIMEOUT_S = 2.0
+
+
+def pcm_to_wav(pcm_data) -> bytes:
+    with io.BytesIO() as in_memory_wav:
+        with wave.open(in_memory_wav, 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(VAD_SAMPLE_RATE)
+            wf.writeframes(pcm_data)
+        return in_memory_wav.getvalue()
+
+
+# --- Streams ---
+class SttStream(abc.ABC):
+    """One utterance. `send` never blocks; `finish` returns the final transcript, or None if the stream failed."""
+
+    def __init__(self, gateway=None):
+        self.gateway = gateway
+        self.interim = ""
+        self.finals = []
+        self.failed = False
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._guarded_run())
+
+    @property
+    def transcript(self) -> str:
+        return " ".join(t for t in self.finals if t).strip()
+
+    def send(self, pcm):
+        self._queue.put_nowait(bytes(pcm))
+
+    async def finish(self, timeout: float = STREAM_FINISH_TIMEOUT_S):
+        self._queue.put_nowait(None)
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            log("STT", "Stream did not finalize in time.", "WARNING")
+            self._task.cancel()
+            return None
+        return None if self.failed else self.transcript
+
+    def abort(self):
+        self._task.cancel()
+
+    async def _chunks(self):
+        while (chunk := await self._queue.get()) is not None:
+            yield chunk
+
+    async def _guarded_run(self):
+        try:
+            async with self.gateway.slot() if self.gateway else contextlib.nullcontext():
+                await self._run()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log("STT", f"Streaming transcription failed: {e}", "ERROR")
+            self.failed = True
+
+    @abc.abstractmethod
+    async def _run(self):
+        """Reads the utterance from _chunks() and appends final transcripts to `finals`."""
+
+
+class BufferedStream(SttStream):
+    # For providers without a streaming API: collect the utterance and transcribe it at the end.
+    def __init__(self, provider):
+        self.provider = provider
+        super().__init__()
+
+    async def _run(self):
+        buffer = bytearray()
+        async for chunk in self._chunks():
+            buffer.extend(chunk)
+        self.finals.append(await self.provider.transcribe(buffer))
+
+
+# --- Deepgram ---
+class DeepgramProvider:
+    def __init__(self, client, gateway=None):
+        self.client = client
+        self.gateway = gateway
+
+    def open_stream(self) -> SttStream:
+        return BufferedStream(self)
+
+    async def transcribe(self, pcm_data) -> str:
+        log("DEEPGRAM", "Entered transcribe_audio function.", "DEBUG")
+        try:
+            if len(pcm_data) < MIN_TRANSCRIBE_BYTES:
+                log("DEEPGRAM", "Audio data too short — skipping.")
+                return ""
+
+            wav_data = pcm_to_wav(pcm_data)
+            log("DEEPGRAM", "Sending audio to Deepgram for transcription...")
+
+            # Using the modern, simplified syntax with all arguments as keyword arguments
+            request = self.client.listen.v1.media.transcribe_file
+            options = dict(
+                request=wav_data,
+                model="nova-2",
+                punctuate=True,
+                smart_format=True,
+                language="en",
+                keywords=["IELTS:5", "examiner:3", "Sheldon:5"]
+            )
+            response = await (self.gateway.call(request, **options) if self.gateway else request(**options))
+
+            transcript = response.results.channels[0].alternatives[0].transcript.strip()
+            if transcript:
+                log("DEEPGRAM", f"Transcription successful: {transcript}")
+                return transcript
+            else:
+                log("DEEPGRAM", "Empty transcript — likely silence or bad API key.", "WARNING")
+                return ""
+
+        except ApiError as e:
+            log("DEEPGRAM", f"Deepgram API Error: {e.status_code} - {e.body}", "ERROR")
+            return ""
+        except ProviderBusy as e:
+            log("DEEPGRAM", f"Transcription not sent: {e}", "WARNING")
+            return ""
+        except Exception as e:
+            log("DEEPGRAM", f"Deepgram transcription error: {e}", "ERROR")
+            return ""
+
+
+class DeepgramLiveStream(SttStream):
+    def __init__(self, client, gateway=None):
+        self.client = client
+        self._finalized = asyncio.Event()
+        super().__init__(gateway)
+
+    def _on_message(self, message):
+        if getattr(message, "type", None) != "Results":
+            return
+        text = message.channel.alternatives[0].transcript.strip()
+        if message.is_final:
+            self.finals.append(text)
+            self.interim = ""
+            if getattr(message, "from_finalize", False):
+                self._finalized.set()
+        else:
+            self.interim = text
+
+    async def _run(self):
+        from deepgram.core.events import EventType
+        from deepgram.extensions.types.sockets import ListenV1ControlMessage, ListenV1MediaMessage
+
+        async with self.client.listen.v1.connect(
+            model="nova-2",
+            encoding="linear16",
+            sample_rate=str(VAD_SAMPLE_RATE),
+            channels="1",
+            language="en",
+            punctuate="true",
+            smart_format="true",
+            interim_results="true",
+        ) as connection:
+            connection.on(EventType.MESSAGE, self._on_message)
+            listener = asyncio.create_task(connection.start_listening())
+            try:
+                async for chunk in self._chunks():
+                    await connection.send_media(ListenV1MediaMessage(chunk))
+                # Finalize flushes whatever Deepgram still holds and marks the result from_finalize.
+                await connection.send_control(ListenV1ControlMessage(type="Finalize"))
+                await asyncio.wait_for(self._finalized.wait(), DEEPGRAM_FINALIZE_TIMEOUT_S)
+                await connection.send_control(ListenV1ControlMessage(type="CloseStream"))
+            finally:
+                listener.cancel()
+        log("DEEPGRAM", f"Streaming transcription complete: {self.transcript}")
+
+
+class DeepgramStreamingProvider(DeepgramProvider):
+    def open_stream(self) -> SttStream:
+        return DeepgramLiveStream(self.client, self.gateway)
+
+
+# --- Local fake ---
+FAKE_WORDS = ("I", "think", "that", "my", "hometown", "is", "really", "quite", "interesting", "because",
+              "there", "are", "many", "parks", "and", "people", "usually", "enjoy", "spending", "time")
+
+
+class FakeSttProvider:
+    """Offline stand-in: produces ~words_per_second words per second of audio after a simulated delay."""
+
+    def __init__(self, latency_s: float = 0.3, jitter_s: float = 0.05, processing_rtf: float = 0.05,
+                 finalize_latency_s: float = 0.08, words_per_second: float = 2.5, text: str = None, gateway=None):
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.processing_rtf = processing_rtf
+        self.finalize_latency_s = finalize_latency_s
+        self.words_per_second = words_per_second
+        self.text = text
+        self.gateway = gateway
+
+    def _delay(self, base: float) -> float:
+        return max(0.0, base + random.uniform(-self.jitter_s, self.jitter_s))
+
+    def _words(self, n_bytes: int) -> str:
+        if self.text is not None:
+            return self.text
+        n_words = int(n_bytes / PCM_BYTES_PER_SECOND * self.words_per_second)
+        return " ".join(FAKE_WORDS[i % len(FAKE_WORDS)] for i in range(n_words))
+
+    def open_stream(self) -> SttStream:
+        return FakeStream(self)
+
+    async def transcribe(self, pcm_data) -> str:
+        if len(pcm_data) < MIN_TRANSCRIBE_BYTES:
+            return ""
+        # Upload + model time grows with the utterance, on top of a fixed round trip.
+        delay = self._delay(self.latency_s) + len(pcm_data) / PCM_BYTES_PER_SECOND * self.processing_rtf
+        try:
+            await (self.gateway.call(asyncio.sleep, delay) if self.gateway else asyncio.sleep(delay))
+        except ProviderBusy as e:
+            log("STT", f"Transcription not sent: {e}", "WARNING")
+            return ""
+        return self._words(len(pcm_data))
+
+
+class FakeStream(SttStream):
+    def __init__(self, provider: FakeSttProvider):
+        self.provider = provider
+        super().__init__(provider.gateway)
+
+    async def _run(self):
+        received = 0
+        async for chunk in self._chunks():
+            received += len(chunk)
+            self.interim = self.provider._words(received)
+        await asyncio.sleep(self.provider._delay(self.provider.finalize_latency_s))
+        self.interim = ""
+        self.finals.append(self.provider._words(received) if received >= MIN_TRANSCRIBE_BYTES else "")
+
+
+def create_stt_provider(name: str, deepgram_client=None, gateway=None):
+    if name == "fake":
+        return FakeSttProvider(gateway=gateway)
+    if name == "deepgram":
+        return DeepgramProvider(deepgram_client, gateway)
+    if name == "deepgram-streaming":
+        return DeepgramStreamingProvider(deepgram_client, gateway)
+    raise ValueError(f"Unknown STT_PROVIDER: {name}")
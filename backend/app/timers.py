@@ -0,0 +1,131 @@
+# backend/app/timers.py
+#
+# One timer scheduler per process for the Part 2 prep and speaking deadlines. Each
+# deadline is an entry in a heap; a single task sleeps until the earliest one and
+# fires its callback, instead of every session looping on asyncio.sleep(1). Deadlines
+# are wall-clock epoch seconds, so the value saved with a session snapshot still
+# means the same moment after a reconnect to another worker or a restart.
+#
+# A timer may also ask for coarse resyncs: every `resync_s` its `on_resync` callback
+# gets the seconds remaining, so clients that count down locally can correct drift.
+
+import asyncio
+import heapq
+import itertools
+import time
+
+from .logs import log
+
+_FIRE, _RESYNC = 0, 1
+
+
+class Timer:
+    __slots__ = ("deadline", "callback", "resync_s", "on_resync", "cancelled", "fired", "task", "_scheduler")
+
+    def __init__(self, scheduler, deadline: float, callback, resync_s: float = 0, on_resync=None):
+        self.deadline = deadline
+        self.callback = callback
+        self.resync_s = resync_s
+        self.on_resync = on_resync
+        self.cancelled = False
+        self.fired = False
+        self.task = None  # the running callback once the deadline has passed
+        self._scheduler = scheduler
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.time())
+
+    def cancel(self, running: bool = False) -> bool:
+        """Cancels the timer if it hasn't fired. Returns False if it already had; with `running`,
+        a callback still in progress is cancelled too."""
+        if self.fired:
+            if running and self.task: self.task.cancel()
+            return False
+        if not self.cancelled:
+            self.cancelled = True
+            self._scheduler._pending -= 1
+        return True
+
+
+class TimerScheduler:
+    def __init__(self):
+        self._heap = []  # (when, seq, kind, timer); cancelled timers are dropped when they surface
+        self._seq = itertools.count()
+        self._pending = 0
+        self._tasks = set()
+        self._wakeup = None
+        self._worker = None
+
+    async def start(self):
+        if self._worker: return
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+            try: await self._worker
+            except asyncio.CancelledError: pass
+            self._worker = None
+        for task in list(self._tasks): task.cancel()
+
+    @property
+    def pending(self) -> int:
+        """Timers scheduled and neither fired nor cancelled."""
+        return self._pending
+
+    def schedule(self, deadline: float, callback, resync_s: float = 0, on_resync=None) -> Timer:
+        """Runs `await callback()` at `deadline` (epoch seconds) and, if `resync_s` is set,
+        `await on_resync(remaining_s)` every `resync_s` seconds until then."""
+        timer = Timer(self, deadline, callback, resync_s if on_resync else 0, on_resync)
+        self._pending += 1
+        self._push(deadline, _FIRE, timer)
+        if timer.resync_s and time.time() + timer.resync_s < deadline:
+            self._push(time.time() + timer.resync_s, _RESYNC, timer)
+        return timer
+
+    def _push(self, when: float, kind: int, timer: Timer):
+        earliest = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (when, next(self._seq), kind, timer))
+        if self._wakeup and (earliest is None or when < earliest): self._wakeup.set()
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(self._guard(coro))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _guard(self, coro):
+        try:
+            await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log("TIMER", f"Timer callback failed: {e!r}", "ERROR")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            when, _, kind, timer = self._heap[0]
+            delay = when - time.time()
+            if delay > 0:
+                # Sleep until the earliest entry, or until an earlier one is pushed.
+                self._wakeup.clear()
+                handle = loop.call_later(delay, self._wakeup.set)
+                try: await self._wakeup.wait()
+                finally: handle.cancel()
+                continue
+            heapq.heappop(self._heap)
+            if timer.cancelled or timer.fired: continue
+            if kind == _RESYNC:
+                self._spawn(timer.on_resync(timer.remaining()))
+                if when + timer.resync_s < timer.deadline:
+                    self._push(when + timer.resync_s, _RESYNC, timer)
+                continue
+            timer.fired = True
+            self._pending -= 1
+            timer.task = self._spawn(timer.callback())
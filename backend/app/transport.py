@@ -0,0 +1,96 @@
+# backend/app/transport.py
+#
+# WebSocket transport for the "/" endpoint. Clients that offer the binary subprotocol
+# send microphone PCM as binary frames and receive TTS audio the same way; control
+# messages stay JSON text in both modes. Clients that don't fall back to the original
+# base64-in-JSON protocol.
+
+import base64
+import json
+import struct
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from .logs import log
+
+BINARY_SUBPROTOCOL = "ielts.binary.v1"
+JSON_SUBPROTOCOL = "ielts.json.v1"
+
+# Binary frame header: kind (u8), flags (u8), reserved (u16), sequence number (u32), little-endian.
+FRAME_HEADER = struct.Struct("<BBHI")
+KIND_AUDIO_IN = 1   # client -> server, PCM16 mono at 16 kHz
+KIND_AUDIO_OUT = 2  # server -> client, one WAV file
+FLAG_LAST = 0x01    # last audio frame of an examiner turn
+
+
+def pack_frame(kind: int, seq: int, payload, flags: int = 0) -> bytes:
+    return FRAME_HEADER.pack(kind, flags, 0, seq & 0xFFFFFFFF) + payload
+
+
+def unpack_frame(data):
+    """Returns (kind, flags, seq, payload) where payload is a zero-copy memoryview."""
+    if len(data) < FRAME_HEADER.size:
+        raise ValueError(f"Binary frame too short: {len(data)} bytes")
+    kind, flags, _, seq = FRAME_HEADER.unpack_from(data)
+    return kind, flags, seq, memoryview(data)[FRAME_HEADER.size:]
+
+
+class AudioChannel:
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.binary = False
+        self.out_seq = 0
+        self.in_seq = None
+        self.lost_frames = 0
+        self.bad_frames = 0
+
+    async def accept(self):
+        offered = self.websocket.scope.get("subprotocols") or []
+        if BINARY_SUBPROTOCOL in offered:
+            self.binary = True
+            await self.websocket.accept(subprotocol=BINARY_SUBPROTOCOL)
+        elif JSON_SUBPROTOCOL in offered:
+            await self.websocket.accept(subprotocol=JSON_SUBPROTOCOL)
+        else:
+            await self.websocket.accept()
+        log("TRANSPORT", f"Client connected using {'binary' if self.binary else 'JSON/base64'} audio.")
+
+    async def receive(self):
+        """Returns (msg_type, data). For "audio_chunk", data is the raw PCM buffer; otherwise the parsed JSON dict.
+        Malformed binary frames are logged and skipped rather than ending the session."""
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes") is None: break
+            try:
+                kind, _, seq, payload = unpack_frame(message["bytes"])
+                if kind != KIND_AUDIO_IN:
+                    raise ValueError(f"Unexpected binary frame kind {kind}")
+            except ValueError as e:
+                self.bad_frames += 1
+                log("TRANSPORT", f"Dropping a malformed binary frame: {e}", "WARNING")
+                continue
+            if self.in_seq is not None and seq != (self.in_seq + 1) & 0xFFFFFFFF:
+                self.lost_frames += (seq - self.in_seq - 1) & 0xFFFFFFFF
+                log("TRANSPORT", f"Audio sequence gap: expected {self.in_seq + 1}, got {seq}.", "WARNING")
+            self.in_seq = seq
+            return "audio_chunk", payload
+        data = json.loads(message["text"])
+        msg_type = data.get("type")
+        if msg_type == "audio_chunk":
+            return msg_type, base64.b64decode(data["data"])
+        return msg_type, data
+
+    async def send_json(self, data: dict):
+        await self.websocket.send_json(data)
+
+    async def send_audio(self, audio_bytes: bytes, last: bool = True):
+        # An examiner turn may arrive as several WAV chunks; the client plays them in order and
+        # treats the turn as finished after the one flagged last (which may be empty).
+        seq = self.out_seq
+        self.out_seq += 1
+        if self.binary:
+            await self.websocket.send_bytes(pack_frame(KIND_AUDIO_OUT, seq, audio_bytes, FLAG_LAST if last else 0))
+        else:
+            await self.websocket.send_json({"type": "audio", "data": base64.b64encode(audio_bytes).decode("utf-8"), "last": last})
@@ -0,0 +1,124 @@
+# backend/app/tts_cache.py
+#
+# Content-addressed TTS cache. Audio is keyed by (normalized text, model_id, voice id,
+# output format) and kept in an in-memory LRU bounded by a byte budget, backed by an
+# on-disk tier that every worker process on the host shares.
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import unicodedata
+from collections import OrderedDict
+
+from .logs import log
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r'\s+', ' ', unicodedata.normalize("NFKC", text)).strip()
+
+
+class TtsCache:
+    def __init__(self, synthesize, model_id: str, voice_id: str, output_format: dict,
+                 memory_budget_bytes: int = 64 * 1024 * 1024, disk_dir: str = None):
+        self.synthesize = synthesize
+        self.model_id = model_id
+        self.voice_id = voice_id
+        self.output_format = output_format
+        self.memory_budget_bytes = memory_budget_bytes
+        self.disk_dir = disk_dir
+        self.memory_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._memory = OrderedDict()
+        self._inflight = {}
+        if disk_dir: os.makedirs(disk_dir, exist_ok=True)
+
+    def key(self, text: str) -> str:
+        material = json.dumps([normalize_text(text), self.model_id, self.voice_id, self.output_format], sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def stats(self) -> dict:
+        return {
+            "memory_hits": self.memory_hits, "disk_hits": self.disk_hits, "misses": self.misses,
+            "evictions": self.evictions, "memory_bytes": self.memory_bytes, "memory_entries": len(self._memory),
+        }
+
+    async def get(self, text: str) -> bytes:
+        key = self.key(text)
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return audio
+        # Concurrent requests for the same line (e.g. many sessions at the same stage) share one
+        # synthesis. It runs as its own task, so a caller that is cancelled only stops waiting.
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(self._load(key, text))
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task: del self._inflight[key]
+        if not task.cancelled(): task.exception()  # waiters re-raise it; don't warn when there are none
+
+    async def _load(self, key: str, text: str) -> bytes:
+        audio = await asyncio.to_thread(self._read_disk, key) if self.disk_dir else None
+        if audio is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            audio = await self.synthesize(text)
+            if not audio: return audio  # failures are not cached
+            # The disk write happens in the background; the caller gets the audio straight away.
+            if self.disk_dir: asyncio.get_running_loop().run_in_executor(None, self._write_disk, key, audio)
+        self._remember(key, audio)
+        return audio
+
+    def _remember(self, key: str, audio: bytes):
+        if len(audio) > self.memory_budget_bytes: return
+        self._memory[key] = audio
+        self.memory_bytes += len(audio)
+        while self.memory_bytes > self.memory_budget_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key + ".bin")
+
+    def _read_disk(self, key: str):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_disk(self, key: str, audio: bytes):
+        # Write-then-rename so other workers never see a partial file.
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log("TTS CACHE", f"Could not write {path}: {e}", "WARNING")
+            try: os.unlink(tmp_path)
+            except OSError: pass
+
+    async def prewarm(self, lines, concurrency: int = 4):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def warm(line):
+            async with semaphore:
+                await self.get(line)
+
+        await asyncio.gather(*(warm(line) for line in lines), return_exceptions=True)
+        log("TTS CACHE", f"Prewarmed {len(lines)} lines: {self.stats()}")
@@ -0,0 +1,254 @@
+# backend/app/vad.py
+#
+# Shared Silero VAD engine. Every live session submits its frames here instead of
+# calling the model on the event loop; a single worker thread runs them as batched
+# tensors and keeps the recurrent state of each session separately.
+#
+#   VAD_BACKEND=onnx   (default) ONNX Runtime + NumPy, model loaded from VAD_ONNX_PATH
+#   VAD_BACKEND=torch  TorchScript model from torch.hub
+#
+# Neither runtime is imported until its backend is created, so the ONNX path never
+# imports torch.
+
+import asyncio
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .logs import log
+
+VAD_SAMPLE_RATE = 16000
+VAD_FRAME_SAMPLES = 512  # Silero's native window at 16 kHz (32 ms)
+DEFAULT_ONNX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "silero_vad_v5.onnx")
+
+
+def pcm16_to_frames(pcm) -> np.ndarray:
+    """Converts little-endian PCM16 bytes into float32 frames of shape (n, 512)."""
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    n_frames = -(-len(samples) // VAD_FRAME_SAMPLES)
+    frames = np.zeros((n_frames, VAD_FRAME_SAMPLES), dtype=np.float32)
+    frames.reshape(-1)[:len(samples)] = samples
+    frames *= 1.0 / 32768.0
+    return frames
+
+
+# --- Torch (TorchScript) backend ---
+class SileroTorchBackend:
+    context_samples = 64
+
+    def __init__(self, num_threads: int = 1):
+        import torch
+        self.torch = torch
+        torch.set_num_threads(num_threads)
+        self.model, _ = torch.hub.load(
+            repo_or_dir='snakers4/silero-vad',
+            model='silero_vad',
+            force_reload=False,
+            trust_repo=True
+        )
+        if not hasattr(self.model, "_state"):
+            raise RuntimeError("Unsupported Silero VAD model: expected a v5 model with an explicit _state.")
+
+    def initial_state(self):
+        return self.torch.zeros(2, 1, 128), self.torch.zeros(1, self.context_samples)
+
+    def infer(self, frames: np.ndarray, states: list):
+        # The scripted model keeps its RNN state and audio context as attributes sized to
+        # the last batch. We stack the per-session states in, run once, and slice them out.
+        torch = self.torch
+        batch_size = len(states)
+        self.model._state = torch.cat([state for state, _ in states], dim=1)
+        self.model._context = torch.cat([context for _, context in states], dim=0)
+        self.model._last_sr = VAD_SAMPLE_RATE
+        self.model._last_batch_size = batch_size
+        with torch.no_grad():
+            probs = self.model(torch.from_numpy(frames), VAD_SAMPLE_RATE)
+        new_state, new_context = self.model._state, self.model._context
+        new_states = [(new_state[:, i:i + 1].clone(), new_context[i:i + 1].clone()) for i in range(batch_size)]
+        return probs.numpy().reshape(-1), new_states
+
+
+# --- ONNX Runtime backend ---
+class SileroOnnxBackend:
+    # Works with both the v5 export (input, state, sr) and the legacy v4 one (input, sr, h, c).
+    context_samples = 64
+
+    def __init__(self, model_path: str = None, num_threads: int = 1):
+        import onnxruntime
+        model_path = model_path or os.getenv("VAD_ONNX_PATH", DEFAULT_ONNX_PATH)
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.legacy = "h" in {i.name for i in self.session.get_inputs()}
+        self.sr = np.array(VAD_SAMPLE_RATE, dtype=np.int64)
+        self._default_state = None
+
+    def initial_state(self):
+        if self.legacy:
+            return np.zeros((2, 1, 64), dtype=np.float32), np.zeros((2, 1, 64), dtype=np.float32)
+        return np.zeros((2, 1, 128), dtype=np.float32), np.zeros((1, self.context_samples), dtype=np.float32)
+
+    def infer(self, frames: np.ndarray, states: list):
+        # State layout is (2, batch, hidden), so sessions are stacked and split on axis 1.
+        first = np.concatenate([a for a, _ in states], axis=1)
+        second = np.concatenate([b for _, b in states], axis=0 if not self.legacy else 1)
+        if self.legacy:
+            probs, h, c = self.session.run(None, {"input": frames, "sr": self.sr, "h": first, "c": second})
+            new_states = [(h[:, i:i + 1], c[:, i:i + 1]) for i in range(len(states))]
+        else:
+            # v5 expects the previous 64 samples of each stream in front of the window.
+            x = np.concatenate([second, frames], axis=1)
+            probs, state = self.session.run(None, {"input": x, "state": first, "sr": self.sr})
+            new_states = [(state[:, i:i + 1], x[i:i + 1, -self.context_samples:]) for i in range(len(states))]
+        return probs.reshape(-1), new_states
+
+    def __call__(self, audio, sr: int = VAD_SAMPLE_RATE) -> float:
+        # Drop-in for the old `VAD_MODEL(audio_tensor, sr).item()` on a single stream.
+        if sr != VAD_SAMPLE_RATE: raise ValueError(f"Only {VAD_SAMPLE_RATE} Hz is supported")
+        frame = np.asarray(audio, dtype=np.float32).reshape(1, -1)
+        probs, (self._default_state, ) = self.infer(frame, [self._default_state or self.initial_state()])
+        return float(probs[0])
+
+    def reset_states(self):
+        self._default_state = None
+
+
+VAD_BACKENDS = {"onnx": SileroOnnxBackend, "torch": SileroTorchBackend}
+
+
+# --- Micro-batching engine ---
+class _VadRequest:
+    __slots__ = ("session_id", "frames", "future")
+
+    def __init__(self, session_id, frames, future):
+        self.session_id = session_id
+        self.frames = frames
+        self.future = future
+
+
+class VadEngine:
+    def __init__(self, backend_factory=SileroOnnxBackend, max_batch_size: int = 64, max_wait_s: float = 0.002):
+        self.backend_factory = backend_factory
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_s
+        self.backend = None
+        self.frames_processed = 0
+        self.batches_processed = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vad")
+        self._states = {}
+        self._ids = itertools.count(1)
+        self._queue = None
+        self._carry = deque()
+        self._worker = None
+
+    async def start(self):
+        if self._worker: return
+        loop = asyncio.get_running_loop()
+        # The model is created on the worker thread so torch's thread settings apply there.
+        self.backend = await loop.run_in_executor(self._executor, self.backend_factory)
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        log("VAD", f"Engine started with {type(self.backend).__name__}.")
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+            try: await self._worker
+            except asyncio.CancelledError: pass
+            self._worker = None
+        self._executor.shutdown(wait=False)
+
+    def open_session(self) -> int:
+        session_id = next(self._ids)
+        self._states[session_id] = self.backend.initial_state()
+        return session_id
+
+    def close_session(self, session_id: int):
+        self._states.pop(session_id, None)
+
+    def reset_session(self, session_id: int):
+        if session_id in self._states:
+            self._states[session_id] = self.backend.initial_state()
+
+    @property
+    def active_sessions(self) -> int:
+        return len(self._states)
+
+    async def infer(self, session_id: int, frames: np.ndarray) -> np.ndarray:
+        """Returns one speech probability per (512,) float32 frame, in order."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_VadRequest(session_id, frames, future))
+        return await future
+
+    async def speech_prob(self, session_id: int, pcm) -> float:
+        probs = await self.infer(session_id, pcm16_to_frames(pcm))
+        return float(probs.max()) if len(probs) else 0.0
+
+    def _next_batch(self):
+        # One request per session per batch: a session's frames depend on its previous state.
+        batch, seen, deferred = [], set(), deque()
+        while len(batch) < self.max_batch_size:
+            if self._carry:
+                request = self._carry.popleft()
+            else:
+                try: request = self._queue.get_nowait()
+                except asyncio.QueueEmpty: break
+            if request.session_id in seen:
+                deferred.append(request)
+                continue
+            seen.add(request.session_id)
+            batch.append(request)
+        deferred.extend(self._carry)
+        self._carry = deferred
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._carry:
+                self._carry.append(await self._queue.get())
+                # Give other sessions a moment to join the batch; pointless with a single session.
+                if self.max_wait_s and len(self._states) > 1 and self._queue.empty():
+                    await asyncio.sleep(self.max_wait_s)
+            batch = self._next_batch()
+            batch = [r for r in batch if not r.future.cancelled()]
+            live = [r for r in batch if r.session_id in self._states]
+            for request in batch:
+                if request.session_id not in self._states:
+                    request.future.set_exception(KeyError(f"VAD session {request.session_id} is closed"))
+            if not live: continue
+            states = [self._states[r.session_id] for r in live]
+            try:
+                results, new_states = await loop.run_in_executor(
+                    self._executor, self._infer_batch, [r.frames for r in live], states
+                )
+            except Exception as e:
+                log("VAD", f"Batched inference failed: {e}", "ERROR")
+                for request in live:
+                    if not request.future.done(): request.future.set_exception(e)
+                continue
+            for request, probs, state in zip(live, results, new_states):
+                if request.session_id in self._states:
+                    self._states[request.session_id] = state
+                if not request.future.done():
+                    request.future.set_result(probs)
+
+    def _infer_batch(self, frame_lists, states):
+        # Runs on the worker thread. Step t batches frame t of every session that still has one.
+        states = list(states)
+        results = [np.empty(len(frames), dtype=np.float32) for frames in frame_lists]
+        steps = max(len(frames) for frames in frame_lists)
+        for t in range(steps):
+            active = [i for i, frames in enumerate(frame_lists) if t < len(frames)]
+            batch = np.stack([frame_lists[i][t] for i in active])
+            probs, new_states = self.backend.infer(batch, [states[i] for i in active])
+            for i, prob, state in zip(active, probs, new_states):
+                results[i][t] = prob
+                states[i] = state
+            self.frames_processed += len(active)
+            self.batches_processed += 1
+        return results, states
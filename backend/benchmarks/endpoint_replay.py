@@ -0,0 +1,125 @@
+# backend/benchmarks/endpoint_replay.py
+#
+# Replays recorded PCM through the endpointer and reports endpoint delay and false
+# cut-offs against labelled turn boundaries, for the adaptive endpointer and for the
+# old fixed-timeout behaviour.
+#
+# Each recording is a 16 kHz mono 16-bit .wav (or headerless .pcm) with a sidecar
+# <name>.json:
+#   {"state": "PART_1", "turns": [[start_s, end_s], ...], "words": [12, 30, ...]}
+# "turns" are whole answers (pauses inside them must not end the turn); "words" is
+# optional and feeds the speaking-rate estimate as a transcript would.
+#
+#   cd backend && python -m benchmarks.endpoint_replay recordings/ --modes baseline adaptive
+
+import argparse
+import glob
+import json
+import os
+import wave
+
+import numpy as np
+
+from app.endpointer import Endpointer, FRAME_S, SPEECH_START, ENDPOINT
+from app.vad import VAD_BACKENDS, VAD_SAMPLE_RATE
+
+
+def load_pcm(path: str) -> bytes:
+    if path.endswith(".pcm"):
+        with open(path, "rb") as f:
+            return f.read()
+    with wave.open(path, "rb") as wf:
+        if (wf.getframerate(), wf.getnchannels(), wf.getsampwidth()) != (VAD_SAMPLE_RATE, 1, 2):
+            raise ValueError(f"{path}: expected 16 kHz mono 16-bit audio")
+        return wf.readframes(wf.getnframes())
+
+
+def load_labels(path: str) -> dict:
+    if not os.path.exists(path): return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def make_endpointer(mode: str) -> Endpointer:
+    if mode == "baseline":
+        # The old loop: one threshold, fixed 1.2 s of silence, no pre-roll.
+        return Endpointer(0.5, 0.5, pre_roll_s=0.0, adaptive=False, silence_timeouts={})
+    return Endpointer()
+
+
+def replay(pcm: bytes, labels: dict, mode: str, backend) -> dict:
+    endpointer = make_endpointer(mode)
+    exam_state = labels.get("state", "PART_1")
+    turns = [tuple(t) for t in labels.get("turns", [])]
+    words = labels.get("words", [])
+    frames_i16, frames_f32 = endpointer.reframe(pcm)
+
+    vad_state = backend.initial_state()
+    endpoints, onsets = [], []
+    for i in range(len(frames_f32)):
+        probs, (vad_state, ) = backend.infer(frames_f32[i:i + 1], [vad_state])
+        t = (i + 1) * FRAME_S
+        for event, payload in endpointer.process(frames_i16[i:i + 1], probs, exam_state):
+            if event == SPEECH_START:
+                onsets.append(t - FRAME_S - len(payload) / (VAD_SAMPLE_RATE * 2))
+            elif event == ENDPOINT:
+                endpoints.append(t)
+                turn_index = max((k for k, (_, end) in enumerate(turns) if end <= t), default=None)
+                if turn_index is not None and turn_index < len(words):
+                    endpointer.observe_turn(words[turn_index], payload)
+
+    delays, false_cutoffs, matched = [], 0, set()
+    for t in endpoints:
+        if any(start <= t < end for start, end in turns):
+            false_cutoffs += 1
+            continue
+        ended = [k for k, (_, end) in enumerate(turns) if end <= t and k not in matched]
+        if ended:
+            matched.add(ended[-1])
+            delays.append(t - turns[ended[-1]][1])
+    # Audio kept before each labelled onset (negative means the word start was clipped).
+    onset_leads = []
+    for start, _ in turns:
+        near = [o for o in onsets if start - 1.0 <= o <= start + 0.5]
+        if near: onset_leads.append(start - near[0])
+    return {
+        "endpoints": len(endpoints), "turns": len(turns), "delays": delays,
+        "false_cutoffs": false_cutoffs, "missed": len(turns) - len(matched), "onset_leads": onset_leads,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recordings through the endpointer.")
+    parser.add_argument("paths", nargs="+", help="Recording files or directories.")
+    parser.add_argument("--modes", nargs="+", default=["baseline", "adaptive"], choices=["baseline", "adaptive"])
+    parser.add_argument("--backend", default="onnx", choices=sorted(VAD_BACKENDS))
+    args = parser.parse_args()
+
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, "*.wav")) + glob.glob(os.path.join(path, "*.pcm")))
+        else:
+            files.append(path)
+    backend = VAD_BACKENDS[args.backend]()
+
+    print(f"{'mode':<10}{'file':<28}{'turns':>6}{'endpts':>7}{'delay p50 ms':>14}{'delay p95 ms':>14}{'false cut':>10}{'missed':>8}{'onset lead ms':>15}")
+    for mode in args.modes:
+        totals = {"delays": [], "false_cutoffs": 0, "missed": 0, "turns": 0, "endpoints": 0, "onset_leads": []}
+        for path in files:
+            labels = load_labels(os.path.splitext(path)[0] + ".json")
+            r = replay(load_pcm(path), labels, mode, backend)
+            for key in totals: totals[key] += r[key]
+            print_row(mode, os.path.basename(path), r)
+        print_row(mode, "TOTAL", totals)
+
+
+def print_row(mode, name, r):
+    pct = lambda values, q: f"{np.percentile(values, q) * 1000:.0f}" if values else "-"
+    lead = f"{np.mean(r['onset_leads']) * 1000:.0f}" if r["onset_leads"] else "-"
+    print(f"{mode:<10}{name[:27]:<28}{r['turns']:>6}{r['endpoints']:>7}{pct(r['delays'], 50):>14}{pct(r['delays'], 95):>14}"
+          f"{r['false_cutoffs']:>10}{r['missed']:>8}{lead:>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# backend/benchmarks/fakes.py
+#
+# Offline stand-ins for the external services and for the browser, so the real
+# websocket_endpoint can be driven without network access:
+#   FakeGeminiModel    replaces main.EXAMINER_MODEL.model (start_chat / send_message_async, streamed or not)
+#   FakeScoringModel   replaces main.SCORING_MODEL (generate_content_async -> one criterion's JSON)
+#   FakeCartesia       replaces main.cartesia_client (tts.bytes -> silent WAV sized like real speech)
+#   FakeWebSocket      an in-memory Starlette-style WebSocket
+#   EnergyVadBackend   a VAD backend that needs no model, for synthetic fixture audio
+# Deepgram is replaced by app.stt.FakeSttProvider. All latencies take a +/- jitter.
+
+import asyncio
+import io
+import json
+import random
+import types
+import wave
+
+import numpy as np
+
+from app.conversation import estimate_tokens
+from app.prompts import SYSTEM_PROMPT, GREETING_PHRASE, PART_1_END_TRANSITION, PREP_TIME_START_PHRASE
+from app.scoring import EVALUATION_TEMPLATE, TEMPLATE_SECTIONS
+
+CUE_CARD = """[CUE_CARD_START]
+Describe a place you visited that has been affected by pollution.
+You should say:
+- Where it is
+- When you visited this place
+- What kinds of pollution you saw there
+And explain how you felt about this situation.
+[CUE_CARD_END]"""
+
+PART_1_QUESTIONS = [
+    "Do you work or are you a student?", "What do you enjoy most about your hometown?",
+    "How do you usually spend your weekends?", "Do you prefer mornings or evenings, and why?",
+]
+PART_3_QUESTIONS = [
+    "Why do you think some cities manage pollution better than others?",
+    "Should governments or individuals take more responsibility for the environment?",
+    "How might attitudes to pollution change in the next twenty years?",
+]
+
+
+def _jitter(base: float, jitter: float) -> float:
+    return max(0.0, base + random.uniform(-jitter, jitter))
+
+
+def fake_evaluation() -> dict:
+    """The evaluation template from the system prompt with every placeholder filled in."""
+    template = json.loads(json.dumps(EVALUATION_TEMPLATE))
+    fill = lambda value: "6.5" if "1.0" in value else "Fake feedback."
+    template["overall_band_score"] = "6.5"
+    for section in template["sections"]:
+        section["score"] = "6.5"
+        for group in ("strengths", "improvements"):
+            section[group] = {key: fill(value) for key, value in section[group].items()}
+    template["final_suggestions"] = {key: "Fake suggestion." for key in template["final_suggestions"]}
+    return template
+
+
+class FakeResponse:
+    def __init__(self, text: str, token_interval_s: float, jitter_s: float, prompt_tokens: int = 0):
+        self.text = text
+        self.token_interval_s = token_interval_s
+        self.jitter_s = jitter_s
+        self.usage_metadata = types.SimpleNamespace(
+            prompt_token_count=prompt_tokens, cached_content_token_count=0, candidates_token_count=estimate_tokens(text))
+
+    async def __aiter__(self):
+        # Gemini streams a few words per chunk.
+        words = self.text.split(" ")
+        for i in range(0, len(words), 4):
+            if i: await asyncio.sleep(_jitter(self.token_interval_s, self.jitter_s / 4))
+            yield type("Chunk", (), {"text": " ".join(words[i:i + 4]) + (" " if i + 4 < len(words) else "")})()
+
+
+class FakeChat:
+    def __init__(self, model, history):
+        self.model = model
+        self.history = list(history)
+
+    async def send_message_async(self, message, stream: bool = False):
+        message = "\n".join(message) if isinstance(message, list) else message
+        text = self.model.reply(self.history, message)
+        # Counted like the API does: the system instruction, the history and the new message.
+        prompt_tokens = self.model.system_tokens + sum(estimate_tokens(m["parts"][0]) for m in self.history) + estimate_tokens(message)
+        self.history += [{"role": "user", "parts": [message]}, {"role": "model", "parts": [text]}]
+        if stream:
+            await asyncio.sleep(_jitter(self.model.first_token_s, self.model.jitter_s))
+            return FakeResponse(text, self.model.token_interval_s, self.model.jitter_s, prompt_tokens)
+        await asyncio.sleep(_jitter(self.model.first_token_s, self.model.jitter_s) + len(text.split()) / 4 * self.model.token_interval_s)
+        return FakeResponse(text, 0.0, 0.0, prompt_tokens)
+
+
+class FakeGeminiModel:
+    """Plays the examiner through a whole test, deciding the next line from the chat history
+    (which may have had finished parts compacted into summaries)."""
+
+    def __init__(self, first_token_s: float = 0.35, token_interval_s: float = 0.03, jitter_s: float = 0.1,
+                 part_1_questions: int = 2):
+        self.first_token_s = first_token_s
+        self.token_interval_s = token_interval_s
+        self.jitter_s = jitter_s
+        self.part_1_questions = part_1_questions
+        self.system_tokens = estimate_tokens(SYSTEM_PROMPT)
+        self.requests = 0
+
+    def start_chat(self, history=None):
+        return FakeChat(self, history or [])
+
+    def reply(self, history: list, message: str) -> str:
+        self.requests += 1
+        if "Provide the final evaluation JSON" in message:
+            return f"[EVALUATION_JSON_START]{json.dumps(fake_evaluation())}[EVALUATION_JSON_END]"
+        if "[SYSTEM: The user was silent" in message:
+            return "Sorry, I didn't quite catch that. Could you say a little more about it?"
+        if not history:
+            return GREETING_PHRASE
+        if "monologue is complete" in message:
+            return "Thank you. Do you often visit places like that?"
+        said = "\n".join(m["parts"][0] for m in history)
+        if "monologue is complete" in said or "Summary of Part 2" in said:
+            asked = sum(1 for question in PART_3_QUESTIONS if question in said)
+            return f"Thank you. Now some more general questions. {PART_3_QUESTIONS[asked % len(PART_3_QUESTIONS)]}"
+        asked = sum(1 for question in PART_1_QUESTIONS if question in said)
+        if asked + 1 >= self.part_1_questions:
+            return f"{PART_1_END_TRANSITION}\n{CUE_CARD}\n{PREP_TIME_START_PHRASE}"
+        return f"Thank you. {PART_1_QUESTIONS[asked % len(PART_1_QUESTIONS)]}"
+
+
+class FakeScoringModel:
+    """Answers per-part scoring requests; `invalid_rate` of the replies are malformed, to exercise retries."""
+
+    def __init__(self, latency_s: float = 1.5, jitter_s: float = 0.3, invalid_rate: float = 0.0):
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.invalid_rate = invalid_rate
+        self.requests = 0
+
+    async def generate_content_async(self, message: str):
+        self.requests += 1
+        await asyncio.sleep(_jitter(self.latency_s, self.jitter_s))
+        if random.random() < self.invalid_rate:
+            return types.SimpleNamespace(text='{"score": "about six", "strengths": {}}')
+        section = TEMPLATE_SECTIONS[message.split("\n", 1)[0].removeprefix("Criterion: ")]
+        reply = {"score": random.choice([5.5, 6.0, 6.5, 7.0]),
+                 "strengths": {key: "Fake strength." for key in section["strengths"]},
+                 "improvements": {key: "Fake improvement." for key in section["improvements"]},
+                 "suggestion": "Fake suggestion."}
+        return types.SimpleNamespace(text=json.dumps(reply))
+
+
+class FakeCartesia:
+    """tts.bytes() yields a silent WAV as long as the transcript would take to say."""
+
+    def __init__(self, latency_s: float = 0.15, jitter_s: float = 0.05, words_per_second: float = 2.7,
+                 realtime_factor: float = 0.05):
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.words_per_second = words_per_second
+        self.realtime_factor = realtime_factor
+        self.requests = 0
+        self.tts = self
+
+    def bytes(self, model_id: str, transcript: str, voice: dict, output_format: dict):
+        return self._generate(transcript, output_format.get("sample_rate", 24000))
+
+    async def _generate(self, transcript: str, sample_rate: int):
+        self.requests += 1
+        duration = len(transcript.split()) / self.words_per_second
+        await asyncio.sleep(_jitter(self.latency_s, self.jitter_s) + duration * self.realtime_factor)
+        with io.BytesIO() as buffer:
+            with wave.open(buffer, "wb") as wf:
+                wf.setnchannels(1)
+                wf.setsampwidth(2)
+                wf.setframerate(sample_rate)
+                wf.writeframes(bytes(int(duration * sample_rate) * 2))
+            yield buffer.getvalue()
+
+
+class FakeWebSocket:
+    """Just enough of starlette's WebSocket for AudioChannel; the test client uses the other end."""
+
+    def __init__(self, subprotocols=("ielts.binary.v1", )):
+        self.scope = {"type": "websocket", "subprotocols": list(subprotocols)}
+        self.subprotocol = None
+        self.to_server = asyncio.Queue()
+        self.to_client = asyncio.Queue()
+
+    # Server side
+    async def accept(self, subprotocol: str = None):
+        self.subprotocol = subprotocol
+
+    async def receive(self) -> dict:
+        return await self.to_server.get()
+
+    async def send_json(self, data: dict):
+        await self.to_client.put(json.dumps(data, separators=(",", ":")))
+
+    async def send_bytes(self, data: bytes):
+        await self.to_client.put(data)
+
+    # Client side
+    def client_send_json(self, data: dict):
+        self.to_server.put_nowait({"type": "websocket.receive", "text": json.dumps(data)})
+
+    def client_send_bytes(self, data: bytes):
+        self.to_server.put_nowait({"type": "websocket.receive", "bytes": data})
+
+    def client_disconnect(self):
+        self.to_server.put_nowait({"type": "websocket.disconnect", "code": 1000})
+
+    async def client_receive(self):
+        """Returns a dict for JSON messages and bytes for binary frames."""
+        message = await self.to_client.get()
+        return json.loads(message) if isinstance(message, str) else message
+
+
+class EnergyVadBackend:
+    """Speech probability from frame RMS, for synthetic audio that Silero would (rightly) ignore."""
+
+    def __init__(self, full_scale_rms: float = 0.05):
+        self.full_scale_rms = full_scale_rms
+
+    def initial_state(self):
+        return None
+
+    def infer(self, frames: np.ndarray, states: list):
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        return np.clip(rms / self.full_scale_rms, 0.0, 1.0).astype(np.float32), states
@@ -0,0 +1,314 @@
+# backend/benchmarks/load_test.py
+#
+# Offline load test: N simulated candidates each take a full exam against the real
+# websocket_endpoint, in this process, with Deepgram, Gemini and Cartesia replaced by
+# local fakes (see benchmarks/fakes.py). Reports turn latency percentiles (client-side
+# and the server's own histogram), event-loop lag, CPU, RSS per session and LLM input
+# tokens per request, how long the final evaluation took once the last answer was in,
+# and the provider gateways' queueing: tests turned away (busy), the p95 wait for an
+# STT/LLM/TTS slot (worst of the three), and requests shed by any gateway (shed). Answers
+# the server could not transcribe are reported below the table.
+#
+#   cd backend && python -m benchmarks.load_test --sessions 1 10 50
+#   cd backend && python -m benchmarks.load_test --sessions 20 --fixtures recordings/ --vad onnx
+#
+# Each --sessions value runs in a fresh interpreter so RSS figures don't bleed into each
+# other. Without --fixtures the candidates speak synthetic bursts of noise, which only
+# the energy VAD recognises as speech.
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Offline defaults, read by app.main at import time.
+os.environ.setdefault("STT_PROVIDER", "fake")
+os.environ.setdefault("SESSION_STORE", "memory")
+os.environ.setdefault("TTS_CACHE_DIR", "")
+os.environ.setdefault("ARCHIVE_DIR", "")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("DEEPGRAM_API_KEY", "offline")
+os.environ.setdefault("CARTESIA_API_KEY", "offline")
+
+from app.vad import VAD_BACKENDS, VAD_FRAME_SAMPLES, VAD_SAMPLE_RATE
+from app.transport import pack_frame, FRAME_HEADER, KIND_AUDIO_IN, KIND_AUDIO_OUT, FLAG_LAST
+from benchmarks.fakes import FakeGeminiModel, FakeScoringModel, FakeCartesia, FakeWebSocket, EnergyVadBackend
+from benchmarks.endpoint_replay import load_pcm
+
+CHUNK_BYTES = VAD_FRAME_SAMPLES * 2
+CHUNK_S = VAD_FRAME_SAMPLES / VAD_SAMPLE_RATE
+TURN_TIMEOUT_S = 120.0
+MAX_TURNS = 30
+SILENT_ANSWER = "(User was silent"  # how the server shows an answer it could not transcribe
+
+
+def synth_speech(seconds: float, rng) -> bytes:
+    """Word-sized noise bursts with short gaps and the odd longer hesitation."""
+    parts, total = [], 0
+    while total < seconds * VAD_SAMPLE_RATE:
+        word = int(rng.uniform(0.2, 0.45) * VAD_SAMPLE_RATE)
+        parts.append(rng.standard_normal(word) * np.hanning(word) * 6000)
+        gap = rng.uniform(0.5, 0.6) if rng.random() < 0.1 else rng.uniform(0.05, 0.2)
+        parts.append(np.zeros(int(gap * VAD_SAMPLE_RATE)))
+        total += word + int(gap * VAD_SAMPLE_RATE)
+    return np.concatenate(parts).astype(np.int16).tobytes()
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class SimulatedCandidate:
+    def __init__(self, answers: list, monologue: bytes, prep_s: float, speed: float):
+        self.answers = answers
+        self.monologue = monologue
+        self.prep_s = prep_s
+        self.speed = speed
+        self.ws = FakeWebSocket()
+        self.turn_latencies = []
+        self.transcripts = []    # the candidate's answers as the server transcribed them
+        self.completed = False
+        self.rejected = False    # the server answered start_test with server_busy
+        self.error = None
+        self._speech_end = None
+        self._turn_done = asyncio.Event()
+        self._heard = asyncio.Event()
+        self._pending_timer = None
+        self._seq = 0
+
+    async def run(self, endpoint):
+        server = asyncio.create_task(endpoint(self.ws))
+        receiver = asyncio.create_task(self._receive())
+        try:
+            await self._take_exam()
+            self.completed = not self.rejected
+        except Exception as e:
+            self.error = repr(e)
+        finally:
+            self.ws.client_disconnect()
+            receiver.cancel()
+            await asyncio.gather(server, receiver, return_exceptions=True)
+
+    async def _take_exam(self):
+        self.ws.client_send_json({"type": "start_test"})
+        answer = 0
+        for _ in range(MAX_TURNS):
+            await asyncio.wait_for(self._turn_done.wait(), TURN_TIMEOUT_S)
+            self._turn_done.clear()
+            if self.completed or self.rejected: return
+            timer, self._pending_timer = self._pending_timer, None
+            if timer == "prep_timer":
+                self.ws.client_send_json({"type": "tts_finished_start_timer", "timer_type": "prep_timer"})
+                await asyncio.sleep(self.prep_s / self.speed)
+                self.ws.client_send_json({"type": "skip_prep_timer"})
+            elif timer == "speak_timer":
+                self.ws.client_send_json({"type": "tts_finished_start_timer", "timer_type": "speak_timer"})
+                await self._stream(self.monologue)
+                self._speech_end = time.perf_counter()
+                self.ws.client_send_json({"type": "finish_speaking"})
+            else:
+                self._heard.clear()
+                await self._stream(self.answers[answer % len(self.answers)])
+                self._speech_end = time.perf_counter()
+                answer += 1
+                # Keep the microphone open on silence until the server has heard the end of the answer.
+                await self._stream(None)
+        raise RuntimeError(f"Exam did not finish within {MAX_TURNS} examiner turns")
+
+    async def _stream(self, pcm):
+        """Sends PCM in real time (scaled by --speed); pcm=None streams silence until the server replies."""
+        silence = bytes(CHUNK_BYTES)
+        next_send = time.perf_counter()
+        offset = 0
+        while (offset < len(pcm)) if pcm is not None else not self._heard.is_set():
+            chunk = pcm[offset:offset + CHUNK_BYTES] if pcm is not None else silence
+            self.ws.client_send_bytes(pack_frame(KIND_AUDIO_IN, self._seq, chunk))
+            self._seq += 1
+            offset += CHUNK_BYTES
+            next_send += CHUNK_S / self.speed
+            await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+
+    async def _receive(self):
+        while True:
+            message = await self.ws.client_receive()
+            if isinstance(message, bytes):
+                kind, flags, _, _ = FRAME_HEADER.unpack_from(message)
+                if kind != KIND_AUDIO_OUT: continue
+                if self._speech_end is not None and len(message) > FRAME_HEADER.size:
+                    self.turn_latencies.append(time.perf_counter() - self._speech_end)
+                    self._speech_end = None
+                if flags & FLAG_LAST: self._turn_done.set()
+            elif message["type"] == "transcript":
+                if message["speaker"] == "User":
+                    self.transcripts.append(message["data"])
+                    self._heard.set()
+                elif message.get("start_timer_on_finish"): self._pending_timer = message["start_timer_on_finish"]
+            elif message["type"] == "final_evaluation":
+                self.completed = True
+                self._turn_done.set()
+            elif message["type"] == "server_busy":
+                self.rejected = True
+                self._turn_done.set()
+
+
+async def monitor(interval_s: float, lags: list, rss: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval_s)
+        lags.append(time.perf_counter() - start - interval_s)
+        if len(lags) % 50 == 0: rss.append(rss_mb())
+
+
+async def run_load(args) -> dict:
+    from app import main
+    from app.stt import FakeSttProvider
+    from app.metrics import TURN_LATENCY_SECONDS, LLM_PROMPT_TOKENS, STAGE_SECONDS, PROVIDER_WAIT_SECONDS, PROVIDER_REJECTED_TOTAL
+
+    main.EXAMINER_MODEL.model = FakeGeminiModel(args.llm_first_token, args.llm_token_interval, args.jitter)
+    if args.llm_history_budget is not None: main.HISTORY_TOKEN_BUDGET = args.llm_history_budget
+    main.SCORING_MODEL = FakeScoringModel(args.scoring_latency, args.jitter, args.scoring_invalid_rate)
+    main.cartesia_client = FakeCartesia(args.tts_latency, args.jitter)
+    main.STT_PROVIDER = FakeSttProvider(latency_s=args.stt_latency, jitter_s=args.jitter, finalize_latency_s=args.stt_finalize,
+                                        gateway=main.STT_GATEWAY)
+    gateways = {gateway.name: gateway for gateway in (*main.EXAM_GATEWAYS, main.SCORING_GATEWAY)}
+    for limit in args.gateway:
+        name, _, value = limit.partition("=")
+        concurrency, _, queue = value.partition(":")
+        gateways[name].max_concurrency = int(concurrency)
+        if queue: gateways[name].max_queue = int(queue)
+    main.VAD_ENGINE.backend_factory = EnergyVadBackend if args.vad == "energy" else VAD_BACKENDS[args.vad]
+    if args.archive_dir: main.ARCHIVE.directory = args.archive_dir
+    await main.VAD_ENGINE.start()
+    await main.TIMER_SCHEDULER.start()
+    await main.ARCHIVE.start()
+
+    rng = np.random.default_rng(0)
+    if args.fixtures:
+        files = sorted(glob.glob(os.path.join(args.fixtures, "*.wav")) + glob.glob(os.path.join(args.fixtures, "*.pcm")))
+        answers = [load_pcm(path) for path in files]
+        monologue = b"".join(answers)
+        while len(monologue) < args.monologue_s * VAD_SAMPLE_RATE * 2: monologue += b"".join(answers)
+        monologue = monologue[:int(args.monologue_s * VAD_SAMPLE_RATE) * 2]
+    else:
+        answers = [synth_speech(args.answer_s, rng) for _ in range(8)]
+        monologue = synth_speech(args.monologue_s, rng)
+
+    lags, rss, stop = [], [], asyncio.Event()
+    baseline_rss = rss_mb()
+    monitor_task = asyncio.create_task(monitor(0.01, lags, rss, stop))
+    candidates = [SimulatedCandidate(answers, monologue, args.prep_s, args.speed) for _ in range(args.sessions)]
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+
+    async def start(i, candidate):
+        await asyncio.sleep(args.ramp_s * i / max(1, args.sessions))
+        await candidate.run(main.websocket_endpoint)
+
+    await asyncio.gather(*(start(i, c) for i, c in enumerate(candidates)))
+    cpu_s, wall_s = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    stop.set()
+    await monitor_task
+    await main.VAD_ENGINE.stop()
+    await main.TIMER_SCHEDULER.stop()
+    await main.ARCHIVE.stop()
+
+    latencies = [latency for c in candidates for latency in c.turn_latencies]
+    pct = lambda values, q: float(np.percentile(values, q)) * 1000 if values else None
+    server = TURN_LATENCY_SECONDS.quantiles()
+    errors = [c.error for c in candidates if c.error]
+    return {
+        "sessions": args.sessions, "completed": sum(c.completed for c in candidates), "errors": len(errors),
+        "rejected": sum(c.rejected for c in candidates),
+        "silent_answers": sum(1 for c in candidates for text in c.transcripts if not text.strip() or text.startswith(SILENT_ANSWER)),
+        "first_error": errors[0] if errors else None, "wall_s": wall_s, "turns": len(latencies),
+        "turn_p50_ms": pct(latencies, 50), "turn_p95_ms": pct(latencies, 95), "turn_p99_ms": pct(latencies, 99),
+        "server_p50_ms": server.get(0.5, 0) * 1000, "server_p95_ms": server.get(0.95, 0) * 1000, "server_p99_ms": server.get(0.99, 0) * 1000,
+        "lag_p50_ms": pct(lags, 50), "lag_p99_ms": pct(lags, 99), "lag_max_ms": max(lags) * 1000 if lags else None,
+        "cpu_pct": cpu_s / wall_s * 100, "cpu_ms_per_session_s": cpu_s / wall_s / args.sessions * 1000,
+        "rss_mb": max(rss + [rss_mb()]), "rss_mb_per_session": (max(rss + [rss_mb()]) - baseline_rss) / args.sessions,
+        "llm_requests": LLM_PROMPT_TOKENS._default.count,
+        "llm_prompt_tokens_per_request": LLM_PROMPT_TOKENS._default.sum / max(1, LLM_PROMPT_TOKENS._default.count),
+        "evaluation_p50_ms": STAGE_SECONDS.labels("evaluation").quantiles().get(0.5, 0) * 1000,
+        "provider_wait_p95_ms": {name: PROVIDER_WAIT_SECONDS.labels(name).quantiles().get(0.95, 0) * 1000 for name in gateways},
+        "provider_rejected": {name: PROVIDER_REJECTED_TOTAL.labels(name).value for name in gateways},
+        "archive_kb_per_session": main.ARCHIVE.bytes_written / 1024 / args.sessions,
+    }
+
+
+def print_report(results: list):
+    fmt = lambda v, spec=".0f": "-" if v is None else format(v, spec)
+    print(f"{'sessions':>8}{'done':>6}{'err':>5}{'turns':>7}{'turn p50/p95/p99 ms':>22}{'server p50/p95/p99 ms':>24}"
+          f"{'loop lag p50/p99/max ms':>25}{'CPU %':>7}{'CPU ms/sess-s':>15}{'RSS MB':>8}{'MB/sess':>9}{'LLM in tok/req':>16}{'eval p50 ms':>13}"
+          f"{'busy':>6}{'wait p95 ms':>13}{'shed':>6}")
+    for r in results:
+        print(f"{r['sessions']:>8}{r['completed']:>6}{r['errors']:>5}{r['turns']:>7}"
+              f"{fmt(r['turn_p50_ms']) + '/' + fmt(r['turn_p95_ms']) + '/' + fmt(r['turn_p99_ms']):>22}"
+              f"{fmt(r['server_p50_ms']) + '/' + fmt(r['server_p95_ms']) + '/' + fmt(r['server_p99_ms']):>24}"
+              f"{fmt(r['lag_p50_ms'], '.1f') + '/' + fmt(r['lag_p99_ms'], '.1f') + '/' + fmt(r['lag_max_ms'], '.1f'):>25}"
+              f"{r['cpu_pct']:>7.0f}{r['cpu_ms_per_session_s']:>15.2f}{r['rss_mb']:>8.0f}{r['rss_mb_per_session']:>9.2f}"
+              f"{r['llm_prompt_tokens_per_request']:>16.0f}{r['evaluation_p50_ms']:>13.0f}{r['rejected']:>6}"
+              f"{max(r['provider_wait_p95_ms'][name] for name in ('stt', 'llm', 'tts')):>13.0f}{sum(r['provider_rejected'].values()):>6.0f}")
+        if r["first_error"]: print(f"         first error: {r['first_error']}")
+        if r["silent_answers"]: print(f"         answers not transcribed: {r['silent_answers']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of the exam WebSocket endpoint.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--ramp-s", type=float, default=5.0, help="Spread session starts over this many seconds.")
+    parser.add_argument("--speed", type=float, default=1.0, help="Audio is streamed at this multiple of real time.")
+    parser.add_argument("--fixtures", help="Directory of 16 kHz mono .wav/.pcm answers; default is synthetic speech.")
+    parser.add_argument("--vad", choices=["energy"] + sorted(VAD_BACKENDS), help="Default: onnx with --fixtures, else energy.")
+    parser.add_argument("--answer-s", type=float, default=6.0)
+    parser.add_argument("--monologue-s", type=float, default=20.0)
+    parser.add_argument("--prep-s", type=float, default=2.0)
+    parser.add_argument("--stt-latency", type=float, default=0.3)
+    parser.add_argument("--stt-finalize", type=float, default=0.08)
+    parser.add_argument("--llm-first-token", type=float, default=0.35)
+    parser.add_argument("--llm-token-interval", type=float, default=0.03)
+    parser.add_argument("--llm-history-budget", type=int, help="Override LLM_HISTORY_TOKEN_BUDGET for the run.")
+    parser.add_argument("--scoring-latency", type=float, default=1.5, help="Per-criterion scoring request latency.")
+    parser.add_argument("--scoring-invalid-rate", type=float, default=0.0, help="Fraction of malformed scoring replies.")
+    parser.add_argument("--tts-latency", type=float, default=0.15)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--gateway", action="append", default=[], metavar="NAME=CONCURRENCY[:QUEUE]",
+                        help="Override a provider gateway's limits (stt, llm, tts, scoring); repeatable.")
+    parser.add_argument("--archive-dir", help="Record the sessions to this archive directory (off by default).")
+    parser.add_argument("--json", action="store_true", help="Run one --sessions value in-process and print JSON.")
+    args = parser.parse_args()
+    args.vad = args.vad or ("onnx" if args.fixtures else "energy")
+
+    if args.json:
+        args.sessions = args.sessions[0]
+        print(json.dumps(asyncio.run(run_load(args))))
+        return
+
+    results = []
+    for n in args.sessions:
+        child = [arg for arg in sys.argv[1:] if arg != "--json"]
+        i = child.index("--sessions") if "--sessions" in child else None
+        if i is not None:
+            j = i + 1
+            while j < len(child) and not child[j].startswith("--"): j += 1
+            del child[i:j]
+        out = subprocess.run([sys.executable, "-m", "benchmarks.load_test", *child, "--sessions", str(n), "--vad", args.vad, "--json"],
+                             capture_output=True, text=True)
+        if out.returncode != 0:
+            print(f"sessions={n} failed: {out.stderr.strip().splitlines()[-1] if out.stderr else out.returncode}")
+            continue
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    print_report(results)
+
+
+if __name__ == "__main__":
+    main()
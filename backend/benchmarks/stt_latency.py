@@ -0,0 +1,59 @@
+# backend/benchmarks/stt_latency.py
+#
+# End-of-speech -> final transcript latency, batch vs streaming, measured offline against
+# the fake STT provider (or any provider named by --provider).
+#
+#   cd backend && python -m benchmarks.stt_latency --durations 2 5 10 30
+#   cd backend && python -m benchmarks.stt_latency --latency 0.4 --finalize-latency 0.1
+
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from app.stt import FakeSttProvider, BufferedStream, create_stt_provider
+from app.vad import VAD_FRAME_SAMPLES, VAD_SAMPLE_RATE
+
+CHUNK_BYTES = VAD_FRAME_SAMPLES * 2
+
+
+async def utterance_latency(provider, pcm: bytes, streaming: bool) -> float:
+    stream = provider.open_stream() if streaming else BufferedStream(provider)
+    for offset in range(0, len(pcm), CHUNK_BYTES):
+        stream.send(pcm[offset:offset + CHUNK_BYTES])
+        await asyncio.sleep(0)
+    end_of_speech = time.perf_counter()
+    await stream.finish()
+    return time.perf_counter() - end_of_speech
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Measure end-of-speech to transcript latency.")
+    parser.add_argument("--provider", default="fake", help="STT_PROVIDER name; 'fake' needs no network.")
+    parser.add_argument("--durations", type=float, nargs="+", default=[2, 5, 10, 30])
+    parser.add_argument("--trials", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake provider round-trip latency (s).")
+    parser.add_argument("--finalize-latency", type=float, default=0.08, help="Fake streaming finalize latency (s).")
+    parser.add_argument("--processing-rtf", type=float, default=0.05, help="Fake batch processing time per audio second.")
+    args = parser.parse_args()
+
+    if args.provider == "fake":
+        provider = FakeSttProvider(latency_s=args.latency, finalize_latency_s=args.finalize_latency,
+                                   processing_rtf=args.processing_rtf)
+    else:
+        from deepgram import AsyncDeepgramClient
+        provider = create_stt_provider(args.provider, AsyncDeepgramClient())
+
+    print(f"{'utterance s':>12}{'batch p50 ms':>15}{'stream p50 ms':>15}{'batch p95 ms':>15}{'stream p95 ms':>15}")
+    for duration in args.durations:
+        pcm = os.urandom(int(duration * VAD_SAMPLE_RATE) * 2)
+        batch = [await utterance_latency(provider, pcm, streaming=False) for _ in range(args.trials)]
+        stream = [await utterance_latency(provider, pcm, streaming=True) for _ in range(args.trials)]
+        p = lambda values, q: np.percentile(values, q) * 1000
+        print(f"{duration:>12.1f}{p(batch, 50):>15.1f}{p(stream, 50):>15.1f}{p(batch, 95):>15.1f}{p(stream, 95):>15.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+# backend/benchmarks/transport_benchmark.py
+#
+# Compares server CPU time per second of audio for the JSON/base64 protocol and the
+# binary-frame protocol: decoding incoming 512-sample microphone chunks into the speech
+# buffer, and encoding outgoing TTS WAV audio.
+#
+#   cd backend && python -m benchmarks.transport_benchmark --seconds 600
+
+import argparse
+import base64
+import json
+import os
+import time
+
+from app.transport import pack_frame, unpack_frame, KIND_AUDIO_IN, KIND_AUDIO_OUT
+from app.vad import VAD_FRAME_SAMPLES, VAD_SAMPLE_RATE
+
+CHUNK_BYTES = VAD_FRAME_SAMPLES * 2
+TTS_SAMPLE_RATE = 24000
+
+
+def inbound_json(messages):
+    buffer = bytearray()
+    for message in messages:
+        data = json.loads(message)
+        chunk = bytearray(base64.b64decode(data["data"]))
+        buffer.extend(chunk)
+    return len(buffer)
+
+
+def inbound_binary(frames):
+    buffer = bytearray()
+    for frame in frames:
+        _, _, _, payload = unpack_frame(frame)
+        buffer.extend(payload)
+    return len(buffer)
+
+
+def outbound_json(wavs):
+    return sum(len(json.dumps({"type": "audio", "data": base64.b64encode(wav).decode("utf-8")})) for wav in wavs)
+
+
+def outbound_binary(wavs):
+    return sum(len(pack_frame(KIND_AUDIO_OUT, seq, wav)) for seq, wav in enumerate(wavs))
+
+
+def cpu_time(fn, payload, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        fn(payload)
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON/base64 vs binary WebSocket audio transport.")
+    parser.add_argument("--seconds", type=float, default=300.0, help="Seconds of audio in each direction.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    n_chunks = int(args.seconds * VAD_SAMPLE_RATE / VAD_FRAME_SAMPLES)
+    chunks = [os.urandom(CHUNK_BYTES) for _ in range(n_chunks)]
+    json_messages = [json.dumps({"type": "audio_chunk", "data": base64.b64encode(c).decode("utf-8")}) for c in chunks]
+    binary_frames = [pack_frame(KIND_AUDIO_IN, seq, c) for seq, c in enumerate(chunks)]
+
+    # Examiner turns of ~5 s each.
+    turn_bytes = 5 * TTS_SAMPLE_RATE * 2
+    wavs = [os.urandom(turn_bytes) for _ in range(max(1, int(args.seconds / 5)))]
+
+    rows = [
+        ("inbound", "json", cpu_time(inbound_json, json_messages, args.repeat), sum(len(m) for m in json_messages)),
+        ("inbound", "binary", cpu_time(inbound_binary, binary_frames, args.repeat), sum(len(f) for f in binary_frames)),
+        ("outbound", "json", cpu_time(outbound_json, wavs, args.repeat), outbound_json(wavs)),
+        ("outbound", "binary", cpu_time(outbound_binary, wavs, args.repeat), outbound_binary(wavs)),
+    ]
+    print(f"{'direction':<10}{'mode':<8}{'CPU ms per audio s':>20}{'wire bytes per audio s':>24}")
+    for direction, mode, cpu, wire in rows:
+        print(f"{direction:<10}{mode:<8}{cpu * 1000 / args.seconds:>20.4f}{wire / args.seconds:>24.0f}")
+
+
+if __name__ == "__main__":
+    main()
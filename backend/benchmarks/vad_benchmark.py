@@ -0,0 +1,104 @@
+# backend/benchmarks/vad_benchmark.py
+#
+# Measures VAD throughput (frames/sec) and per-frame latency as the number of
+# concurrent sessions grows, for the batched VadEngine and for the old inline
+# per-chunk call on the event loop.
+#
+#   cd backend && python -m benchmarks.vad_benchmark --sessions 1 4 16 64
+#   cd backend && python -m benchmarks.vad_benchmark --realtime --seconds 10
+#   cd backend && python -m benchmarks.vad_benchmark --backend torch
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.vad import VadEngine, VAD_BACKENDS, pcm16_to_frames, VAD_FRAME_SAMPLES, VAD_SAMPLE_RATE
+
+FRAME_S = VAD_FRAME_SAMPLES / VAD_SAMPLE_RATE
+
+
+def make_pcm(n_frames: int, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    samples = (rng.standard_normal(n_frames * VAD_FRAME_SAMPLES) * 3000).astype(np.int16)
+    return [samples[i * VAD_FRAME_SAMPLES:(i + 1) * VAD_FRAME_SAMPLES].tobytes() for i in range(n_frames)]
+
+
+def percentile(values, p):
+    return float(np.percentile(values, p) * 1000) if values else 0.0
+
+
+async def run_session_engine(engine, chunks, realtime, latencies):
+    session_id = engine.open_session()
+    try:
+        start = time.perf_counter()
+        for i, chunk in enumerate(chunks):
+            # In real-time mode latency counts from when the frame "arrived", so event-loop stalls show up.
+            sent = start + i * FRAME_S if realtime else time.perf_counter()
+            if realtime:
+                await asyncio.sleep(max(0.0, sent - time.perf_counter()))
+            await engine.speech_prob(session_id, chunk)
+            latencies.append(time.perf_counter() - sent)
+    finally:
+        engine.close_session(session_id)
+
+
+async def run_session_inline(backend, chunks, realtime, latencies):
+    # Mirrors the old websocket_endpoint: a blocking model call per chunk on the event loop.
+    state = backend.initial_state()
+    start = time.perf_counter()
+    for i, chunk in enumerate(chunks):
+        sent = start + i * FRAME_S if realtime else time.perf_counter()
+        if realtime:
+            await asyncio.sleep(max(0.0, sent - time.perf_counter()))
+        _, (state, ) = backend.infer(pcm16_to_frames(chunk), [state])
+        latencies.append(time.perf_counter() - sent)
+        await asyncio.sleep(0)
+
+
+async def bench(mode, n_sessions, n_frames, realtime, engine=None, backend=None):
+    latencies = []
+    sessions = [make_pcm(n_frames, seed) for seed in range(n_sessions)]
+    start = time.perf_counter()
+    if mode == "engine":
+        await asyncio.gather(*(run_session_engine(engine, chunks, realtime, latencies) for chunks in sessions))
+    else:
+        await asyncio.gather(*(run_session_inline(backend, chunks, realtime, latencies) for chunks in sessions))
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "sessions": n_sessions,
+        "frames_per_s": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched vs inline Silero VAD.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--seconds", type=float, default=5.0, help="Audio per session.")
+    parser.add_argument("--realtime", action="store_true", help="Pace each session at real-time (one frame per 32 ms).")
+    parser.add_argument("--modes", nargs="+", default=["inline", "engine"], choices=["inline", "engine"])
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--backend", default="onnx", choices=sorted(VAD_BACKENDS))
+    args = parser.parse_args()
+
+    n_frames = int(args.seconds / FRAME_S)
+    engine = VadEngine(VAD_BACKENDS[args.backend], max_batch_size=args.max_batch)
+    await engine.start()
+    backend = VAD_BACKENDS[args.backend]() if "inline" in args.modes else None
+
+    print(f"{'mode':<8}{'sessions':>10}{'frames/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for n_sessions in args.sessions:
+        for mode in args.modes:
+            r = await bench(mode, n_sessions, n_frames, args.realtime, engine=engine, backend=backend)
+            print(f"{r['mode']:<8}{r['sessions']:>10}{r['frames_per_s']:>12.0f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+    print(f"Engine ran {engine.frames_processed} frames in {engine.batches_processed} batches.")
+    await engine.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
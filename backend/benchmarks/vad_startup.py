@@ -0,0 +1,56 @@
+# backend/benchmarks/vad_startup.py
+#
+# Cold-start time and peak RSS of each VAD backend, each measured in a fresh
+# interpreter: import, model load, first inference, and whether torch got imported.
+#
+#   cd backend && python -m benchmarks.vad_startup --runs 3
+
+import argparse
+import json
+import subprocess
+import sys
+
+CHILD = r"""
+import json, resource, sys, time
+t0 = time.perf_counter()
+import numpy as np
+from app.vad import VAD_BACKENDS, VAD_FRAME_SAMPLES
+t1 = time.perf_counter()
+backend = VAD_BACKENDS[sys.argv[1]]()
+t2 = time.perf_counter()
+frames = np.zeros((1, VAD_FRAME_SAMPLES), dtype=np.float32)
+backend.infer(frames, [backend.initial_state()])
+t3 = time.perf_counter()
+print(json.dumps({
+    "import_s": t1 - t0, "load_s": t2 - t1, "first_infer_s": t3 - t2, "total_s": t3 - t0,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "torch_imported": "torch" in sys.modules,
+}))
+"""
+
+
+def measure(backend: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", CHILD, backend], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare VAD backend cold start and memory.")
+    parser.add_argument("--backends", nargs="+", default=["onnx", "torch"])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'backend':<8}{'import s':>10}{'load s':>10}{'1st infer s':>13}{'total s':>10}{'RSS MB':>10}{'torch':>7}")
+    for backend in args.backends:
+        try:
+            runs = [measure(backend) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            print(f"{backend:<8} failed: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+            continue
+        best = min(runs, key=lambda r: r["total_s"])
+        print(f"{backend:<8}{best['import_s']:>10.3f}{best['load_s']:>10.3f}{best['first_infer_s']:>13.4f}"
+              f"{best['total_s']:>10.3f}{best['max_rss_mb']:>10.0f}{str(best['torch_imported']):>7}")
+
+
+if __name__ == "__main__":
+    main()
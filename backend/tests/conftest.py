@@ -0,0 +1,17 @@
+# backend/tests/conftest.py
+#
+# Unit tests run offline, from backend/ or the repository root: python -m pytest
+# The environment defaults are the load test's, read by app.main at import time.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("STT_PROVIDER", "fake")
+os.environ.setdefault("SESSION_STORE", "memory")
+os.environ.setdefault("TTS_CACHE_DIR", "")
+os.environ.setdefault("ARCHIVE_DIR", "")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("DEEPGRAM_API_KEY", "offline")
+os.environ.setdefault("CARTESIA_API_KEY", "offline")
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import types
+
+import numpy as np
+import pytest
+
+from app.archive import ArchiveWriter, decode_block, encode_block, list_sessions, load_audio, load_events
+
+
+def pcm(*samples) -> bytes:
+    return np.array(samples, dtype="<i2").tobytes()
+
+
+def test_blocks_round_trip_losslessly():
+    audio = pcm(0, 1, -1, 32767, -32768, 32767, 0, -32768, 12345)
+    assert decode_block(encode_block(audio)) == audio
+    # A stray odd byte is dropped rather than misaligning every sample after it.
+    assert decode_block(encode_block(audio + b"\x01")) == audio
+
+
+def record(directory, body):
+    async def run():
+        writer = ArchiveWriter(str(directory))
+        await writer.start()
+        try:
+            body(writer)
+            await asyncio.sleep(0.05)
+        finally:
+            await writer.stop()
+        return writer
+
+    return asyncio.run(run())
+
+
+def test_candidate_turns_point_at_their_audio(tmp_path):
+    first, second, abandoned = pcm(*range(100)), pcm(*range(-50, 50)), pcm(7, 7, 7)
+
+    def body(writer):
+        session = writer.open("exam-1")
+        session.add_examiner("Where is your hometown?", "PART_1")
+        session.add_audio(first)
+        session.add_candidate("A small town.", "PART_1")
+        session.add_audio(abandoned)
+        session.discard_audio()
+        session.add_audio(second)
+        session.add_candidate("By the sea.", "PART_1")
+        session.add_evaluation({"overall_band_score": 6.5})
+        session.close()
+
+    writer = record(tmp_path, body)
+    assert list_sessions(str(tmp_path)) == ["exam-1"]
+    events = load_events(str(tmp_path), "exam-1")
+    assert [event["event"] for event in events] == ["session", "examiner", "candidate", "candidate", "evaluation"]
+    assert load_audio(str(tmp_path), "exam-1", events[2]["audio"]) == first
+    assert load_audio(str(tmp_path), "exam-1", events[3]["audio"]) == second
+    assert events[4]["data"] == {"overall_band_score": 6.5}
+    assert writer.bytes_written == (tmp_path / "exam-1.seg").stat().st_size
+
+
+def test_unsafe_session_ids_and_a_disabled_archive_write_nothing(tmp_path):
+    def body(writer):
+        writer.open("../escape").add_candidate("hello", "PART_1")
+        writer.open("x" * 65).add_candidate("hello", "PART_1")
+
+    record(tmp_path, body)
+    assert list(tmp_path.iterdir()) == []
+
+    disabled = ArchiveWriter("")
+    asyncio.run(disabled.start())
+    disabled.open("exam-2").add_candidate("hello", "PART_1")
+    assert disabled.queued == 0
+
+
+def test_rescore_scores_the_archived_transcripts(tmp_path, monkeypatch):
+    pytest.importorskip("google.generativeai")
+    from app import rescore
+    from app.scoring import TEMPLATE_SECTIONS
+
+    class FixedScoreModel:
+        async def generate_content_async(self, message: str):
+            section = TEMPLATE_SECTIONS[message.split("\n", 1)[0].removeprefix("Criterion: ")]
+            reply = {"score": 7.0, "strengths": {key: "Good." for key in section["strengths"]},
+                     "improvements": {key: "Better." for key in section["improvements"]}, "suggestion": "Keep going."}
+            return types.SimpleNamespace(text=json.dumps(reply))
+
+    def body(writer):
+        session = writer.open("exam-3")
+        session.add_examiner("Do you work or study?", "PART_1")
+        session.add_audio(pcm(*range(2000)))
+        session.add_candidate("I study economics at the university.", "PART_1")
+        session.add_evaluation({"overall_band_score": "6.0"})
+        session.close()
+
+    record(tmp_path, body)
+    monkeypatch.setattr(rescore, "create_scoring_model", lambda name: FixedScoreModel())
+    options = {"stt": "fake", "keep_transcripts": True, "model": "test", "out": None}
+    row = asyncio.run(rescore._rescore(str(tmp_path), "exam-3", options))
+    assert (row["answers"], row["original"], row["new"]) == (1, "6.0", "7.0")
+    result = json.loads((tmp_path / "exam-3.rescore.json").read_text())
+    assert result["transcripts"] == ["I study economics at the university."]
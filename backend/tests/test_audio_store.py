@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from app.audio_store import RingBuffer, SegmentedAudioStore, MonologueRecorder, PCM_BYTES_PER_SECOND
+
+
+class EchoProvider:
+    """Transcribes a segment as its length in bytes."""
+
+    async def transcribe(self, pcm) -> str:
+        return str(len(pcm)) if len(pcm) else ""
+
+
+def test_ring_buffer_keeps_the_latest_audio():
+    ring = RingBuffer(8)
+    ring.extend(b"abcdef")
+    assert ring.getvalue() == b"abcdef"
+    ring.extend(b"ghij")
+    assert (ring.getvalue(), len(ring), ring.dropped_bytes) == (b"cdefghij", 8, 2)
+    ring.extend(b"0123456789")
+    assert (ring.getvalue(), ring.dropped_bytes) == (b"23456789", 12)
+    ring.clear()
+    assert ring.getvalue() == b""
+
+
+def test_segmented_store_seals_and_refuses_overflow():
+    store = SegmentedAudioStore(4)
+    store.append(b"abc")
+    with pytest.raises(ValueError):
+        store.append(b"de")
+    assert store.seal() == b"abc"
+    store.append(b"de")
+    assert (len(store), store.tail()) == (5, b"de")
+    store.close()
+
+
+def test_monologue_is_cut_in_pauses_and_stitched_in_order():
+    segments = []
+
+    async def run():
+        recorder = MonologueRecorder(EchoProvider(), target_segment_s=1.0, max_segment_s=2.0, on_segment=segments.append)
+        half_second = bytes(PCM_BYTES_PER_SECOND // 2)
+        for is_speech in (True, True, False, True, True, True, True, True):
+            recorder.append(half_second, is_speech)
+        assert len(recorder) == 8 * len(half_second)
+        return await recorder.finish()
+
+    # A pause after 1.5 s seals the first segment; the 2 s cap seals the second one.
+    assert asyncio.run(run()) == f"{3 * PCM_BYTES_PER_SECOND // 2} {2 * PCM_BYTES_PER_SECOND} {PCM_BYTES_PER_SECOND // 2}"
+    assert [len(s) for s in segments] == [3 * PCM_BYTES_PER_SECOND // 2, 2 * PCM_BYTES_PER_SECOND, PCM_BYTES_PER_SECOND // 2]
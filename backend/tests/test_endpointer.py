@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from app.endpointer import Endpointer, reframe, FRAME_S, SPEECH_START, AUDIO, ENDPOINT, MAX_SILENCE_TIMEOUT_S
+from app.vad import VAD_FRAME_SAMPLES
+
+
+def test_reframe_drops_a_stray_odd_byte():
+    pcm = np.arange(VAD_FRAME_SAMPLES + 3, dtype=np.int16).tobytes() + b"\x7f"
+    frames_i16, frames_f32, remainder = reframe(np.zeros(0, dtype=np.int16), memoryview(pcm))
+    assert frames_i16.shape == frames_f32.shape == (1, VAD_FRAME_SAMPLES)
+    assert remainder.tolist() == [VAD_FRAME_SAMPLES, VAD_FRAME_SAMPLES + 1, VAD_FRAME_SAMPLES + 2]
+
+
+def frames(n: int, value: int = 1000) -> np.ndarray:
+    return np.full((n, VAD_FRAME_SAMPLES), value, dtype=np.int16)
+
+
+def run(endpointer, probs, exam_state="PART_1", value=1000):
+    return endpointer.process(frames(len(probs), value), probs, exam_state)
+
+
+def kinds(events):
+    return [event for event, _ in events]
+
+
+def test_onset_sends_the_pre_roll_first():
+    endpointer = Endpointer(pre_roll_s=2 * FRAME_S, adaptive=False)
+    assert run(endpointer, [0.1, 0.2, 0.3], value=7) == []
+    events = run(endpointer, [0.9])
+    assert kinds(events) == [SPEECH_START, AUDIO]
+    assert events[0][1] == frames(2, 7).tobytes()  # only the last two frames before onset
+    assert events[1][1][1] is True
+
+
+def test_hysteresis_keeps_frames_between_thresholds_as_speech():
+    endpointer = Endpointer(onset_threshold=0.5, offset_threshold=0.35, adaptive=False)
+    assert run(endpointer, [0.4]) == []  # below onset: not started
+    events = run(endpointer, [0.6, 0.4, 0.3])
+    assert [payload[1] for event, payload in events if event == AUDIO] == [True, True, False]
+
+
+def test_endpoint_after_silence_timeout_drops_the_rest_of_the_chunk():
+    endpointer = Endpointer(pre_roll_s=0.0, adaptive=False, silence_timeouts={"PART_1": 3 * FRAME_S})
+    events = run(endpointer, [0.9, 0.9, 0.1, 0.1, 0.1, 0.9, 0.9])
+    assert kinds(events) == [SPEECH_START, AUDIO, AUDIO, AUDIO, AUDIO, AUDIO, ENDPOINT]
+    assert events[-1][1] == pytest.approx(2 * FRAME_S)
+    assert not endpointer.in_speech
+    # The next chunk starts a new utterance.
+    assert kinds(run(endpointer, [0.9])) == [SPEECH_START, AUDIO]
+
+
+def test_part_2_never_endpoints():
+    endpointer = Endpointer(adaptive=False)
+    events = run(endpointer, [0.9] + [0.0] * 200, exam_state="PART_2_SPEAKING")
+    assert ENDPOINT not in kinds(events)
+
+
+def test_adaptive_timeout_follows_the_candidate():
+    endpointer = Endpointer()
+    base = endpointer.silence_timeout("PART_3")
+    endpointer.observe_turn(words=10, voiced_s=10.0)  # a slow speaker
+    slower = endpointer.silence_timeout("PART_3")
+    assert slower > base
+    endpointer._observe_pause(1.5)
+    assert endpointer.silence_timeout("PART_3") == pytest.approx(1.25 * 1.5)
+    endpointer._observe_pause(0.1)  # gaps between words are ignored
+    assert endpointer.pause_s == pytest.approx(1.5)
+    endpointer._observe_pause(5.0)
+    assert endpointer.silence_timeout("PART_3") == MAX_SILENCE_TIMEOUT_S
@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+import pytest
+
+from app.gateway import ProviderBusy, ProviderGateway
+
+
+def test_queued_requests_get_slots_in_arrival_order():
+    order = []
+
+    async def run():
+        gateway = ProviderGateway("test-fifo", 1, 10, 5.0)
+        first = await gateway.acquire()
+
+        async def queued(name):
+            async with gateway.slot():
+                order.append(name)
+
+        tasks = [asyncio.create_task(queued(name)) for name in ("a", "b", "c")]
+        await asyncio.sleep(0.01)
+        assert gateway.waiting == 3
+        first.release()
+        # A newcomer arriving after the release still waits behind the queue.
+        tasks.append(asyncio.create_task(queued("late")))
+        await asyncio.gather(*tasks)
+        return gateway
+
+    gateway = asyncio.run(run())
+    assert order == ["a", "b", "c", "late"]
+    assert (gateway.in_flight, gateway._held, gateway.waiting) == (0, 0, 0)
+
+
+def test_full_queue_and_missed_deadline_raise_provider_busy():
+    async def run():
+        gateway = ProviderGateway("test-busy", 1, 1, 5.0)
+        lease = await gateway.acquire()
+        waiting = asyncio.create_task(gateway.acquire(gateway.deadline(0.05)))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ProviderBusy, match="already queued"):
+            await gateway.acquire()
+        with pytest.raises(ProviderBusy, match="no free slot"):
+            await waiting
+        lease.release()
+        return gateway
+
+    gateway = asyncio.run(run())
+    assert (gateway.in_flight, gateway._held, gateway.waiting) == (0, 0, 0)
+
+
+def test_urgent_requests_and_try_acquire():
+    async def run():
+        gateway = ProviderGateway("test-urgent", 1, 1, 5.0)
+        lease = gateway.try_acquire()
+        assert lease is not None and gateway.try_acquire() is None
+        urgent = await gateway.acquire(urgent=True)
+        assert (gateway.in_flight, gateway._held) == (2, 1)
+        urgent.release()
+        lease.release()
+        lease.release()  # a second release is a no-op
+        return gateway
+
+    gateway = asyncio.run(run())
+    assert (gateway.in_flight, gateway._held) == (0, 0)
+
+
+def test_call_retries_until_success():
+    attempts = []
+
+    async def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) < 2: raise RuntimeError("upstream hiccup")
+        return "ok"
+
+    gateway = ProviderGateway("test-retry", 2, 2, 5.0, retries=2)
+    assert asyncio.run(gateway.call(flaky)) == "ok"
+    assert len(attempts) == 2
+    assert gateway.in_flight == 0
+
+
+def test_call_times_out_at_the_deadline():
+    gateway = ProviderGateway("test-timeout", 1, 1, 5.0)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(gateway.call(asyncio.sleep, 1.0, timeout_s=0.05))
+    assert (gateway.in_flight, gateway._held) == (0, 0)
+
+
+def test_slow_call_is_hedged_when_a_slot_is_free():
+    delays = [1.0, 0.01]
+
+    async def reply():
+        delay = delays.pop(0)
+        await asyncio.sleep(delay)
+        return delay
+
+    async def run():
+        gateway = ProviderGateway("test-hedge", 2, 2, 5.0)
+        started = time.monotonic()
+        result = await gateway.call(reply, hedge_after_s=0.05)
+        return gateway, result, time.monotonic() - started
+
+    gateway, result, elapsed = asyncio.run(run())
+    assert result == 0.01 and elapsed < 0.5
+    assert (gateway.in_flight, gateway._held) == (0, 0)
+
+
+def test_no_hedge_without_a_free_slot():
+    calls = []
+
+    async def reply():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "first"
+
+    gateway = ProviderGateway("test-no-hedge", 1, 1, 5.0)
+    assert asyncio.run(gateway.call(reply, hedge_after_s=0.02)) == "first"
+    assert len(calls) == 1
+
+
+def test_open_keeps_the_slot_until_the_lease_is_released():
+    async def start_stream():
+        return "stream"
+
+    async def failing():
+        raise RuntimeError("refused")
+
+    async def run():
+        gateway = ProviderGateway("test-open", 1, 1, 5.0)
+        lease, stream = await gateway.open(start_stream)
+        assert stream == "stream" and gateway.try_acquire() is None
+        lease.release()
+        with pytest.raises(RuntimeError):
+            await gateway.open(failing)
+        return gateway
+
+    gateway = asyncio.run(run())
+    assert (gateway.in_flight, gateway._held) == (0, 0)
@@ -0,0 +1,24 @@
+# One simulated exam end to end through the offline load test (fake providers, no network).
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+for sdk in ("deepgram", "cartesia", "google.generativeai"):
+    pytest.importorskip(sdk)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAST = ["--speed", "8", "--ramp-s", "0", "--answer-s", "2", "--monologue-s", "4", "--prep-s", "0.2", "--jitter", "0",
+        "--stt-latency", "0.01", "--stt-finalize", "0.01", "--llm-first-token", "0.01", "--llm-token-interval", "0",
+        "--tts-latency", "0.01", "--scoring-latency", "0.01"]
+
+
+def test_simulated_exam_is_completed_with_every_answer_transcribed():
+    # A subprocess, since the load test patches app.main's providers for the whole process.
+    result = subprocess.run([sys.executable, "-m", "benchmarks.load_test", "--json", "--sessions", "1", "--vad", "energy", *FAST],
+                            cwd=BACKEND_DIR, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    assert (report["completed"], report["errors"], report["silent_answers"]) == (1, 0, 0), report["first_error"]
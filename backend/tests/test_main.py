@@ -0,0 +1,110 @@
+# Tests against app.main, which needs the provider SDKs installed (it makes no requests at import).
+import asyncio
+
+import pytest
+
+for sdk in ("deepgram", "cartesia", "google.generativeai"):
+    pytest.importorskip(sdk)
+
+from app import main
+from app.stt import FakeSttProvider
+
+
+def test_part_2_monologue_is_recorded_and_transcribed(monkeypatch):
+    monkeypatch.setattr(main, "STT_PROVIDER", FakeSttProvider(latency_s=0.0, jitter_s=0.0, text="my favourite place"))
+
+    async def run():
+        manager = main.ConnectionManager(main.ARCHIVE.open("test"))
+        manager.start_utterance(long_turn=True)
+        manager.feed(bytes(main.VAD_SAMPLE_RATE * 2), True)
+        assert manager.buffered_bytes() == main.VAD_SAMPLE_RATE * 2
+        return await manager.transcribe_monologue()
+
+    assert asyncio.run(run()) == "my favourite place"
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    from fastapi.testclient import TestClient
+
+    response = TestClient(main.app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE ielts_turn_latency_seconds histogram" in response.text
+
+
+def test_first_part_3_question_is_recorded_as_part_3(monkeypatch):
+    from benchmarks.fakes import FakeGeminiModel
+
+    monkeypatch.setattr(main.EXAMINER_MODEL, "model", FakeGeminiModel(0.0, 0.0, 0.0))
+    manager = main.IeltsTestManager()
+    manager.exam_state = "PART_2_FOLLOW_UP"
+    manager.conversation.turns = [["user", "I visited a river. [SYSTEM: The user's Part 2 monologue is complete.]", 2]]
+
+    async def run():
+        return "".join([chunk async for chunk in await manager.stream_turn("Not very often.", "PART_3")])
+
+    assert "general questions" in asyncio.run(run())
+    assert [(role, part) for role, _, part in manager.conversation.turns[-2:]] == [("user", 2), ("model", 3)]
+
+
+def test_abandoned_monologue_audio_is_discarded_from_the_archive(monkeypatch):
+    monkeypatch.setattr(main, "STT_PROVIDER", FakeSttProvider(latency_s=0.0, jitter_s=0.0, text="cut off"))
+    records = []
+
+    class RecordingArchive:
+        def add_audio(self, pcm): records.append("audio")
+        def discard_audio(self): records.append("discard")
+
+    async def run():
+        manager = main.ConnectionManager(RecordingArchive())
+        manager.start_utterance(long_turn=True)
+        manager.feed(bytes(main.VAD_SAMPLE_RATE * 2), True)
+        manager.reset()
+        manager.start_utterance(long_turn=True)
+        await manager.transcribe_monologue()
+
+    asyncio.run(run())
+    assert records.count("discard") == 1
+
+
+def test_cue_card_turn_is_recorded_as_part_2(monkeypatch):
+    from app.pipeline import detect_transition
+    from app.scoring import part_transcript
+    from benchmarks.fakes import FakeGeminiModel
+
+    monkeypatch.setattr(main.EXAMINER_MODEL, "model", FakeGeminiModel(0.0, 0.0, 0.0, part_1_questions=1))
+    manager = main.IeltsTestManager()
+    manager.exam_state = "PART_1"
+    manager.conversation.turns = [["model", "Do you work or are you a student?", 1]]
+
+    async def run():
+        return "".join([chunk async for chunk in await manager.stream_turn("I study economics.")])
+
+    extra = manager.apply_transition(detect_transition(asyncio.run(run())))
+    assert (manager.exam_state, extra) == ("PART_2_PREP", {"start_timer_on_finish": "prep_timer"})
+    assert "[CUE_CARD_START]" in part_transcript(manager.conversation.turns, 2)[0]
+    assert "[CUE_CARD_START]" not in part_transcript(manager.conversation.turns, 1)[0]
+
+
+def test_audio_fed_after_the_monologue_ends_is_not_part_of_the_next_answer(monkeypatch):
+    monkeypatch.setattr(main, "STT_PROVIDER", FakeSttProvider(latency_s=0.0, jitter_s=0.0, text="next answer"))
+    archived = []
+
+    class RecordingArchive:
+        def add_audio(self, pcm): archived.append(bytes(pcm))
+        def discard_audio(self): pass
+
+    async def run():
+        manager = main.ConnectionManager(RecordingArchive())
+        manager.start_utterance(long_turn=True)
+        manager.feed(bytes(main.VAD_SAMPLE_RATE * 2), True)
+        await manager.transcribe_monologue()
+        archived.clear()
+        manager.feed(b"\x01\x00" * 800, True)  # still in flight when the speaking time ran out
+        manager.start_utterance()
+        answer = b"\x02\x00" * main.VAD_SAMPLE_RATE
+        manager.feed(answer, True)
+        await manager.transcribe_utterance()
+        return answer
+
+    assert archived == [asyncio.run(run())]
@@ -0,0 +1,60 @@
+import json
+import logging
+
+import pytest
+
+from app.logs import TextFormatter, JsonFormatter
+from app.metrics import Registry, Counter, Gauge, Histogram, SessionMetrics, span, STAGE_SECONDS, TURN_LATENCY_SECONDS
+
+
+def test_counter_and_gauge_exposition():
+    registry = Registry()
+    counter = registry.register(Counter("requests_total", "Requests.", ("kind", )))
+    counter.labels("a").inc()
+    counter.labels("a").inc(2)
+    gauge = registry.register(Gauge("queue_depth", "Depth.", fn=lambda: 7))
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests.", "# TYPE requests_total counter", 'requests_total{kind="a"} 3.0',
+        "# HELP queue_depth Depth.", "# TYPE queue_depth gauge", "queue_depth 7"]
+    assert gauge.labels() is gauge._default
+
+
+def test_histogram_buckets_are_cumulative_with_recent_quantiles():
+    histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value)
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_count 4" in lines
+    assert histogram.quantiles()[0.5] == pytest.approx(0.5)
+    assert 'latency_seconds_recent{quantile="0.5"} 0.5' in lines
+
+
+def test_span_and_session_turn_latency():
+    before = STAGE_SECONDS.labels("test_stage").count
+    with span("test_stage"):
+        pass
+    assert STAGE_SECONDS.labels("test_stage").count == before + 1
+
+    session = SessionMetrics()
+    assert session.first_audio() is None  # no turn in flight
+    turns = TURN_LATENCY_SECONDS._default.count
+    session.end_of_speech(0.0)
+    assert session.first_audio() > 0
+    assert session.first_audio() is None  # only the first audio of a turn counts
+    assert TURN_LATENCY_SECONDS._default.count == turns + 1
+    assert session.summary()["turns"] == 1
+
+
+def make_record(message, **fields):
+    record = logging.LogRecord("ielts", logging.WARNING, __file__, 1, message, None, None)
+    record.tag, record.level, record.fields = "TTS CACHE", "WARNING", fields
+    return record
+
+
+def test_log_formats():
+    assert TextFormatter().format(make_record("Slow.", ms=12)) == "[TTS CACHE WARNING] Slow. (ms=12)"
+    data = json.loads(JsonFormatter().format(make_record("Slow.", ms=12)))
+    assert {k: data[k] for k in ("level", "tag", "msg", "ms")} == {"level": "warning", "tag": "tts_cache", "msg": "Slow.", "ms": 12}
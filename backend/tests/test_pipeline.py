@@ -0,0 +1,59 @@
+import asyncio
+
+from app.pipeline import ExaminerTurn, SentenceSplitter, detect_transition, speech_sentences
+
+
+async def stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def test_splitter_emits_sentences_as_they_complete():
+    splitter = SentenceSplitter()
+    assert splitter.feed("Thank you for that answer. Now tell") == ["Thank you for that answer. "]
+    assert splitter.feed(" me about your hometown.") == []
+    assert splitter.flush() == ["Now tell me about your hometown."]
+    assert splitter.flush() == []
+
+
+def test_splitter_keeps_short_sentences_and_tags_together():
+    splitter = SentenceSplitter()
+    assert splitter.feed("Okay. Good. [SYSTEM: note. more.] That is all for now. ") == [
+        "Okay. Good. [SYSTEM: note. more.] ", "That is all for now. "]
+
+
+def test_transitions():
+    assert detect_transition("Alright, that's the end of Part 1. Now Part 2.") == "prep_timer"
+    assert detect_transition("Your preparation time is up. Please start speaking now.") == "speak_timer"
+    assert detect_transition("Thank you.") is None
+
+
+def test_speech_sentences_strip_tags_and_cue_card_markers():
+    text = ("Alright, that's the end of Part 1. Now we will move on to Part 2.\n"
+            "[CUE_CARD_START]\nDescribe a *place* you visited.\n[CUE_CARD_END]\n[SYSTEM: prep]")
+    assert speech_sentences(text) == ["Alright, that's the end of Part 1.", "Now we will move on to Part 2.",
+                                      "Describe a place you visited."]
+
+
+def test_examiner_turn_sends_audio_in_order():
+    sent, completed = [], []
+
+    async def synthesize(sentence):
+        # Later sentences finish first; the client must still hear them in order.
+        await asyncio.sleep(0.03 if sentence.startswith("First") else 0.0)
+        return sentence.encode()
+
+    async def send_audio(audio, last):
+        sent.append((audio, last))
+
+    async def on_text_complete(text, transition):
+        completed.append((text, transition))
+
+    async def run():
+        turn = ExaminerTurn(synthesize, send_audio)
+        return await turn.run(stream("First sentence is here. ", "Second sentence ", "is here too."), on_text_complete)
+
+    text = asyncio.run(run())
+    assert text == "First sentence is here. Second sentence is here too."
+    assert sent == [(b"First sentence is here.", False), (b"Second sentence is here too.", False), (b"", True)]
+    assert completed == [(text, None)]
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import types
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+from app.gateway import ProviderGateway
+from app.scoring import (ExamScorer, SECTION_TITLES, TEMPLATE_SECTIONS, merge_section, parse_json_reply, part_transcript,
+                         round_band, validate_assessment, validate_evaluation)
+
+
+def assessment(title: str, score: float, suggestion: str = "Practise more.") -> dict:
+    section = TEMPLATE_SECTIONS[title]
+    return {"score": score, "strengths": {key: f"Good {key}." for key in section["strengths"]},
+            "improvements": {key: f"Better {key}." for key in section["improvements"]}, "suggestion": suggestion}
+
+
+class ScriptedModel:
+    """Replies with `score` for every criterion; with `flaky`, the first reply for each criterion and part is malformed."""
+
+    def __init__(self, score: float, flaky: bool = False):
+        self.score = score
+        self.flaky = flaky
+        self.requests = []
+
+    async def generate_content_async(self, message: str):
+        criterion, part = message.split("\n")[:2]
+        title = criterion.removeprefix("Criterion: ")
+        self.requests.append((title, part))
+        if self.flaky and self.requests.count((title, part)) == 1:
+            return types.SimpleNamespace(text="Sure! Here is the score: about six")
+        return types.SimpleNamespace(text=f"```json\n{json.dumps(assessment(title, self.score))}\n```")
+
+
+TURNS = [["model", "Do you work or are you a student?", 1], ["user", "I am a student of economics.", 1],
+         ["model", "Why do cities differ?", 3], ["user", "Money and planning matter a lot.", 3]]
+
+
+def test_round_band_rounds_quarters_up():
+    assert [round_band(s) for s in (6.2, 6.25, 6.74, 6.75)] == [6.0, 6.5, 6.5, 7.0]
+
+
+def test_assessment_validation():
+    title = SECTION_TITLES[0]
+    assert validate_assessment(parse_json_reply(f"```{json.dumps(assessment(title, 6.3))}```"), title)["score"] == 6.5
+    with pytest.raises(ValueError):
+        validate_assessment(assessment(title, 9.5), title)
+    broken = assessment(title, 6.0)
+    broken["strengths"].popitem()
+    with pytest.raises(ValueError):
+        validate_assessment(broken, title)
+
+
+def test_merge_weights_parts_by_words_and_picks_the_weakest_suggestion():
+    title = SECTION_TITLES[0]
+    section, suggestion = merge_section(title, {1: (10, assessment(title, 5.0, "Part 1 tip.")),
+                                                3: (30, assessment(title, 7.0, "Part 3 tip."))})
+    assert section["score"] == "6.5"  # (5 * 10 + 7 * 30) / 40 = 6.5
+    assert suggestion == "Part 1 tip."
+    assert all(note.startswith("Part 1: ") and " Part 3: " in note for note in section["strengths"].values())
+
+
+def test_part_transcript_counts_candidate_words():
+    transcript, words = part_transcript(TURNS, 3)
+    assert transcript == "Examiner: Why do cities differ?\nCandidate: Money and planning matter a lot."
+    assert words == 6
+
+
+def test_scorer_retries_bad_replies_and_merges_a_valid_report():
+    model = ScriptedModel(6.0, flaky=True)
+    scorer = ExamScorer(model, ProviderGateway("scoring-test", 4, 100, 10.0))
+    sections = []
+
+    async def on_section(index, section):
+        sections.append(index)
+
+    async def run():
+        scorer.score_finished_parts("PART_3", TURNS)  # Part 1 in the background
+        return await scorer.finish(TURNS, on_section)
+
+    report = asyncio.run(run())
+    assert validate_evaluation(report) is report
+    assert report["overall_band_score"] == "6.0"
+    assert sorted(sections) == list(range(len(SECTION_TITLES)))
+    assert len(model.requests) == 2 * 2 * len(SECTION_TITLES)  # 2 parts, each criterion answered on the second try
+    assert set(scorer.snapshot()) == {"1", "3"}
@@ -0,0 +1,62 @@
+import asyncio
+import zlib
+
+import pytest
+
+from app.session_store import (SessionStore, InMemorySessionStore, SqliteSessionStore, create_session_store,
+                               encode_snapshot, decode_snapshot)
+
+SNAPSHOT = {"exam_state": "PART_2_SPEAKING", "history": [["model", "Describe a café.", 2]], "timer": ["speak_timer", 1.5e9]}
+
+
+def test_snapshot_round_trip():
+    assert decode_snapshot(encode_snapshot(SNAPSHOT)) == SNAPSHOT
+
+
+def test_unreadable_or_old_snapshots_are_discarded():
+    assert decode_snapshot(b"not zlib") is None
+    assert decode_snapshot(zlib.compress(b'{"v": 1, "exam_state": "PART_1"}')) is None
+
+
+def test_store_without_overrides_cannot_be_created():
+    class Incomplete(SessionStore):
+        async def delete(self, session_id):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_save_load_expire_delete(kind, tmp_path):
+    store = InMemorySessionStore() if kind == "memory" else SqliteSessionStore(str(tmp_path / "sessions.db"))
+
+    async def run():
+        await store.save("a", SNAPSHOT)
+        loaded = await store.load("a")
+        store.ttl_s = -1
+        await store.save("b", SNAPSHOT)
+        expired = await store.load("b")
+        await store.delete("a")
+        return loaded, expired, await store.load("a")
+
+    try:
+        assert asyncio.run(run()) == (SNAPSHOT, None, None)
+    finally:
+        store.close()
+
+
+def test_sqlite_store_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    first, second = create_session_store(f"sqlite:///{path}"), create_session_store(f"sqlite:///{path}")
+    try:
+        asyncio.run(first.save("s", SNAPSHOT))
+        assert asyncio.run(second.load("s")) == SNAPSHOT
+    finally:
+        first.close()
+        second.close()
+
+
+def test_unknown_store_is_rejected():
+    with pytest.raises(ValueError):
+        create_session_store("redis://localhost")
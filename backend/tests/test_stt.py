@@ -0,0 +1,69 @@
+import asyncio
+import io
+import wave
+
+import pytest
+
+pytest.importorskip("deepgram")
+
+from app.gateway import ProviderGateway
+from app.stt import SttStream, BufferedStream, FakeSttProvider, pcm_to_wav, create_stt_provider, PCM_BYTES_PER_SECOND
+
+ONE_SECOND = bytes(PCM_BYTES_PER_SECOND)
+
+
+def fast_provider(**kwargs):
+    return FakeSttProvider(latency_s=0.0, jitter_s=0.0, processing_rtf=0.0, finalize_latency_s=0.0, **kwargs)
+
+
+def test_pcm_to_wav_is_16khz_mono():
+    with wave.open(io.BytesIO(pcm_to_wav(ONE_SECOND))) as wav:
+        assert (wav.getnchannels(), wav.getsampwidth(), wav.getframerate(), wav.getnframes()) == (1, 2, 16000, 16000)
+
+
+def test_stream_without_run_cannot_be_created():
+    class Incomplete(SttStream):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_fake_stream_transcribes_what_was_sent():
+    async def run():
+        stream = fast_provider(text="hello there").open_stream()
+        for _ in range(4): stream.send(ONE_SECOND[:PCM_BYTES_PER_SECOND // 4])
+        return await stream.finish()
+
+    assert asyncio.run(run()) == "hello there"
+
+
+def test_buffered_stream_uses_batch_transcription():
+    async def run():
+        stream = BufferedStream(fast_provider(words_per_second=2))
+        stream.send(ONE_SECOND)
+        stream.send(ONE_SECOND)
+        return await stream.finish()
+
+    assert len(asyncio.run(run()).split()) == 4
+
+
+def test_short_audio_is_not_transcribed():
+    assert asyncio.run(fast_provider(text="x").transcribe(b"\x00" * 100)) == ""
+
+
+def test_busy_gateway_gives_empty_transcript():
+    async def run():
+        gateway = ProviderGateway("stt-test", 1, 0, 1.0)
+        lease = await gateway.acquire()
+        try:
+            return await fast_provider(text="x", gateway=gateway).transcribe(ONE_SECOND)
+        finally:
+            lease.release()
+
+    assert asyncio.run(run()) == ""
+
+
+def test_unknown_provider_is_rejected():
+    with pytest.raises(ValueError):
+        create_stt_provider("whisper")
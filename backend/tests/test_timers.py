@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+from app.timers import TimerScheduler
+
+
+def run_with_scheduler(body):
+    async def run():
+        scheduler = TimerScheduler()
+        await scheduler.start()
+        try:
+            return await body(scheduler)
+        finally:
+            await scheduler.stop()
+
+    return asyncio.run(run())
+
+
+def test_timers_fire_in_deadline_order_even_if_scheduled_later():
+    fired = []
+
+    async def body(scheduler):
+        now = time.time()
+        for name, delay in (("late", 0.08), ("early", 0.02), ("middle", 0.05)):
+            async def callback(name=name):
+                fired.append(name)
+            scheduler.schedule(now + delay, callback)
+        assert scheduler.pending == 3
+        await asyncio.sleep(0.15)
+        return scheduler.pending
+
+    assert run_with_scheduler(body) == 0
+    assert fired == ["early", "middle", "late"]
+
+
+def test_cancel_before_and_after_the_deadline():
+    fired = []
+
+    async def body(scheduler):
+        async def callback():
+            fired.append(True)
+            await asyncio.sleep(1)
+            fired.append("finished")
+
+        cancelled = scheduler.schedule(time.time() + 0.02, callback)
+        assert cancelled.cancel() and scheduler.pending == 0
+        running = scheduler.schedule(time.time() + 0.02, callback)
+        await asyncio.sleep(0.05)
+        assert running.cancel() is False  # already fired
+        running.cancel(running=True)
+        await asyncio.sleep(0)
+        return running.task.cancelled()
+
+    assert run_with_scheduler(body)
+    assert fired == [True]
+
+
+def test_resyncs_report_the_remaining_time_until_the_deadline():
+    remaining = []
+
+    async def body(scheduler):
+        async def on_resync(remaining_s):
+            remaining.append(remaining_s)
+
+        async def callback():
+            pass
+
+        timer = scheduler.schedule(time.time() + 0.1, callback, resync_s=0.03, on_resync=on_resync)
+        await asyncio.sleep(0.15)
+        return timer.fired
+
+    assert run_with_scheduler(body)
+    assert len(remaining) == 3
+    assert remaining == sorted(remaining, reverse=True) and 0 < remaining[-1] < 0.05
+
+
+def test_a_failing_callback_does_not_stop_the_scheduler():
+    fired = []
+
+    async def body(scheduler):
+        async def broken():
+            raise RuntimeError("boom")
+
+        async def callback():
+            fired.append(True)
+
+        scheduler.schedule(time.time(), broken)
+        scheduler.schedule(time.time() + 0.02, callback)
+        await asyncio.sleep(0.05)
+
+    run_with_scheduler(body)
+    assert fired == [True]
@@ -0,0 +1,49 @@
+import asyncio
+import base64
+import json
+
+import pytest
+
+from app.transport import AudioChannel, pack_frame, unpack_frame, KIND_AUDIO_IN, KIND_AUDIO_OUT, FLAG_LAST
+
+
+class ScriptedWebSocket:
+    def __init__(self, messages):
+        self.messages = list(messages)
+
+    async def receive(self):
+        return self.messages.pop(0)
+
+
+def binary(data):
+    return {"type": "websocket.receive", "bytes": data}
+
+
+def test_pack_unpack_round_trip():
+    frame = pack_frame(KIND_AUDIO_OUT, 2**32 + 5, b"wav", FLAG_LAST)
+    kind, flags, seq, payload = unpack_frame(frame)
+    assert (kind, flags, seq, bytes(payload)) == (KIND_AUDIO_OUT, FLAG_LAST, 5, b"wav")
+
+
+def test_unpack_rejects_short_frame():
+    with pytest.raises(ValueError):
+        unpack_frame(b"\x01\x00")
+
+
+def test_receive_skips_malformed_frames_and_counts_gaps():
+    channel = AudioChannel(ScriptedWebSocket([
+        binary(pack_frame(KIND_AUDIO_IN, 0, b"\x01\x00")),
+        binary(b"\x01"),                                  # too short
+        binary(pack_frame(KIND_AUDIO_OUT, 1, b"")),       # wrong direction
+        binary(pack_frame(KIND_AUDIO_IN, 3, b"\x02\x00")),
+        {"type": "websocket.receive", "text": json.dumps({"type": "audio_chunk", "data": base64.b64encode(b"\x03\x00").decode()})},
+    ]))
+
+    async def run():
+        return [await channel.receive() for _ in range(3)]
+
+    received = asyncio.run(run())
+    assert [(kind, bytes(data)) for kind, data in received] == [
+        ("audio_chunk", b"\x01\x00"), ("audio_chunk", b"\x02\x00"), ("audio_chunk", b"\x03\x00")]
+    assert channel.bad_frames == 2
+    assert channel.lost_frames == 2
@@ -0,0 +1,71 @@
+import asyncio
+
+from app.tts_cache import TtsCache, normalize_text
+
+
+def make_cache(calls, **kwargs):
+    async def synthesize(text):
+        calls.append(text)
+        await asyncio.sleep(0.01)
+        return text.encode()
+
+    return TtsCache(synthesize, "sonic", "voice", {"container": "wav"}, **kwargs)
+
+
+def test_key_ignores_whitespace_and_unicode_form_but_not_voice():
+    cache = make_cache([])
+    assert normalize_text("  Hello\n  there now ") == "Hello there now"
+    assert cache.key("Hello  there") == cache.key("Hello there\n")
+    assert cache.key("Hello there") != cache.key("Hello there.")
+    other_voice = TtsCache(cache.synthesize, "sonic", "another", {"container": "wav"})
+    assert other_voice.key("Hello there") != cache.key("Hello there")
+
+
+def test_concurrent_requests_share_one_synthesis():
+    calls = []
+    cache = make_cache(calls)
+
+    async def run():
+        return await asyncio.gather(*(cache.get("Good morning.") for _ in range(5)))
+
+    assert asyncio.run(run()) == [b"Good morning."] * 5
+    assert calls == ["Good morning."]
+    assert asyncio.run(cache.get("Good  morning.")) == b"Good morning."
+    assert (cache.misses, cache.memory_hits) == (1, 1)
+
+
+def test_memory_budget_evicts_least_recently_used():
+    cache = make_cache([], memory_budget_bytes=10)
+
+    async def run():
+        for text in ("aaaa", "bbbb", "aaaa", "cccc"): await cache.get(text)
+
+    asyncio.run(run())
+    assert cache.stats()["memory_entries"] == 2 and cache.memory_bytes == 8
+    assert cache.evictions == 1
+    assert cache.key("bbbb") not in cache._memory
+
+
+def test_disk_tier_is_shared_between_caches(tmp_path):
+    calls = []
+    first, second = make_cache(calls, disk_dir=str(tmp_path)), make_cache(calls, disk_dir=str(tmp_path))
+    first._write_disk(first.key("Hello."), b"audio")
+    assert asyncio.run(second.get("Hello.")) == b"audio"
+    assert calls == [] and second.disk_hits == 1
+
+
+def test_cancelling_the_first_caller_does_not_cancel_the_shared_synthesis():
+    calls = []
+    cache = make_cache(calls)
+
+    async def run():
+        first = asyncio.create_task(cache.get("Your preparation time is up."))
+        second = asyncio.create_task(cache.get("Your preparation time is up."))
+        await asyncio.sleep(0)
+        first.cancel()
+        audio = await second
+        return first.cancelled(), audio
+
+    assert asyncio.run(run()) == (True, b"Your preparation time is up.")
+    assert calls == ["Your preparation time is up."]
+    assert cache._inflight == {} and cache.stats()["memory_entries"] == 1
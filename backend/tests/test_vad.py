@@ -0,0 +1,66 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.vad import VadEngine, pcm16_to_frames, VAD_FRAME_SAMPLES
+
+
+class CountingBackend:
+    """Probability = frames this session has seen so far / 100, so a mixed-up state shows."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def initial_state(self):
+        return 0
+
+    def infer(self, frames, states):
+        self.batch_sizes.append(len(frames))
+        new_states = [state + 1 for state in states]
+        return np.array([state / 100 for state in new_states], dtype=np.float32), new_states
+
+
+def test_pcm16_to_frames_pads_the_last_frame():
+    pcm = np.full(VAD_FRAME_SAMPLES + 10, 16384, dtype=np.int16).tobytes()
+    frames = pcm16_to_frames(pcm)
+    assert frames.shape == (2, VAD_FRAME_SAMPLES)
+    assert frames[1, 9] == 0.5 and frames[1, 10] == 0.0
+
+
+def test_engine_keeps_state_per_session_and_batches_sessions():
+    async def run():
+        engine = VadEngine(CountingBackend, max_wait_s=0.01)
+        await engine.start()
+        try:
+            a, b = engine.open_session(), engine.open_session()
+            frames = np.zeros((3, VAD_FRAME_SAMPLES), dtype=np.float32)
+            first_a, first_b = await asyncio.gather(engine.infer(a, frames), engine.infer(b, frames[:1]))
+            second_a = await engine.infer(a, frames[:1])
+            engine.reset_session(b)
+            second_b = await engine.infer(b, frames[:1])
+            return engine, first_a, first_b, second_a, second_b
+        finally:
+            await engine.stop()
+
+    engine, first_a, first_b, second_a, second_b = asyncio.run(run())
+    assert first_a.tolist() == np.float32([0.01, 0.02, 0.03]).tolist()
+    assert first_b.tolist() == np.float32([0.01]).tolist()
+    assert second_a.tolist() == np.float32([0.04]).tolist()
+    assert second_b.tolist() == np.float32([0.01]).tolist()  # reset to the initial state
+    assert engine.backend.batch_sizes[0] == 2  # both sessions' first frames in one call
+
+
+def test_closed_session_fails_its_request():
+    async def run():
+        engine = VadEngine(CountingBackend)
+        await engine.start()
+        try:
+            session = engine.open_session()
+            engine.close_session(session)
+            return await engine.infer(session, np.zeros((1, VAD_FRAME_SAMPLES), dtype=np.float32))
+        finally:
+            await engine.stop()
+
+    with pytest.raises(KeyError):
+        asyncio.run(run())
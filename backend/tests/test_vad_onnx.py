@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+
+from app.vad import SileroOnnxBackend, DEFAULT_ONNX_PATH, VAD_FRAME_SAMPLES
+
+if not os.path.exists(DEFAULT_ONNX_PATH):
+    pytest.skip("Silero ONNX model not present", allow_module_level=True)
+
+
+def test_batched_inference_matches_single_stream():
+    backend = SileroOnnxBackend()
+    rng = np.random.default_rng(0)
+    frames = (rng.standard_normal((3, VAD_FRAME_SAMPLES)) * 0.1).astype(np.float32)
+    silence = np.zeros((1, VAD_FRAME_SAMPLES), dtype=np.float32)
+
+    # Session a gets the noise frames one by one, session b silence, batched together.
+    states = [backend.initial_state(), backend.initial_state()]
+    batched = []
+    for frame in frames:
+        probs, states = backend.infer(np.concatenate([frame[None], silence]), states)
+        batched.append(probs)
+
+    single_state = [backend.initial_state()]
+    for frame, probs in zip(frames, batched):
+        single, single_state = backend.infer(frame[None], single_state)
+        assert single[0] == pytest.approx(probs[0], abs=1e-5)
+    assert all(0.0 <= p <= 1.0 for probs in batched for p in probs)
+    assert batched[-1][1] < 0.5  # silence is not speech
+
+
+def test_onnx_backend_never_imports_torch():
+    code = "import sys; from app.vad import SileroOnnxBackend; SileroOnnxBackend(); print('torch' in sys.modules)"
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=backend_dir, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
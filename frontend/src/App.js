@@ -1,6 +1,20 @@
 import React, { useState, useEffect, useRef } from 'react';
 import './App.css';
 
+// Binary audio transport, negotiated as a WebSocket subprotocol. The server falls back
+// to base64-in-JSON when it doesn't accept it.
+const BINARY_SUBPROTOCOL = 'ielts.binary.v1';
+const JSON_SUBPROTOCOL = 'ielts.json.v1';
+const FRAME_HEADER_BYTES = 8; // kind (u8), flags (u8), reserved (u16), seq (u32), little-endian
+const KIND_AUDIO_IN = 1;
+const KIND_AUDIO_OUT = 2;
+const FLAG_LAST = 0x01;
+
+// The session id survives page reloads in this tab; on reconnect the server restores the
+// exam from its snapshot, on whichever worker the new connection lands.
+const SESSION_KEY = 'ielts.session_id';
+const RECONNECT_MAX_DELAY_MS = 10000;
+
 const TestState = {
   IDLE: 'IDLE',
   AI_SPEAKING: 'AI_SPEAKING',
@@ -10,6 +24,14 @@ const TestState = {
   ENDED: 'ENDED',
 };
 
+const RESUMED_TEST_STATE = {
+  START: TestState.IDLE,
+  PART_2_PREP: TestState.PREP_TIME,
+  PART_2_SPEAKING: TestState.PART_2_SPEAKING,
+  EVALUATION: TestState.AI_SPEAKING,
+  ENDED: TestState.ENDED,
+};
+
 const Timer = ({ remaining, type, onSkip, onFinish }) => {
   const formatTime = (seconds) => {
     const minutes = Math.floor(seconds / 60);
@@ -39,10 +61,10 @@ const EvaluationReport = ({ report }) => {
       <h2>IELTS Speaking Test Evaluation</h2>
       <div className="overall-score-block">
         <h3>Overall Band Score</h3>
-        <span>{report.overall_band_score}</span>
+        <span>{report.overall_band_score ?? 'Scoring…'}</span>
       </div>
       <div className="sections-grid">
-        {report.sections.map((section, index) => (
+        {report.sections.filter(Boolean).map((section, index) => (
           <div key={index} className="evaluation-section">
             <div className="section-header">
               <h3>{section.title}</h3>
@@ -86,6 +108,11 @@ function App() {
   const audioNode = useRef(null);
   const audioStream = useRef(null);
   const audioPlayer = useRef(new Audio());
+  const audioUrl = useRef(null);
+  const audioQueue = useRef([]);
+  const audioPlaying = useRef(false);
+  const turnAudioComplete = useRef(false);
+  const audioSeq = useRef(0);
   const transcriptEndRef = useRef(null);
 
   useEffect(() => {
@@ -102,9 +129,17 @@ function App() {
       const source = audioContext.current.createMediaStreamSource(audioStream.current);
       audioNode.current = new AudioWorkletNode(audioContext.current, 'resampler-processor', { processorOptions: { targetSampleRate: 16000 } });
       audioNode.current.port.onmessage = (event) => {
-        const pcm16Data = new Int16Array(event.data);
-        const base64Audio = btoa(String.fromCharCode.apply(null, new Uint8Array(pcm16Data.buffer)));
-        if (ws.current?.readyState === WebSocket.OPEN) {
+        if (ws.current?.readyState !== WebSocket.OPEN) return;
+        if (ws.current.protocol === BINARY_SUBPROTOCOL) {
+          const frame = new Uint8Array(FRAME_HEADER_BYTES + event.data.byteLength);
+          const header = new DataView(frame.buffer);
+          header.setUint8(0, KIND_AUDIO_IN);
+          header.setUint32(4, audioSeq.current, true);
+          audioSeq.current = (audioSeq.current + 1) >>> 0;
+          frame.set(new Uint8Array(event.data), FRAME_HEADER_BYTES);
+          ws.current.send(frame.buffer);
+        } else {
+          const base64Audio = btoa(String.fromCharCode.apply(null, new Uint8Array(event.data)));
           ws.current.send(JSON.stringify({ type: 'audio_chunk', data: base64Audio }));
         }
       };
@@ -118,17 +153,63 @@ function App() {
   };
 
   // --- EFFECT 1: Handles the WebSocket connection lifecycle ---
-  // This runs ONLY ONCE when the component mounts.
+  // This runs ONLY ONCE when the component mounts; dropped connections are re-opened and resumed.
   useEffect(() => {
     const backendUrl = 'ws://localhost:8001/';
-    ws.current = new WebSocket(backendUrl);
-    ws.current.onopen = () => setIsConnected(true);
-    ws.current.onclose = () => setIsConnected(false);
-    ws.current.onerror = (error) => console.error("WebSocket error:", error);
+    let reconnectTimeout = null;
+    let reconnectDelay = 1000;
+    let unmounted = false;
+
+    // An examiner turn arrives as one or more WAV chunks, played back to back. Once the
+    // chunk flagged "last" has been received and everything has played, 'turnended' fires.
+    const playNext = () => {
+      if (audioUrl.current) URL.revokeObjectURL(audioUrl.current);
+      audioUrl.current = null;
+      const src = audioQueue.current.shift();
+      if (src) {
+        audioUrl.current = src.startsWith('blob:') ? src : null;
+        audioPlaying.current = true;
+        audioPlayer.current.src = src;
+        audioPlayer.current.play();
+      } else {
+        audioPlaying.current = false;
+        if (turnAudioComplete.current) {
+          turnAudioComplete.current = false;
+          audioPlayer.current.dispatchEvent(new Event('turnended'));
+        }
+      }
+    };
+    const enqueueAudio = (src, last) => {
+      if (src) audioQueue.current.push(src);
+      if (last) turnAudioComplete.current = true;
+      if (!audioPlaying.current) playNext();
+    };
+    const player = audioPlayer.current;
+    player.addEventListener('ended', playNext);
 
-    ws.current.onmessage = (event) => {
+    const handleMessage = (event) => {
+      if (event.data instanceof ArrayBuffer) {
+        const header = new DataView(event.data);
+        if (header.getUint8(0) === KIND_AUDIO_OUT) {
+          const hasAudio = event.data.byteLength > FRAME_HEADER_BYTES;
+          const wav = new Blob([event.data.slice(FRAME_HEADER_BYTES)], { type: 'audio/wav' });
+          enqueueAudio(hasAudio ? URL.createObjectURL(wav) : null, (header.getUint8(1) & FLAG_LAST) !== 0);
+        }
+        return;
+      }
       const message = JSON.parse(event.data);
       switch (message.type) {
+        case 'session':
+          sessionStorage.setItem(SESSION_KEY, message.session_id);
+          break;
+        case 'session_resumed':
+          sessionStorage.setItem(SESSION_KEY, message.session_id);
+          setTranscript(message.transcript.map(line => ({ speaker: line.speaker, text: line.data })));
+          setPendingTimer(null);
+          setTimer({ type: null, remaining: 0 });
+          if (message.evaluation) setEvaluationReport(message.evaluation);
+          setTestState(RESUMED_TEST_STATE[message.exam_state] || TestState.LISTENING);
+          break;
         case 'transcript':
           setTranscript(prev => [...prev, { speaker: message.speaker, text: message.data }]);
           if (message.speaker === 'User') {
@@ -139,17 +220,16 @@ function App() {
           }
           break;
         case 'audio':
-          const audioSrc = "data:audio/wav;base64," + message.data;
-          audioPlayer.current.src = audioSrc;
-          audioPlayer.current.play();
+          enqueueAudio(message.data ? "data:audio/wav;base64," + message.data : null, message.last !== false);
           break;
         case 'timer_start':
-          setTimer({ type: message.timer_type, remaining: message.duration });
+          // The server sends the deadline once; the countdown runs locally (Effect 4).
+          setTimer({ type: message.timer_type, remaining: Math.ceil(message.duration), endsAt: Date.now() + message.duration * 1000 });
           if (message.timer_type === 'prep_timer') setTestState(TestState.PREP_TIME);
           else if (message.timer_type === 'speak_timer') setTestState(TestState.PART_2_SPEAKING);
           break;
-        case 'timer_update':
-          setTimer(prev => ({ ...prev, remaining: message.remaining }));
+        case 'timer_sync':
+          setTimer(prev => (prev.type === message.timer_type ? { ...prev, endsAt: Date.now() + message.remaining * 1000 } : prev));
           break;
         case 'timer_end':
           setTimer({ type: null, remaining: 0 });
@@ -158,18 +238,58 @@ function App() {
         case 'force_stop_listening':
           stopMicrophone();
           break;
+        case 'evaluation_section':
+          // Sections arrive as soon as each is scored; the overall band follows in final_evaluation.
+          setEvaluationReport(prev => {
+            const sections = [...(prev?.sections || [])];
+            sections[message.index] = message.data;
+            return { ...prev, sections };
+          });
+          setTestState(TestState.ENDED);
+          stopMicrophone();
+          break;
         case 'final_evaluation':
           setEvaluationReport(message.data);
           setTestState(TestState.ENDED);
           stopMicrophone();
           break;
+        case 'server_busy':
+          // The test wasn't started; the candidate can press Start again.
+          setTranscript(prev => [...prev, { speaker: 'System', text: `The examiner is busy right now. Please try again in ${message.retry_after_s} seconds.` }]);
+          setTestState(TestState.IDLE);
+          break;
         default:
           break;
       }
     };
 
+    const connect = () => {
+      ws.current = new WebSocket(backendUrl, [BINARY_SUBPROTOCOL, JSON_SUBPROTOCOL]);
+      ws.current.binaryType = 'arraybuffer';
+      ws.current.onopen = () => {
+        setIsConnected(true);
+        reconnectDelay = 1000;
+        const sessionId = sessionStorage.getItem(SESSION_KEY);
+        if (sessionId) ws.current.send(JSON.stringify({ type: 'resume', session_id: sessionId }));
+      };
+      ws.current.onclose = () => {
+        setIsConnected(false);
+        if (unmounted) return;
+        reconnectTimeout = setTimeout(connect, reconnectDelay);
+        reconnectDelay = Math.min(reconnectDelay * 2, RECONNECT_MAX_DELAY_MS);
+      };
+      ws.current.onerror = (error) => console.error("WebSocket error:", error);
+      ws.current.onmessage = handleMessage;
+    };
+    connect();
+
     // This cleanup function will now only run once when the component unmounts.
-    return () => ws.current?.close();
+    return () => {
+      unmounted = true;
+      clearTimeout(reconnectTimeout);
+      player.removeEventListener('ended', playNext);
+      ws.current?.close();
+    };
   }, []); // The empty array [] is the key to a stable connection.
 
   // --- EFFECT 2: Handles events that depend on state changes ---
@@ -186,9 +306,9 @@ function App() {
       }
     };
 
-    player.addEventListener('ended', handleAudioEnd);
+    player.addEventListener('turnended', handleAudioEnd);
     return () => {
-      player.removeEventListener('ended', handleAudioEnd);
+      player.removeEventListener('turnended', handleAudioEnd);
     };
   }, [testState, pendingTimer]);
 
@@ -201,6 +321,17 @@ function App() {
     }
   }, [testState]);
 
+  // --- EFFECT 4: Counts the Part 2 timer down to its deadline ---
+  useEffect(() => {
+    if (!timer.type) return;
+    const tick = () => setTimer(prev => {
+      const remaining = Math.max(0, Math.ceil((prev.endsAt - Date.now()) / 1000));
+      return remaining === prev.remaining ? prev : { ...prev, remaining };
+    });
+    const interval = setInterval(tick, 250);
+    return () => clearInterval(interval);
+  }, [timer.type, timer.endsAt]);
+
   const handleStartTest = () => {
     if (ws.current?.readyState === WebSocket.OPEN) {
       ws.current.send(JSON.stringify({ type: 'start_test' }));
@@ -225,6 +356,7 @@ function App() {
   };
 
   const handleRestart = () => {
+    sessionStorage.removeItem(SESSION_KEY);
     window.location.reload();
   };
 